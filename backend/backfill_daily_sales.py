@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Script para (re)calcular os agregados de vendas (daily_sales e daily_orders)
+a partir dos pedidos existentes.
+
+Uso:
+    python backfill_daily_sales.py                  # recalcula todo o histórico
+    python backfill_daily_sales.py 2024-01-01       # recalcula a partir desta data
+
+Cada agregado é apagado e recalculado com um único INSERT ... SELECT, na mesma
+transação. No PostgreSQL as tabelas ficam travadas para escrita durante o
+recálculo, então pedidos criados ao mesmo tempo esperam e entram depois, sem
+contagem dupla.
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+from datetime import date
+from sqlalchemy import insert, select, text
+from src.main import app
+from src.models.user import db
+from src.models.order import Order, OrderItem
+from src.models.report import DailyOrders, DailySales
+from src.utils.query import sum_if
+
+def backfill(conn, date_from=None):
+    """Recalcula os agregados (a partir de date_from, se informado)"""
+    day = db.func.date(Order.created_at)
+    paid = Order.payment_status == 'pago'
+    conditions = [Order.status != 'cancelado']
+    if date_from:
+        conditions.append(Order.created_at >= date_from)
+
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text('LOCK TABLE daily_sales, daily_orders IN EXCLUSIVE MODE'))
+
+    for model in (DailySales, DailyOrders):
+        stmt = model.__table__.delete()
+        if date_from:
+            stmt = stmt.where(model.day >= date_from)
+        conn.execute(stmt)
+
+    sales = select(
+        day,
+        OrderItem.menu_item_id,
+        Order.order_type,
+        db.func.sum(OrderItem.quantity),
+        db.func.sum(OrderItem.subtotal),
+        sum_if(paid, OrderItem.subtotal),
+        db.func.count(db.distinct(Order.id))
+    ).join(Order, Order.id == OrderItem.order_id).where(*conditions).group_by(
+        day, OrderItem.menu_item_id, Order.order_type
+    )
+    conn.execute(insert(DailySales).from_select(
+        ['day', 'menu_item_id', 'order_type', 'quantity', 'revenue', 'paid_revenue', 'order_count'], sales
+    ))
+
+    # Valor pelos itens (e não por total_amount) para bater com daily_sales
+    item_totals = select(
+        OrderItem.order_id,
+        db.func.sum(OrderItem.subtotal).label('revenue')
+    ).group_by(OrderItem.order_id).subquery()
+    orders = select(
+        day,
+        Order.order_type,
+        db.func.count(Order.id),
+        db.func.coalesce(db.func.sum(item_totals.c.revenue), 0),
+        sum_if(paid, item_totals.c.revenue)
+    ).outerjoin(item_totals, item_totals.c.order_id == Order.id).where(*conditions).group_by(
+        day, Order.order_type
+    )
+    conn.execute(insert(DailyOrders).from_select(
+        ['day', 'order_type', 'order_count', 'revenue', 'paid_revenue'], orders
+    ))
+
+    days = conn.execute(select(db.func.count()).select_from(DailyOrders)).scalar()
+    print(f"  ✅ Agregados recalculados ({days} linhas em daily_orders)")
+
+if __name__ == '__main__':
+    with app.app_context():
+        print("🚀 Backfill dos agregados de vendas")
+        print("=" * 50)
+
+        try:
+            date_from = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+            with db.engine.begin() as conn:
+                backfill(conn, date_from)
+            print("\n✅ Processo concluído!")
+        except Exception as e:
+            print(f"❌ Erro durante o backfill: {str(e)}")
+            sys.exit(1)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark de POST /api/orders por tamanho de carrinho.
+
+Para carrinhos de 1, 10 e 50 itens (itens diferentes do cardápio), conta os
+statements SQL (listener before_cursor_execute) e mede a mediana do tempo
+de cada requisição em três casos: pedido delivery de um cliente existente,
+abertura de comanda em uma mesa nova e lançamento em uma comanda aberta.
+O número de statements tem de ser o mesmo para qualquer tamanho de carrinho
+(cardápio lido com um IN e linhas inseridas em lote); se crescer, o script
+sai com código 1.
+
+Roda em um SQLite temporário, ignorando o DATABASE_URL do ambiente. Para
+medir em outro banco de teste, passe --database-url (nunca o de produção):
+
+    python benchmark_create_order.py --carts 1 10 50 --repeat 5
+    python benchmark_create_order.py --database-url postgresql://localhost/bench
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+# Só usa outro banco com --database-url explícito: o DATABASE_URL do ambiente
+# (no Railway, o de produção) é ignorado
+pre_parser = argparse.ArgumentParser(add_help=False)
+pre_parser.add_argument('--database-url')
+os.environ['DATABASE_URL'] = (pre_parser.parse_known_args()[0].database_url or
+                              f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}")
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import event
+from src.main import app
+from src.models.user import db
+from src.models.menu import MenuItem
+
+PHONE = '(11) 97777-0000'
+
+# Mesas usadas pelo benchmark: uma nova a cada abertura de comanda
+mesas = itertools.count(int(time.time()) % 100000 + 200000)
+
+class StatementCounter:
+    """Conta os statements SQL executados dentro do bloco with"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+def create_menu_items(count):
+    """Itens do cardápio do benchmark (um por linha do maior carrinho)"""
+    items = [
+        MenuItem(name=f'Benchmark {n}', price=5.0 + n % 10, category='benchmark', available_for_delivery=True,
+                 available_for_local=True, available_for_comanda=True)
+        for n in range(count)
+    ]
+    with app.app_context():
+        db.session.add_all(items)
+        db.session.commit()
+        return [item.id for item in items]
+
+def cart(menu_item_ids, size):
+    return [{'menu_item_id': item_id, 'quantity': 1} for item_id in menu_item_ids[:size]]
+
+def cases(menu_item_ids, size):
+    """(nome, corpo) de cada caso; a comanda aberta usa a mesa aberta pelo caso anterior"""
+    mesa = next(mesas)
+    return [
+        ('Delivery (cliente existente)', {'order_type': 'delivery', 'customer_phone': PHONE,
+                                          'customer_name': 'Benchmark', 'items': cart(menu_item_ids, size)}),
+        ('Abrir comanda', {'order_type': 'comanda', 'mesa': mesa, 'items': cart(menu_item_ids, size)}),
+        ('Lançar na comanda aberta', {'order_type': 'comanda', 'mesa': mesa, 'items': cart(menu_item_ids, size)}),
+    ]
+
+def measure(client, engine, menu_item_ids, size, repeat):
+    """Statements (da última rodada) e mediana em ms de cada caso"""
+    statements, timings = {}, {}
+    for _ in range(repeat):
+        for name, body in cases(menu_item_ids, size):
+            with StatementCounter(engine) as counter:
+                start = time.perf_counter()
+                response = client.post('/api/orders', json=body)
+                timings.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+            assert response.status_code in (200, 201), response.get_json()
+            statements[name] = counter.count
+    return statements, {name: sorted(values)[len(values) // 2] for name, values in timings.items()}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--carts', type=int, nargs='+', default=[1, 10, 50], help='tamanhos de carrinho')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database-url', help='banco de teste no lugar do SQLite temporário')
+    args = parser.parse_args()
+
+    client = app.test_client()
+    with app.app_context():
+        engine = db.engine
+        print(f"🗄️  Banco: {engine.url.render_as_string(hide_password=True)}")
+    menu_item_ids = create_menu_items(max(args.carts))
+
+    # Aquecimento: cadastra o cliente (os casos medem um cliente existente)
+    client.post('/api/orders', json=cases(menu_item_ids, 1)[0][1])
+
+    results = {size: measure(client, engine, menu_item_ids, size, args.repeat) for size in args.carts}
+
+    ok = True
+    for name, _ in cases(menu_item_ids, 1):
+        counts = [results[size][0][name] for size in args.carts]
+        constant = len(set(counts)) == 1
+        ok = ok and constant
+        print(f"\n{'✅' if constant else '❌'} {name}")
+        for size in args.carts:
+            statements, timings = results[size]
+            print(f"  {size:3d} itens: {statements[name]:3d} statements  {timings[name]:8.2f} ms")
+
+    print("\n✅ Statements por pedido constantes" if ok else "\n❌ Statements crescem com o carrinho")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark da busca de clientes com e sem índice (ver src/search.py).
+
+Gera clientes sintéticos (padrão 100 mil) e mede a latência da busca usada
+por GET /api/users?search= para alguns termos, primeiro sem índice e depois
+com o índice de busca criado por migrate_search_index.py.
+
+Roda em um SQLite temporário, ignorando o DATABASE_URL do ambiente. Para
+medir em outro banco de teste, passe --database-url (nunca o de produção):
+
+    python benchmark_search.py --customers 100000
+    python benchmark_search.py --database-url postgresql://localhost/bench
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Só usa outro banco com --database-url explícito: o DATABASE_URL do ambiente
+# (no Railway, o de produção) é ignorado
+pre_parser = argparse.ArgumentParser(add_help=False)
+pre_parser.add_argument('--database-url')
+os.environ['DATABASE_URL'] = (pre_parser.parse_known_args()[0].database_url or
+                              f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}")
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.models.user import db, User, normalize_phone
+from src.search import apply_search
+from migrate_search_index import create_search_index, drop_search_index
+
+FIRST_NAMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela',
+               'João', 'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Thiago']
+LAST_NAMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Rodrigues', 'Almeida',
+              'Nascimento', 'Carvalho', 'Araújo', 'Ribeiro', 'Gomes', 'Martins', 'Rocha']
+STREETS = ['Rua das Flores', 'Av. Paulista', 'Rua Augusta', 'Rua do Norte', 'Av. Brasil', 'Rua XV de Novembro']
+
+TERMS = ['silva', 'Ana Costa', 'paulista', '99876', '(11) 9', 'gmail', 'xyzabc']
+
+def generate_customers(count, batch_size=5000):
+    """Insere `count` clientes sintéticos em lotes"""
+    rng = random.Random(42)
+    start = db.session.query(db.func.coalesce(db.func.max(User.id), 0)).scalar()
+    for offset in range(0, count, batch_size):
+        rows = []
+        for n in range(offset, min(offset + batch_size, count)):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            phone = f'({rng.randint(11, 99)}) 9{rng.randint(1000, 9999)}-{start + n:04d}'
+            rows.append({
+                'customer_name': f'{first} {last}',
+                'customer_phone': phone,
+                'phone_normalized': normalize_phone(phone),
+                'customer_email': f'{first.lower()}.{last.lower()}{start + n}@{rng.choice(["gmail.com", "hotmail.com"])}',
+                'delivery_address': f'{rng.choice(STREETS)}, {rng.randint(1, 3000)}',
+                'total_orders': 0,
+                'total_spent': 0.0,
+            })
+        db.session.execute(db.insert(User), rows)
+        db.session.commit()
+    print(f"👥 {count} clientes gerados")
+
+def time_search(term, repeat):
+    """Mediana (ms) e número de resultados da primeira página da busca"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        query, rank = apply_search(User.query, term)
+        order_by = [rank] if rank is not None else [User.created_at.desc()]
+        users = query.order_by(*order_by, User.id.desc()).limit(101).all()
+        timings.append((time.perf_counter() - start) * 1000)
+        db.session.expunge_all()
+    timings.sort()
+    return timings[len(timings) // 2], len(users)
+
+def run(title, repeat):
+    print(f"\n⏱️  {title}")
+    results = {}
+    for term in TERMS:
+        median, found = time_search(term, repeat)
+        results[term] = median
+        print(f"  {term!r:<14} {median:9.2f} ms  ({found} resultados na 1ª página)")
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--customers', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database-url', help='banco de teste no lugar do SQLite temporário')
+    args = parser.parse_args()
+
+    with app.app_context():
+        print(f"🗄️  Banco: {db.engine.url.render_as_string(hide_password=True)}")
+        generate_customers(args.customers)
+
+        drop_search_index(db.engine)
+        without_index = run('Sem índice', args.repeat)
+
+        create_search_index(db.engine)
+        with_index = run('Com índice', args.repeat)
+
+        print("\n📊 Ganho (sem índice / com índice)")
+        for term in TERMS:
+            print(f"  {term!r:<14} {without_index[term] / with_index[term]:7.1f}x")
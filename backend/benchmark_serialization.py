@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark da serialização de pedidos (ver src/utils/serialization.py).
+
+Gera pedidos sintéticos (padrão 10 mil, com 3 itens cada) e compara, para a
+lista inteira, o caminho antigo (objetos ORM + to_dict() + jsonify) com
+serialize_orders() + dumps() nos formatos completo e compacto. Para cada
+caminho mede a mediana do tempo de montagem (consultas + dicts), do tempo de
+codificação e o tamanho do payload em bytes. A codificação com dumps() é
+medida com orjson (se instalado) e com o json da biblioteca padrão.
+
+Roda em um SQLite temporário, ignorando o DATABASE_URL do ambiente. Para
+medir em outro banco de teste, passe --database-url (nunca o de produção):
+
+    python benchmark_serialization.py --orders 10000 --repeat 5
+    python benchmark_serialization.py --database-url postgresql://localhost/bench
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Só usa outro banco com --database-url explícito: o DATABASE_URL do ambiente
+# (no Railway, o de produção) é ignorado
+pre_parser = argparse.ArgumentParser(add_help=False)
+pre_parser.add_argument('--database-url')
+os.environ['DATABASE_URL'] = (pre_parser.parse_known_args()[0].database_url or
+                              f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}")
+sys.path.insert(0, os.path.dirname(__file__))
+
+from flask import jsonify
+from src.main import app
+from src.models.user import db
+from src.models.order import Order, OrderItem
+from src.models.menu import MenuItem
+from src.utils import serialization
+from src.utils.serialization import dumps, serialize_orders
+
+def generate_orders(count, items_per_order=3, batch_size=2000):
+    """Insere `count` pedidos sintéticos em lotes, com itens de 30 itens do cardápio"""
+    rng = random.Random(42)
+    menu_items = [
+        MenuItem(name=f'Benchmark {n}', description='Item do benchmark de serialização', price=5.0 + n,
+                 category='benchmark')
+        for n in range(30)
+    ]
+    db.session.add_all(menu_items)
+    db.session.commit()
+
+    start = datetime.utcnow() - timedelta(days=30)
+    first_id = db.session.query(db.func.coalesce(db.func.max(Order.id), 0)).scalar() + 1
+    for offset in range(0, count, batch_size):
+        orders, items = [], []
+        for n in range(offset, min(offset + batch_size, count)):
+            order_id = first_id + n
+            created_at = start + timedelta(seconds=n * 60)
+            lines = [(rng.choice(menu_items), rng.randint(1, 3)) for _ in range(items_per_order)]
+            orders.append({
+                'id': order_id, 'customer_name': f'Cliente {n}', 'customer_phone': f'(11) 9{n:08d}',
+                'order_type': 'delivery', 'status': 'entregue', 'payment_status': 'pago',
+                'total_amount': sum(item.price * quantity for item, quantity in lines),
+                'delivery_address': f'Rua do Benchmark, {n}', 'created_at': created_at,
+                'updated_at': created_at, 'is_comanda': False, 'status_comanda': 'encerrada',
+            })
+            items.extend({
+                'order_id': order_id, 'menu_item_id': item.id, 'quantity': quantity,
+                'unit_price': item.price, 'subtotal': item.price * quantity,
+            } for item, quantity in lines)
+        db.session.execute(db.insert(Order), orders)
+        db.session.execute(db.insert(OrderItem), items)
+        db.session.commit()
+    print(f"🧾 {count} pedidos gerados ({items_per_order} itens cada)")
+    return list(range(first_id, first_id + count))
+
+def build_to_dict(order_ids):
+    orders = Order.query.options(Order.with_items()).filter(Order.id.in_(order_ids)).all()
+    return {'success': True, 'orders': [order.to_dict() for order in orders]}
+
+def build_columns(order_ids, compact):
+    orders, menu_items = serialize_orders(order_ids, compact=compact)
+    payload = {'success': True, 'orders': orders}
+    if compact:
+        payload['menu_items'] = menu_items
+    return payload
+
+def encode_jsonify(payload):
+    return jsonify(payload).get_data()
+
+def encode_dumps(payload, use_orjson=True):
+    backend = serialization.orjson
+    if not use_orjson:
+        serialization.orjson = None
+    try:
+        return dumps(payload)
+    finally:
+        serialization.orjson = backend
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def measure(build, encode, repeat):
+    """Medianas (ms) de montagem e codificação e tamanho do payload"""
+    build_times, encode_times = [], []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        payload = build()
+        build_times.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        body = encode(payload)
+        encode_times.append((time.perf_counter() - start) * 1000)
+    return median(build_times), median(encode_times), len(body)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database-url', help='banco de teste no lugar do SQLite temporário')
+    args = parser.parse_args()
+
+    with app.app_context():
+        print(f"🗄️  Banco: {db.engine.url.render_as_string(hide_password=True)}")
+        order_ids = generate_orders(args.orders)
+
+        cases = [
+            ('to_dict + jsonify', lambda: build_to_dict(order_ids), encode_jsonify),
+            ('colunas + dumps (json)', lambda: build_columns(order_ids, False),
+             lambda payload: encode_dumps(payload, use_orjson=False)),
+            ('colunas compacto + dumps (json)', lambda: build_columns(order_ids, True),
+             lambda payload: encode_dumps(payload, use_orjson=False)),
+        ]
+        if serialization.orjson is not None:
+            cases += [
+                ('colunas + dumps (orjson)', lambda: build_columns(order_ids, False), encode_dumps),
+                ('colunas compacto + dumps (orjson)', lambda: build_columns(order_ids, True), encode_dumps),
+            ]
+        else:
+            print("⚠️  orjson não instalado: medindo só o json da biblioteca padrão")
+
+        print(f"\n⏱️  {args.orders} pedidos, mediana de {args.repeat} rodadas")
+        print(f"  {'caminho':<34} {'montagem':>10} {'codificação':>12} {'total':>10} {'payload':>12}")
+        results = {}
+        for name, build, encode in cases:
+            build_ms, encode_ms, size = measure(build, encode, args.repeat)
+            results[name] = build_ms + encode_ms
+            print(f"  {name:<34} {build_ms:8.1f} ms {encode_ms:9.1f} ms {build_ms + encode_ms:7.1f} ms"
+                  f" {size / 1024:9.1f} KiB")
+
+        baseline = results['to_dict + jsonify']
+        print("\n📊 Ganho sobre to_dict + jsonify")
+        for name, total in results.items():
+            if name != 'to_dict + jsonify':
+                print(f"  {name:<34} {baseline / total:6.1f}x")
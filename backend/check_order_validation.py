@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Teste de regressão da validação do carrinho em POST /api/orders.
+
+Itens sem menu_item_id, com menu_item_id ou quantity não inteiros, ou com
+quantity menor ou igual a zero têm de ser recusados com 400 (e não 500), sem
+gravar pedido e liberando a Idempotency-Key enviada. Um carrinho válido tem
+de ser aceito. Sai com código 1 se algum caso falhar.
+
+Roda sempre em um SQLite temporário:
+
+    python check_order_validation.py
+"""
+
+import os
+import sys
+import tempfile
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'validation.db')}"
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.models.user import db
+from src.models.order import Order
+from src.models.menu import MenuItem
+from src.models.idempotency import IdempotencyKey
+
+# (caso, itens do carrinho, status esperado)
+CASES = [
+    ('menu_item_id ausente', [{'quantity': 1}], 400),
+    ('quantity ausente', [{'menu_item_id': '{id}'}], 400),
+    ('menu_item_id não numérico', [{'menu_item_id': 'abc', 'quantity': 1}], 400),
+    ('quantity não numérica', [{'menu_item_id': '{id}', 'quantity': 'dois'}], 400),
+    ('quantity fracionária', [{'menu_item_id': '{id}', 'quantity': 1.5}], 400),
+    ('quantity nula', [{'menu_item_id': '{id}', 'quantity': None}], 400),
+    ('quantity zero', [{'menu_item_id': '{id}', 'quantity': 0}], 400),
+    ('quantity negativa', [{'menu_item_id': '{id}', 'quantity': -2}], 400),
+    ('item que não é objeto', ['{id}'], 400),
+    ('items que não é lista', {'menu_item_id': '{id}', 'quantity': 1}, 400),
+    ('segundo item inválido', [{'menu_item_id': '{id}', 'quantity': 1}, {'menu_item_id': '{id}', 'quantity': -1}], 400),
+    ('item inexistente', [{'menu_item_id': 999999, 'quantity': 1}], 400),
+    ('carrinho válido', [{'menu_item_id': '{id}', 'quantity': 2}, {'menu_item_id': '{id}', 'quantity': '1'}], 201),
+]
+
+def fill(value, menu_item_id):
+    """Troca o marcador '{id}' pelo id do item do cardápio do teste"""
+    if value == '{id}':
+        return menu_item_id
+    if isinstance(value, list):
+        return [fill(item, menu_item_id) for item in value]
+    if isinstance(value, dict):
+        return {key: fill(item, menu_item_id) for key, item in value.items()}
+    return value
+
+def count_rows():
+    with app.app_context():
+        return Order.query.count(), IdempotencyKey.query.count()
+
+if __name__ == '__main__':
+    client = app.test_client()
+    with app.app_context():
+        menu_item = MenuItem(name='Validação', price=10.0, category='teste')
+        db.session.add(menu_item)
+        db.session.commit()
+        menu_item_id = menu_item.id
+
+    ok = True
+    for n, (name, items, expected) in enumerate(CASES):
+        before = count_rows()
+        response = client.post(
+            '/api/orders',
+            json={'order_type': 'delivery', 'customer_phone': '(11) 95555-0000', 'items': fill(items, menu_item_id)},
+            headers={'Idempotency-Key': f'validation-{n}'}
+        )
+        after = count_rows()
+        if expected == 400:
+            passed = response.status_code == 400 and after == before
+        else:
+            passed = response.status_code == expected and after == (before[0] + 1, before[1] + 1)
+        ok = ok and passed
+        print(f"  {'✅' if passed else '❌'} {name:<28} {response.status_code} {response.get_json().get('message', '')}")
+
+    print("\n✅ Validação do carrinho OK" if ok else "\n❌ Validação do carrinho falhou")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Teste de regressão do número de consultas SQL das rotas que devolvem pedidos.
+
+Conta os statements executados (listener before_cursor_execute) por
+requisição com 1 pedido e depois com N pedidos com vários itens cada. O
+número de consultas tem de ser o mesmo nos dois casos: se alguma rota voltar
+a carregar itens ou itens do cardápio pedido a pedido (lazy loading), o
+número cresce com N e o script sai com código 1.
+
+Roda sempre em um SQLite temporário:
+
+    python check_query_counts.py --orders 25
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'queries.db')}"
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import event
+from src.main import app
+from src.models.user import db, User
+from src.models.menu import MenuItem
+
+PHONE = '(11) 98888-0000'
+MESA = 42
+
+# Rotas que devolvem pedidos com itens (nome, caminho/método e corpo)
+ENDPOINTS = [
+    ('GET /api/orders', 'get', '/api/orders', None),
+    ('GET /api/users/<id>/orders', 'get', '/api/users/{user_id}/orders', None),
+    ('POST /api/auth/phone', 'post', '/api/auth/phone', {'phone': PHONE}),
+    ('POST /api/auth/phone (light)', 'post', '/api/auth/phone', {'phone': PHONE, 'light': True}),
+    ('GET /api/users/phone/<phone>', 'get', f'/api/users/phone/{PHONE}', None),
+    ('GET /api/comanda/<mesa>', 'get', f'/api/comanda/{MESA}', None),
+]
+
+class StatementCounter:
+    """Conta os statements SQL executados dentro do bloco with"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+def new_menu_items(count):
+    """Itens do cardápio novos: cada pedido usa itens diferentes, para que um
+    carregamento item a item do cardápio também apareça na contagem"""
+    items = [
+        MenuItem(name=f'Item {n}', price=10.0, category='teste', available_for_delivery=True,
+                 available_for_local=True, available_for_comanda=True)
+        for n in range(count)
+    ]
+    with app.app_context():
+        db.session.add_all(items)
+        db.session.commit()
+        return [item.id for item in items]
+
+def place_orders(client, count, items_per_order):
+    """`count` pedidos delivery do cliente e `count` lançamentos na comanda da mesa"""
+    for _ in range(count):
+        items = [{'menu_item_id': item_id, 'quantity': 1} for item_id in new_menu_items(items_per_order)]
+        for order in ({'order_type': 'delivery', 'customer_phone': PHONE, 'customer_name': 'Consultas'},
+                      {'order_type': 'comanda', 'mesa': MESA}):
+            response = client.post('/api/orders', json=dict(order, items=items))
+            assert response.status_code in (200, 201), response.get_json()
+
+def count_queries(client, engine, user_id):
+    """Número de statements de cada rota (depois de uma chamada de aquecimento)"""
+    counts = {}
+    for name, method, path, body in ENDPOINTS:
+        path = path.format(user_id=user_id)
+        getattr(client, method)(path, json=body)
+        with StatementCounter(engine) as counter:
+            response = getattr(client, method)(path, json=body)
+        assert response.status_code == 200, (name, response.status_code)
+        counts[name] = counter.count
+    return counts
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=25, help='pedidos no segundo cenário')
+    parser.add_argument('--items', type=int, default=4, help='itens por pedido')
+    args = parser.parse_args()
+
+    # Cada requisição usa a própria sessão, como em produção (sem app context aberto aqui)
+    client = app.test_client()
+    with app.app_context():
+        engine = db.engine
+
+    place_orders(client, 1, args.items)
+    with app.app_context():
+        user_id = User.find_by_phone(PHONE).id
+    single = count_queries(client, engine, user_id)
+
+    place_orders(client, args.orders - 1, args.items)
+    many = count_queries(client, engine, user_id)
+
+    print(f"🔢 Consultas por requisição: 1 pedido × {args.orders} pedidos ({args.items} itens cada)")
+    ok = True
+    for name, *_ in ENDPOINTS:
+        constant = single[name] == many[name]
+        ok = ok and constant
+        print(f"  {'✅' if constant else '❌'} {name:<32} {single[name]:3d} × {many[name]:3d}")
+
+    print("\n✅ Número de consultas constante" if ok else "\n❌ Consultas crescem com o número de pedidos")
+    sys.exit(0 if ok else 1)
@@ -1,11 +1,42 @@
 # Configuração do Gunicorn para produção
+import os
+import shutil
+
+# Métricas Prometheus agregadas entre os workers (GET /metrics). O diretório
+# precisa existir antes de o app ser importado (preload_app); métricas de
+# execuções anteriores são descartadas
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
 bind = "0.0.0.0:5000"
-workers = 4
-worker_class = "sync"
-worker_connections = 1000
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
+
+# "sync" (padrão) ou "gevent" para alta concorrência: cada worker gevent atende
+# até worker_connections requisições simultâneas, então consultas lentas ou
+# conexões longas (SSE em /api/events) não bloqueiam o worker inteiro
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 1000))
+
 timeout = 30
 keepalive = 2
 max_requests = 1000
 max_requests_jitter = 50
-preload_app = True
-reload = False
\ No newline at end of file
+
+# Com gevent o app precisa ser importado depois do monkey patching do worker
+preload_app = worker_class == "sync"
+reload = False
+
+def child_exit(server, worker):
+    # Sem prometheus_client as métricas são no-ops (ver src/metrics.py)
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
+
+def post_fork(server, worker):
+    if worker_class == "gevent":
+        # Torna o psycopg2 cooperativo: espera de I/O do banco cede o greenlet
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Teste de carga simples para comparar os modos de worker do gunicorn.
+
+Dispara requisições concorrentes contra GET /api/menu e POST /api/orders e
+mostra vazão (req/s) e latências p50/p99 de cada cenário. Usa apenas a
+biblioteca padrão.
+
+Uso (na mesma máquina, um modo de cada vez):
+
+    GUNICORN_WORKER_CLASS=sync   gunicorn --config gunicorn.conf.py wsgi:app
+    python loadtest.py --url http://localhost:5000 --concurrency 50 --duration 30
+
+    GUNICORN_WORKER_CLASS=gevent gunicorn --config gunicorn.conf.py wsgi:app
+    python loadtest.py --url http://localhost:5000 --concurrency 50 --duration 30
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+def get_menu(base_url):
+    return urllib.request.Request(f'{base_url}/api/menu?type=local')
+
+def post_order(base_url, menu_item_id):
+    body = json.dumps({
+        'order_type': 'local',
+        'customer_name': 'Teste de Carga',
+        'customer_phone': '00000000000',
+        'items': [{'menu_item_id': menu_item_id, 'quantity': 1}]
+    }).encode()
+    return urllib.request.Request(
+        f'{base_url}/api/orders', data=body, method='POST',
+        headers={'Content-Type': 'application/json'}
+    )
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+def run_scenario(name, make_request, concurrency, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(make_request(), timeout=30) as response:
+                    response.read()
+                ok = True
+            except (urllib.error.URLError, OSError):
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total_time = time.monotonic() - started
+
+    print(f"📊 {name}")
+    print(f"   Requisições: {len(latencies)} ok, {errors[0]} erros em {total_time:.1f}s")
+    print(f"   Vazão: {len(latencies) / total_time:.1f} req/s")
+    print(f"   Latência p50: {percentile(latencies, 50) * 1000:.1f} ms | "
+          f"p99: {percentile(latencies, 99) * 1000:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga da API do restaurante')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--menu-item-id', type=int, default=1)
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    print(f"🚀 Teste de carga em {base_url} ({args.concurrency} conexões, {args.duration:.0f}s por cenário)")
+    print("=" * 50)
+
+    run_scenario('GET /api/menu', lambda: get_menu(base_url), args.concurrency, args.duration)
+    run_scenario('POST /api/orders', lambda: post_order(base_url, args.menu_item_id), args.concurrency, args.duration)
+
+if __name__ == '__main__':
+    main()
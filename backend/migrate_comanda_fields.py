@@ -10,55 +10,62 @@ sys.path.insert(0, os.path.dirname(__file__))
 from src.main import app
 from src.models.user import db
 from src.models.order import Order
-
-def add_comanda_fields():
+from src.utils.batch_migration import BatchMigration, migration_args
+
+orders = Order.__table__
+
+COMANDA_COLUMNS = {
+    'is_comanda': 'BOOLEAN DEFAULT false',
+    'mesa': 'INTEGER',
+    'status_comanda': "VARCHAR(20) DEFAULT 'aberta'",
+}
+
+def add_columns(migration):
+    """Adiciona as colunas que ainda não existem (ALTER TABLE)"""
+    existing_columns = [col['name'] for col in db.inspect(migration.connection).get_columns('order')]
+    added = 0
+    for name, definition in COMANDA_COLUMNS.items():
+        if name in existing_columns:
+            print(f"  ✅ Coluna '{name}' já existe")
+            continue
+        print(f"  ➕ Adicionando coluna '{name}'...")
+        migration.execute(db.text(f'ALTER TABLE "order" ADD COLUMN {name} {definition}'))
+        print(f"  ✅ Coluna '{name}' adicionada")
+        added += 1
+    return added
+
+def mark_comandas(migration, lo, hi):
+    """Marca pedidos do tipo comanda (UPDATE em lote, sem carregar os pedidos)"""
+    return migration.execute(
+        orders.update().where(
+            orders.c.id >= lo, orders.c.id < hi,
+            orders.c.order_type == 'comanda',
+            (orders.c.is_comanda.isnot(True)) | (orders.c.status_comanda.is_(None))
+        ).values(
+            is_comanda=True,
+            status_comanda=db.func.coalesce(orders.c.status_comanda, 'aberta')
+        )
+    ).rowcount
+
+def add_comanda_fields(args):
     """Adiciona campos específicos de comanda na tabela order"""
-    with app.app_context():
-        print("🔄 Adicionando campos de comanda...")
-
-        try:
-            # Verificar se as colunas já existem
-            inspector = db.inspect(db.engine)
-            existing_columns = [col['name'] for col in inspector.get_columns('order')]
-
-            if 'is_comanda' not in existing_columns:
-                print("  ➕ Adicionando coluna 'is_comanda'...")
-                db.engine.execute('ALTER TABLE "order" ADD COLUMN is_comanda BOOLEAN DEFAULT false')
-                print("  ✅ Coluna 'is_comanda' adicionada")
-            else:
-                print("  ✅ Coluna 'is_comanda' já existe")
-
-            if 'mesa' not in existing_columns:
-                print("  ➕ Adicionando coluna 'mesa'...")
-                db.engine.execute('ALTER TABLE "order" ADD COLUMN mesa INTEGER')
-                print("  ✅ Coluna 'mesa' adicionada")
-            else:
-                print("  ✅ Coluna 'mesa' já existe")
-
-            if 'status_comanda' not in existing_columns:
-                print("  ➕ Adicionando coluna 'status_comanda'...")
-                db.engine.execute('ALTER TABLE "order" ADD COLUMN status_comanda VARCHAR(20) DEFAULT \'aberta\'')
-                print("  ✅ Coluna 'status_comanda' adicionada")
-            else:
-                print("  ✅ Coluna 'status_comanda' já existe")
-
-            # Atualizar pedidos existentes de comanda
-            print("  🔄 Atualizando pedidos existentes de comanda...")
-            orders_to_update = Order.query.filter_by(order_type='comanda').all()
+    print("🔄 Adicionando campos de comanda...")
 
-            for order in orders_to_update:
-                order.is_comanda = True
-                if not order.status_comanda:
-                    order.status_comanda = 'aberta'
+    try:
+        with BatchMigration('comanda_fields', args.batch_size, args.dry_run, args.restart) as migration:
+            migration.run('Adicionar colunas de comanda', lambda: add_columns(migration))
 
-            db.session.commit()
-            print(f"  ✅ {len(orders_to_update)} pedidos de comanda atualizados")
+            # Atualizar pedidos existentes de comanda
+            migration.run_batched(
+                'Atualizar pedidos existentes de comanda', orders.c.id,
+                lambda lo, hi: mark_comandas(migration, lo, hi),
+                where=(orders.c.order_type == 'comanda',)
+            )
 
-            print("✅ Migração de campos de comanda concluída!")
+        print("✅ Migração de campos de comanda concluída!")
 
-        except Exception as e:
-            print(f"❌ Erro durante a migração: {str(e)}")
-            db.session.rollback()
+    except Exception as e:
+        print(f"❌ Erro durante a migração: {str(e)}")
 
 def show_comanda_stats():
     """Mostra estatísticas das comandas"""
@@ -87,12 +94,14 @@ def show_comanda_stats():
         print(f"❌ Erro ao mostrar estatísticas: {str(e)}")
 
 if __name__ == '__main__':
+    args = migration_args('Adiciona os campos de comanda à tabela order')
+
     with app.app_context():
         print("🚀 Script de Migração de Campos de Comanda")
         print("=" * 50)
 
         # Adicionar campos de comanda
-        add_comanda_fields()
+        add_comanda_fields(args)
 
         # Mostrar estatísticas
         show_comanda_stats()
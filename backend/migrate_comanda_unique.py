@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Script de migração do índice único de comandas abertas (uma por mesa).
+
+1. Encerra comandas canceladas que ficaram abertas (cancelar uma comanda
+   passou a encerrá-la; antes elas seguiam ocupando a mesa e recebendo
+   lançamentos).
+2. Unifica comandas abertas duplicadas da mesma mesa (criadas por lançamentos
+   simultâneos antes do índice): itens e total vão para a comanda mais antiga
+   e as duplicadas são removidas.
+3. Recria ix_order_comanda_aberta como índice único parcial.
+4. Recalcula as estatísticas dos clientes e, se houve unificação, os
+   agregados de vendas (a contagem de pedidos por dia muda).
+
+Idempotente; aceita --dry-run (ver src/utils/batch_migration.py).
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.models.user import db, User
+from src.models.order import Order, OrderItem
+from src.utils.batch_migration import BatchMigration, migration_args
+from backfill_daily_sales import backfill
+
+orders = Order.__table__
+order_items = OrderItem.__table__
+
+def open_comanda():
+    return (orders.c.is_comanda == True) & (orders.c.status_comanda == 'aberta')
+
+def close_cancelled_comandas(migration):
+    """Encerra as comandas abertas canceladas. Retorna o número de comandas encerradas"""
+    return migration.execute(
+        orders.update().where(open_comanda(), orders.c.status == 'cancelado').values(status_comanda='encerrada')
+    ).rowcount
+
+def merge_duplicate_comandas(migration):
+    """Unifica as comandas abertas de cada mesa. Retorna o número de comandas removidas"""
+    mesas = migration.execute(
+        db.select(orders.c.mesa).where(open_comanda(), orders.c.mesa.isnot(None))
+        .group_by(orders.c.mesa).having(db.func.count() > 1)
+    ).scalars().all()
+    print(f"🔎 Mesas com mais de uma comanda aberta: {len(mesas)}")
+
+    removed = 0
+    for mesa in mesas:
+        comandas = migration.execute(
+            db.select(orders.c.id, orders.c.status, orders.c.total_amount)
+            .where(open_comanda(), orders.c.mesa == mesa).order_by(orders.c.id)
+        ).all()
+        active = [c for c in comandas if c.status != 'cancelado']
+
+        # Canceladas não voltam a valer: só deixam de ocupar a mesa
+        cancelled = [c.id for c in comandas if c.status == 'cancelado']
+        if active:
+            keeper, duplicates = active[0], active[1:]
+        else:
+            keeper, duplicates = None, []
+            cancelled = cancelled[1:]
+        if cancelled:
+            migration.execute(orders.update().where(orders.c.id.in_(cancelled)).values(status_comanda='encerrada'))
+
+        if duplicates:
+            duplicate_ids = [c.id for c in duplicates]
+            migration.execute(
+                order_items.update().where(order_items.c.order_id.in_(duplicate_ids)).values(order_id=keeper.id)
+            )
+            migration.execute(
+                orders.update().where(orders.c.id == keeper.id).values(
+                    total_amount=orders.c.total_amount + sum(c.total_amount for c in duplicates)
+                )
+            )
+            removed += migration.execute(orders.delete().where(orders.c.id.in_(duplicate_ids))).rowcount
+        print(f"  🍽️  Mesa {mesa}: {len(duplicates)} unificada(s), {len(cancelled)} cancelada(s) encerrada(s)")
+    return removed
+
+def create_unique_index(migration):
+    """Troca o índice de comandas abertas (não único em bancos antigos) pelo único"""
+    index = next(ix for ix in orders.indexes if ix.name == 'ix_order_comanda_aberta')
+    existing = {ix['name']: ix for ix in db.inspect(migration.connection).get_indexes('order')}
+    if existing.get(index.name, {}).get('unique'):
+        print(f"  ✅ Índice único '{index.name}' já existe")
+        return 0
+    if index.name in existing:
+        index.drop(bind=migration.connection)
+    index.create(bind=migration.connection)
+    print(f"  ✅ Índice único '{index.name}' criado")
+    return 1
+
+if __name__ == '__main__':
+    args = migration_args('Unifica comandas abertas duplicadas e cria o índice único por mesa')
+
+    with app.app_context():
+        print("🚀 Script de Migração de Comandas (uma aberta por mesa)")
+        print("=" * 50)
+
+        try:
+            with BatchMigration('comanda_unique', args.batch_size, args.dry_run, args.restart) as migration:
+                migration.run('Encerrar comandas canceladas', lambda: close_cancelled_comandas(migration))
+                removed = migration.run('Unificar comandas duplicadas', lambda: merge_duplicate_comandas(migration))
+                migration.run('Criar índice único de comanda aberta', lambda: create_unique_index(migration))
+                if removed:
+                    migration.run('Recalcular estatísticas dos clientes', lambda: User.reconcile_stats(migration.connection))
+                    migration.run('Recalcular agregados de vendas', lambda: backfill(migration.connection))
+            print("\n✅ Processo concluído!")
+        except Exception as e:
+            print(f"❌ Erro durante a migração: {str(e)}")
+            sys.exit(1)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Script para criar os índices de pedidos, itens e clientes declarados nos modelos.
+Idempotente: índices já existentes são ignorados. Funciona em SQLite e PostgreSQL
+e mostra o plano de execução (EXPLAIN) das consultas quentes antes e depois.
+
+No PostgreSQL os índices são criados com CREATE INDEX CONCURRENTLY (fora de
+transação), sem bloquear escritas nas tabelas durante a construção. Um índice
+deixado inválido por uma execução interrompida é removido e recriado.
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+from datetime import datetime
+from sqlalchemy import select, text
+from src.main import app
+from src.models.user import db, User
+from src.models.order import Order, OrderItem
+
+TABLES = [Order.__table__, OrderItem.__table__, User.__table__]
+
+def hot_queries():
+    """Consultas usadas pelas rotas mais acessadas"""
+    return {
+        'Listagem de pedidos': select(Order.id).order_by(Order.created_at.desc(), Order.id.desc()).limit(100),
+        'Pedidos por status': select(Order.id).where(Order.status == 'pendente').order_by(Order.created_at.desc()),
+        'Pedidos por tipo': select(Order.id).where(Order.order_type == 'delivery').order_by(Order.created_at.desc()),
+        'Pedidos por pagamento': select(Order.id).where(Order.payment_status == 'nao_pago'),
+        'Histórico do cliente': select(Order.id).where(Order.user_id == 1).order_by(Order.created_at.desc()),
+        'Pedido atual do cliente': select(Order.id).where(
+            Order.user_id == 1, Order.status.in_(['pendente', 'preparando'])
+        ).order_by(Order.created_at.desc()).limit(1),
+        'Comanda aberta da mesa': select(Order.id).where(
+            Order.mesa == 1, Order.is_comanda == True, Order.status_comanda == 'aberta'
+        ),
+        'Mudanças desde o último sync': select(Order.id).where(
+            Order.updated_at > datetime(2024, 1, 1)
+        ).order_by(Order.updated_at).limit(100),
+        'Itens de pedidos': select(OrderItem.id).where(OrderItem.order_id.in_([1, 2, 3])),
+        'Maiores compradores': select(User.id).where(User.total_spent > 0).order_by(User.total_spent.desc()).limit(5),
+    }
+
+def explain(conn, stmt):
+    """Retorna o plano de execução de uma consulta no dialeto atual"""
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True}))
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    rows = conn.execute(text(prefix + sql)).fetchall()
+    # SQLite devolve (id, parent, notused, detail); PostgreSQL uma coluna de texto
+    return [str(row[-1]) for row in rows]
+
+def show_plans(conn, title):
+    print(f"\n📐 Planos de execução ({title}):")
+    print("=" * 50)
+    for name, stmt in hot_queries().items():
+        print(f"  🔎 {name}")
+        for line in explain(conn, stmt):
+            print(f"     {line}")
+
+def invalid_indexes(conn):
+    """Índices inválidos, deixados por um CREATE INDEX CONCURRENTLY interrompido (PostgreSQL)"""
+    return set(conn.execute(text(
+        'SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid'
+    )).scalars())
+
+def create_indexes(conn):
+    """Cria os índices declarados nos modelos que ainda não existem"""
+    print("🔄 Criando índices...")
+    inspector = db.inspect(conn)
+    postgresql = conn.dialect.name == 'postgresql'
+    invalid = invalid_indexes(conn) if postgresql else set()
+
+    for table in TABLES:
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name in invalid:
+                print(f"  ⚠️  Índice '{index.name}' inválido, recriando...")
+                conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {index.name}'))
+            elif index.name in existing:
+                print(f"  ✅ Índice '{index.name}' já existe")
+                continue
+            print(f"  ➕ Criando índice '{index.name}'...")
+            if postgresql:
+                index.dialect_options['postgresql']['concurrently'] = True
+            index.create(bind=conn)
+            print(f"  ✅ Índice '{index.name}' criado")
+
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text('ANALYZE "order"'))
+        conn.execute(text('ANALYZE order_item'))
+        conn.execute(text('ANALYZE "user"'))
+    else:
+        conn.execute(text('ANALYZE'))
+
+if __name__ == '__main__':
+    with app.app_context():
+        print("🚀 Script de Migração de Índices")
+        print("=" * 50)
+
+        try:
+            # CONCURRENTLY não pode rodar dentro de uma transação
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                show_plans(conn, 'antes')
+                create_indexes(conn)
+                show_plans(conn, 'depois')
+            print("\n✅ Processo concluído!")
+        except Exception as e:
+            print(f"❌ Erro durante a migração: {str(e)}")
+            sys.exit(1)
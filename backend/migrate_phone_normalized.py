@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Script de migração do telefone normalizado dos clientes (user.phone_normalized).
+
+1. Adiciona a coluna, se não existir
+2. Preenche com normalize_phone(customer_phone), em lotes
+3. Unifica clientes com o mesmo telefone normalizado (ex.: "(11) 99999-0000"
+   e "11999990000"): os pedidos vão para o cadastro mais recente e os
+   duplicados são removidos
+4. Cria o índice único ix_user_phone_normalized e recalcula as estatísticas
+
+Rodar no deploy que introduz a coluna (antes de atender requisições); o
+migrate_railway.py do release do Railway já executa estas etapas.
+Idempotente e retomável (ver src/utils/batch_migration.py).
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.models.user import db, User, normalize_phone
+from src.utils.batch_migration import BatchMigration, migration_args
+from migrate_phone_unique import merge_duplicate_users
+
+users = User.__table__
+
+def add_column(migration):
+    """ALTER TABLE para bancos criados antes da coluna"""
+    existing_columns = [col['name'] for col in db.inspect(migration.connection).get_columns('user')]
+    if 'phone_normalized' in existing_columns:
+        print("  ✅ Coluna 'phone_normalized' já existe")
+        return 0
+    migration.execute(db.text('ALTER TABLE "user" ADD COLUMN phone_normalized VARCHAR(20)'))
+    print("  ✅ Coluna 'phone_normalized' adicionada")
+    return 1
+
+def fill_batch(migration, lo, hi):
+    """Normaliza os telefones do lote e grava com um UPDATE em lote (executemany)"""
+    rows = migration.execute(
+        db.select(users.c.id, users.c.customer_phone).where(
+            users.c.id >= lo, users.c.id < hi, users.c.phone_normalized.is_(None)
+        )
+    ).all()
+    params = [
+        {'user_id': row.id, 'phone': normalize_phone(row.customer_phone)}
+        for row in rows if normalize_phone(row.customer_phone)
+    ]
+    if not params:
+        return 0
+    return migration.execute(
+        users.update().where(users.c.id == db.bindparam('user_id'))
+        .values(phone_normalized=db.bindparam('phone')),
+        params
+    ).rowcount
+
+def fill_phone_normalized(migration):
+    """Preenche phone_normalized dos clientes que ainda não o têm"""
+    return migration.run_batched(
+        'Normalizar telefones', users.c.id,
+        lambda lo, hi: fill_batch(migration, lo, hi),
+        where=(users.c.phone_normalized.is_(None),)
+    )
+
+def create_unique_index(migration):
+    index = next(ix for ix in users.indexes if ix.name == 'ix_user_phone_normalized')
+    index.create(bind=migration.connection, checkfirst=True)
+
+def migrate_phone_normalized(migration):
+    """Todas as etapas acima, na ordem. Retorna o número de clientes unificados"""
+    migration.run('Adicionar coluna phone_normalized', lambda: add_column(migration))
+    fill_phone_normalized(migration)
+    removed = merge_duplicate_users(migration, key=lambda table: table.c.phone_normalized)
+    print(f"👤 Clientes duplicados unificados: {removed}")
+    migration.run('Criar índice único de telefone', lambda: create_unique_index(migration))
+    return removed
+
+if __name__ == '__main__':
+    args = migration_args('Normaliza os telefones dos clientes e unifica duplicados')
+
+    with app.app_context():
+        print("🚀 Script de Migração de Telefones Normalizados")
+        print("=" * 50)
+
+        try:
+            with BatchMigration('phone_normalized', args.batch_size, args.dry_run, args.restart) as migration:
+                migrate_phone_normalized(migration)
+                migration.run('Recalcular estatísticas dos clientes', lambda: User.reconcile_stats(migration.connection))
+            print("\n✅ Processo concluído!")
+        except Exception as e:
+            print(f"❌ Erro durante a migração: {str(e)}")
+            sys.exit(1)
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 """
 Script de migração para tornar o telefone único no banco de dados
-e ajustar a estrutura para permitir nomes opcionais
+e ajustar a estrutura para permitir nomes opcionais.
+
+Clientes duplicados (mesmo telefone) são unificados no cadastro mais recente:
+os pedidos dos duplicados passam para ele e os duplicados são removidos.
+Tudo em SQL set-based e em lotes retomáveis (ver src/utils/batch_migration.py).
 """
 
 import sys
@@ -11,84 +15,106 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from src.main import app
 from src.models.user import db, User
 from src.models.order import Order
+from src.utils.batch_migration import BatchMigration, migration_args
+
+users = User.__table__
+orders = Order.__table__
+
+def phone_key(table):
+    return table.c.customer_phone
+
+def has_key(table, key):
+    return key(table).isnot(None) & (key(table) != '')
+
+def keeper_id(table, key):
+    """Id do cliente que fica para a chave de `table` (o cadastro mais recente)"""
+    keeper = users.alias('keeper')
+    return db.select(keeper.c.id).where(key(keeper) == key(table)).order_by(
+        keeper.c.created_at.desc(), keeper.c.id.desc()
+    ).limit(1).scalar_subquery()
+
+def merge_duplicate_users(migration, key=phone_key):
+    """Unifica clientes com a mesma chave: move os pedidos e remove os duplicados.
+
+    Retorna o número de clientes removidos.
+    """
+    duplicates = db.select(key(users).label('key')).where(has_key(users, key)).group_by(
+        key(users)
+    ).having(db.func.count() > 1).subquery()
+    count = migration.execute(db.select(db.func.count()).select_from(duplicates)).scalar()
+    print(f"🔎 Chaves duplicadas: {count}")
+    if not count:
+        return 0
+
+    duplicate = users.alias('duplicate')
+    migration.run_batched(
+        'Mover pedidos para o cliente mantido', orders.c.id,
+        lambda lo, hi: migration.execute(
+            orders.update().where(
+                orders.c.id >= lo, orders.c.id < hi,
+                orders.c.user_id == duplicate.c.id,
+                has_key(duplicate, key),
+                duplicate.c.id != keeper_id(duplicate, key)
+            ).values(user_id=keeper_id(duplicate, key))
+        ).rowcount,
+        where=(orders.c.user_id.isnot(None),)
+    )
 
-def migrate_phone_unique():
+    return migration.run_batched(
+        'Remover clientes duplicados', users.c.id,
+        lambda lo, hi: migration.execute(
+            users.delete().where(
+                users.c.id >= lo, users.c.id < hi,
+                has_key(users, key),
+                users.c.id != keeper_id(users, key)
+            )
+        ).rowcount
+    )
+
+def create_unique_index(migration):
+    """Cria o índice único parcial de telefone, se ainda não existir"""
+    phone = users.c.customer_phone
+    index = db.Index(
+        'idx_user_customer_phone_unique', phone, unique=True,
+        postgresql_where=phone.isnot(None) & (phone != ''),
+        sqlite_where=phone.isnot(None) & (phone != '')
+    )
+    index.create(bind=migration.connection, checkfirst=True)
+    users.indexes.discard(index)
+
+def migrate_phone_unique(args):
     """Migração para tornar o telefone único e nome opcional"""
     with app.app_context():
-        try:
-            print("Iniciando migração para tornar telefone único e nome opcional...")
-
-            # Verificar se há telefones duplicados
-            from sqlalchemy import text
-            result = db.session.execute(text("""
-                SELECT customer_phone, COUNT(*) as count
-                FROM user
-                WHERE customer_phone IS NOT NULL AND customer_phone != ''
-                GROUP BY customer_phone
-                HAVING COUNT(*) > 1
-            """))
-
-            duplicates = result.fetchall()
-
-            if duplicates:
-                print(f"Encontrados {len(duplicates)} telefones duplicados:")
-                for phone, count in duplicates:
-                    print(f"  - {phone}: {count} registros")
-
-                # Para cada telefone duplicado, manter apenas o registro mais recente
-                for phone, count in duplicates:
-                    users = User.query.filter_by(customer_phone=phone).order_by(User.created_at.desc()).all()
-
-                    # Manter o primeiro (mais recente) e remover os outros
-                    for user in users[1:]:
-                        print(f"  Removendo usuário duplicado: {user.customer_name or 'Sem nome'} (ID: {user.id})")
-                        db.session.delete(user)
-
-                db.session.commit()
-                print("Usuários duplicados removidos com sucesso!")
-
-            # Adicionar índice único para customer_phone
-            try:
-                db.session.execute(text("""
-                    CREATE UNIQUE INDEX IF NOT EXISTS idx_user_customer_phone_unique
-                    ON user (customer_phone)
-                    WHERE customer_phone IS NOT NULL AND customer_phone != ''
-                """))
-                db.session.commit()
-                print("Índice único criado com sucesso!")
-            except Exception as e:
-                print(f"Erro ao criar índice único: {e}")
-                # Tentar adicionar a restrição diretamente na tabela
-                try:
-                    db.session.execute(text("""
-                        ALTER TABLE user
-                        ADD CONSTRAINT uk_user_customer_phone
-                        UNIQUE (customer_phone)
-                    """))
-                    db.session.commit()
-                    print("Restrição única adicionada com sucesso!")
-                except Exception as e2:
-                    print(f"Erro ao adicionar restrição única: {e2}")
-
-            # Verificar usuários sem nome (agora permitido)
-            users_without_name = User.query.filter(User.customer_name.is_(None)).count()
-            print(f"Usuários sem nome: {users_without_name} (agora permitido)")
+        print("Iniciando migração para tornar telefone único e nome opcional...")
 
-            # Verificar pedidos sem nome (agora permitido)
-            orders_without_name = Order.query.filter(Order.customer_name.is_(None)).count()
-            print(f"Pedidos sem nome: {orders_without_name} (agora permitido)")
+        with BatchMigration('phone_unique', args.batch_size, args.dry_run, args.restart) as migration:
+            removed = merge_duplicate_users(migration)
+            print(f"Usuários duplicados removidos: {removed}")
 
-            print("Migração concluída com sucesso!")
-            print("\nResumo das mudanças:")
-            print("- Telefone é agora o único identificador obrigatório")
-            print("- Nome é opcional e pode variar entre pedidos")
-            print("- Histórico é mantido pelo telefone, não pelo nome")
-            print("- Máscara de telefone: (DDD) 9XXXX-XXXX")
+            migration.run('Criar índice único de telefone', lambda: create_unique_index(migration))
+            migration.run('Recalcular estatísticas dos clientes', lambda: User.reconcile_stats(migration.connection))
+
+            # Verificar usuários e pedidos sem nome (agora permitido)
+            users_without_name = migration.execute(
+                db.select(db.func.count()).where(users.c.customer_name.is_(None))
+            ).scalar()
+            print(f"Usuários sem nome: {users_without_name} (agora permitido)")
+            orders_without_name = migration.execute(
+                db.select(db.func.count()).where(orders.c.customer_name.is_(None))
+            ).scalar()
+            print(f"Pedidos sem nome: {orders_without_name} (agora permitido)")
 
-        except Exception as e:
-            print(f"Erro durante a migração: {e}")
-            db.session.rollback()
-            raise
+        print("Migração concluída com sucesso!")
+        print("\nResumo das mudanças:")
+        print("- Telefone é agora o único identificador obrigatório")
+        print("- Nome é opcional e pode variar entre pedidos")
+        print("- Histórico é mantido pelo telefone, não pelo nome")
+        print("- Máscara de telefone: (DDD) 9XXXX-XXXX")
 
 if __name__ == "__main__":
-    migrate_phone_unique()
\ No newline at end of file
+    args = migration_args('Unifica clientes com telefone duplicado e cria o índice único')
+    try:
+        migrate_phone_unique(args)
+    except Exception as e:
+        print(f"Erro durante a migração: {e}")
+        raise
@@ -9,132 +9,120 @@ import sys
 sys.path.insert(0, os.path.dirname(__file__))
 
 from src.main import app
-from src.models.user import db, User
+from src.models.user import db, User, normalize_phone
 from src.models.order import Order
+from src.utils.batch_migration import BatchMigration, migration_args
+from migrate_phone_normalized import migrate_phone_normalized
 from datetime import datetime
 
-def migrate_railway_data():
+orders = Order.__table__
+users = User.__table__
+order_phone = db.func.trim(orders.c.customer_phone)
+WITHOUT_USER = (orders.c.user_id.is_(None),)
+
+def in_range(lo, hi):
+    return (orders.c.id >= lo, orders.c.id < hi, orders.c.user_id.is_(None))
+
+def link_by_phone(migration, lo, hi, counts):
+    """Associa os pedidos do lote ao cliente com o mesmo telefone normalizado.
+
+    Clientes que ainda não existem são criados em lote com os dados do pedido
+    mais recente de cada telefone. A normalização (normalize_phone) é feita em
+    Python sobre os telefones distintos do lote, não pedido a pedido.
+    """
+    latest = db.select(db.func.max(orders.c.id)).where(
+        *in_range(lo, hi), order_phone != ''
+    ).group_by(order_phone)
+    rows = migration.execute(
+        db.select(
+            order_phone.label('phone'), orders.c.customer_name,
+            orders.c.customer_email, orders.c.delivery_address
+        ).where(orders.c.id.in_(latest)).order_by(orders.c.id)
+    ).all()
+
+    # Formatos diferentes do mesmo telefone: vale o pedido mais recente
+    latest_by_key = {}
+    for row in rows:
+        key = normalize_phone(row.phone)
+        if key:
+            latest_by_key[key] = row
+
+    def customer_ids(keys):
+        return dict(migration.execute(
+            db.select(users.c.phone_normalized, users.c.id).where(users.c.phone_normalized.in_(keys))
+        ).all())
+
+    customers = customer_ids(list(latest_by_key))
+    now = datetime.utcnow()
+    new_customers = [{
+        'customer_phone': row.phone, 'phone_normalized': key, 'customer_name': row.customer_name,
+        'customer_email': row.customer_email, 'delivery_address': row.delivery_address,
+        'total_orders': 0, 'total_spent': 0.0, 'created_at': now, 'updated_at': now
+    } for key, row in latest_by_key.items() if key not in customers]
+    if new_customers:
+        migration.execute(users.insert(), new_customers)
+        customers.update(customer_ids([customer['phone_normalized'] for customer in new_customers]))
+        counts['created'] += len(new_customers)
+
+    links = [
+        {'phone': row.phone, 'customer_id': customers[normalize_phone(row.phone)]}
+        for row in rows if normalize_phone(row.phone)
+    ]
+    if not links:
+        return 0
+    return migration.execute(
+        orders.update().where(*in_range(lo, hi), order_phone == db.bindparam('phone'))
+        .values(user_id=db.bindparam('customer_id')),
+        links
+    ).rowcount
+
+def link_by_email(migration, lo, hi):
+    """Pedidos sem telefone: associa ao cliente com o mesmo email, se houver"""
+    customer_id = db.select(db.func.min(users.c.id)).where(
+        users.c.customer_email == orders.c.customer_email
+    ).scalar_subquery()
+    return migration.execute(
+        orders.update().where(
+            *in_range(lo, hi),
+            db.func.coalesce(order_phone, '') == '',
+            orders.c.customer_email.isnot(None), orders.c.customer_email != '',
+            customer_id.isnot(None)
+        ).values(user_id=customer_id)
+    ).rowcount
+
+def migrate_orders_to_users(migration):
+    """Cria clientes e associa os pedidos sem user_id, em lotes por id de pedido"""
+    without_user = migration.execute(db.select(db.func.count()).where(*WITHOUT_USER)).scalar()
+    print(f"📋 Pedidos sem usuário: {without_user}")
+
+    # Clientes antigos precisam do telefone normalizado (coluna, valores e
+    # índice único) para serem encontrados; no release de um banco antigo a
+    # coluna ainda não existe
+    migrate_phone_normalized(migration)
+
+    counts = {'created': 0}
+    linked = migration.run_batched(
+        'Associar pedidos pelo telefone', orders.c.id,
+        lambda lo, hi: link_by_phone(migration, lo, hi, counts), where=WITHOUT_USER
+    )
+    linked += migration.run_batched(
+        'Associar pedidos pelo email', orders.c.id,
+        lambda lo, hi: link_by_email(migration, lo, hi), where=WITHOUT_USER
+    )
+    migration.run('Recalcular estatísticas dos clientes', lambda: User.reconcile_stats(migration.connection))
+
+    print("-" * 60)
+    print(f"📦 Pedidos migrados: {linked}")
+    print(f"👤 Usuários criados: {counts['created']}")
+
+def migrate_railway_data(args):
     """Migra dados existentes do Railway para o novo modelo de usuários"""
     with app.app_context():
         print("🚀 Iniciando migração no Railway...")
         print("=" * 60)
 
-        # Verificar se há pedidos para migrar
-        total_orders = Order.query.count()
-        print(f"📊 Total de pedidos no banco: {total_orders}")
-
-        if total_orders == 0:
-            print("❌ Nenhum pedido encontrado para migrar!")
-            return
-
-        # Buscar pedidos que não têm user_id
-        orders_without_user = Order.query.filter(Order.user_id.is_(None)).all()
-        print(f"📋 Pedidos sem usuário: {len(orders_without_user)}")
-
-        if not orders_without_user:
-            print("✅ Todos os pedidos já estão migrados!")
-            return
-
-        print(f"🔄 Migrando {len(orders_without_user)} pedidos...")
-        print("-" * 60)
-
-        migrated_count = 0
-        users_created = 0
-        users_updated = 0
-
-        for order in orders_without_user:
-            try:
-                print(f"📦 Processando pedido #{order.id} - {order.customer_name}")
-
-                # Buscar ou criar usuário baseado no telefone ou email
-                user = None
-                customer_phone = order.customer_phone.strip() if order.customer_phone else ''
-                customer_email = order.customer_email.strip() if order.customer_email else ''
-
-                if customer_phone:
-                    user = User.query.filter_by(customer_phone=customer_phone).first()
-                    if user:
-                        print(f"  👤 Usuário encontrado por telefone: {user.customer_name}")
-
-                if not user and customer_email:
-                    user = User.query.filter_by(customer_email=customer_email).first()
-                    if user:
-                        print(f"  👤 Usuário encontrado por email: {user.customer_name}")
-
-                if user:
-                    # Atualizar informações do usuário existente
-                    user.customer_name = order.customer_name
-                    if customer_phone:
-                        user.customer_phone = customer_phone
-                    if customer_email:
-                        user.customer_email = customer_email
-                    if order.delivery_address:
-                        user.delivery_address = order.delivery_address
-                    users_updated += 1
-                    print(f"  ✅ Usuário atualizado: {user.customer_name}")
-                else:
-                    # Criar novo usuário
-                    user = User(
-                        customer_name=order.customer_name,
-                        customer_phone=customer_phone,
-                        customer_email=customer_email,
-                        delivery_address=order.delivery_address or '',
-                        total_orders=0,
-                        total_spent=0.0
-                    )
-                    db.session.add(user)
-                    db.session.flush()  # Para obter o ID do usuário
-                    users_created += 1
-                    print(f"  ✅ Novo usuário criado: {user.customer_name}")
-
-                # Associar pedido ao usuário
-                order.user_id = user.id
-                migrated_count += 1
-
-            except Exception as e:
-                print(f"  ❌ Erro ao migrar pedido #{order.id}: {str(e)}")
-                continue
-
-        # Commit das mudanças
-        try:
-            db.session.commit()
-            print("-" * 60)
-            print(f"✅ Migração concluída!")
-            print(f"📦 Pedidos migrados: {migrated_count}")
-            print(f"👤 Usuários criados: {users_created}")
-            print(f"👤 Usuários atualizados: {users_updated}")
-        except Exception as e:
-            db.session.rollback()
-            print(f"❌ Erro ao salvar migração: {str(e)}")
-            return
-
-        # Atualizar estatísticas de todos os usuários
-        update_user_statistics()
-
-def update_user_statistics():
-    """Atualiza as estatísticas de todos os usuários"""
-    print("\n📊 Atualizando estatísticas dos usuários...")
-    print("-" * 60)
-
-    try:
-        users = User.query.all()
-        updated_count = 0
-
-        for user in users:
-            try:
-                user.update_stats()
-                updated_count += 1
-                print(f"  ✅ {user.customer_name}: {user.total_orders} pedidos, R$ {user.total_spent:.2f}")
-            except Exception as e:
-                print(f"  ❌ Erro ao atualizar {user.customer_name}: {str(e)}")
-                continue
-
-        db.session.commit()
-        print(f"\n✅ Estatísticas atualizadas para {updated_count} usuários!")
-
-    except Exception as e:
-        db.session.rollback()
-        print(f"❌ Erro ao atualizar estatísticas: {str(e)}")
+        with BatchMigration('orders_to_users', args.batch_size, args.dry_run, args.restart) as migration:
+            migrate_orders_to_users(migration)
 
 def show_final_statistics():
     """Mostra estatísticas finais do sistema"""
@@ -167,6 +155,8 @@ def show_final_statistics():
         print(f"\n⚠️  ATENÇÃO: {orders_without_user} pedidos ainda não têm usuário associado!")
 
 if __name__ == '__main__':
+    args = migration_args('Associa pedidos antigos a clientes (em lotes, retomável)')
+
     print("🚀 Script de Migração Railway")
     print("=" * 60)
     print(f"⏰ Iniciado em: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
@@ -176,10 +166,11 @@ if __name__ == '__main__':
 
     try:
         # Migrar dados existentes
-        migrate_railway_data()
+        migrate_railway_data(args)
 
         # Mostrar estatísticas finais
-        show_final_statistics()
+        with app.app_context():
+            show_final_statistics()
 
         print("\n✅ Migração concluída com sucesso!")
         print("🎉 Agora você pode usar o histórico de clientes no admin!")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Script para criar o índice da busca de clientes (ver src/search.py).
+Idempotente; mostra o plano de execução da busca antes e depois.
+
+- PostgreSQL: extensão pg_trgm e índice GIN ix_user_search_trgm, criado com
+  CONCURRENTLY (não bloqueia escritas em "user")
+- SQLite: tabela FTS5 user_search (tokenizer trigram), triggers que a mantêm
+  sincronizada com "user" e carga inicial
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from src.main import app
+from src.models.user import db, User
+from src.search import FTS_COLUMNS, FTS_TABLE, TRIGRAM_INDEX, apply_search, build_document
+
+def trigram_index_ddl():
+    """CREATE INDEX com a mesma expressão usada nas consultas"""
+    document = build_document([db.column(name, db.String) for name in FTS_COLUMNS])
+    expression = document.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True})
+    return (f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {TRIGRAM_INDEX} '
+            f'ON "user" USING gin (({expression}) gin_trgm_ops)')
+
+def fts_triggers():
+    columns = ', '.join(FTS_COLUMNS)
+    values = ', '.join(f'new.{name}' for name in FTS_COLUMNS)
+    return {
+        f'{FTS_TABLE}_ai': f'''
+            CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON "user" BEGIN
+                INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {values});
+            END''',
+        f'{FTS_TABLE}_au': f'''
+            CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {columns}, id ON "user" BEGIN
+                DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+                INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {values});
+            END''',
+        f'{FTS_TABLE}_ad': f'''
+            CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON "user" BEGIN
+                DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+            END''',
+    }
+
+def create_search_index(engine):
+    """Cria o índice de busca do dialeto atual"""
+    if engine.dialect.name == 'postgresql':
+        # CONCURRENTLY não pode rodar dentro de uma transação
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            print("  ➕ Extensão pg_trgm...")
+            conn.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            print(f"  ➕ Índice '{TRIGRAM_INDEX}'...")
+            conn.execute(text(trigram_index_ddl()))
+            conn.execute(text('ANALYZE "user"'))
+        print(f"  ✅ Índice '{TRIGRAM_INDEX}' pronto")
+        return
+
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+        ).scalar()
+        if exists:
+            print(f"  ✅ Tabela '{FTS_TABLE}' já existe")
+        else:
+            print(f"  ➕ Criando tabela FTS5 '{FTS_TABLE}'...")
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({', '.join(FTS_COLUMNS)}, tokenize='trigram')"
+            ))
+            columns = ', '.join(FTS_COLUMNS)
+            conn.execute(text(f'INSERT INTO {FTS_TABLE}(rowid, {columns}) SELECT id, {columns} FROM "user"'))
+            print(f"  ✅ Tabela '{FTS_TABLE}' criada e carregada")
+        for name, ddl in fts_triggers().items():
+            conn.execute(text(ddl))
+        print("  ✅ Triggers de sincronização prontos")
+
+def drop_search_index(engine):
+    """Remove o índice de busca (usado pelo benchmark para medir sem índice)"""
+    if engine.dialect.name == 'postgresql':
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {TRIGRAM_INDEX}'))
+        return
+    with engine.begin() as conn:
+        for name in fts_triggers():
+            conn.execute(text(f'DROP TRIGGER IF EXISTS {name}'))
+        conn.execute(text(f'DROP TABLE IF EXISTS {FTS_TABLE}'))
+
+def show_plan(title, term='silva'):
+    print(f"\n📐 Plano de execução da busca ({title}):")
+    query, rank = apply_search(User.query, term)
+    if rank is not None:
+        query = query.order_by(rank)
+    stmt = query.limit(100).statement
+    sql = str(stmt.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    prefix = 'EXPLAIN QUERY PLAN ' if db.engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    for row in db.session.execute(text(prefix + sql)).fetchall():
+        print(f"     {row[-1]}")
+    db.session.rollback()
+
+if __name__ == '__main__':
+    with app.app_context():
+        print("🚀 Script do Índice de Busca de Clientes")
+        print("=" * 50)
+
+        try:
+            show_plan('antes')
+            create_search_index(db.engine)
+            show_plan('depois')
+            print("\n✅ Processo concluído!")
+        except Exception as e:
+            print(f"❌ Erro durante a migração: {str(e)}")
+            sys.exit(1)
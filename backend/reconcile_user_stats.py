@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Script para reconciliar total_orders/total_spent de todos os clientes com os
+pedidos (não cancelados). As estatísticas são mantidas por deltas a cada
+pedido; este script corrige eventuais divergências com um único UPDATE
+agrupado, sem percorrer cliente por cliente.
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.models.user import db, User
+
+if __name__ == '__main__':
+    with app.app_context():
+        print("🚀 Reconciliação das estatísticas de clientes")
+        print("=" * 50)
+
+        try:
+            updated_count = User.reconcile_stats()
+            db.session.commit()
+            print(f"✅ Estatísticas corrigidas para {updated_count} clientes!")
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Erro durante a reconciliação: {str(e)}")
+            sys.exit(1)
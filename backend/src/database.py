@@ -0,0 +1,146 @@
+"""
+Configuração do engine do SQLAlchemy a partir de variáveis de ambiente.
+
+Variáveis (todas opcionais):
+- DB_POOL_SIZE / DB_MAX_OVERFLOW: tamanho do pool por worker (padrão conforme
+  GUNICORN_WORKER_CLASS: sync 2+3, gevent 10+10)
+- DB_POOL_TIMEOUT: segundos esperando uma conexão livre antes de erro (10)
+- DB_POOL_RECYCLE: recicla conexões mais antigas que N segundos (300), antes
+  que o proxy do Railway derrube conexões ociosas
+- DB_POOL_PRE_PING: testa a conexão ao retirá-la do pool (true)
+- DB_STATEMENT_TIMEOUT_MS: statement_timeout do PostgreSQL (30000, 0 desativa)
+- DB_PREPARE_THRESHOLD: prepared statements no servidor (driver psycopg 3);
+  "off" desativa, necessário atrás de PgBouncer em modo transaction
+"""
+
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ['true', '1', 'yes']
+
+class PoolStats:
+    """Contadores de uso do pool deste processo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.invalidated = 0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_invalidated(self):
+        with self._lock:
+            self.invalidated += 1
+
+pool_stats = PoolStats()
+
+class TimedQueuePool(QueuePool):
+    """QueuePool que mede o tempo de espera por uma conexão livre"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record_wait(time.perf_counter() - start)
+        return connection
+
+def engine_options_from_env(database_uri):
+    """Monta SQLALCHEMY_ENGINE_OPTIONS a partir do ambiente"""
+    if os.environ.get('GUNICORN_WORKER_CLASS', 'sync') == 'gevent':
+        default_pool_size, default_max_overflow = 10, 10
+    else:
+        default_pool_size, default_max_overflow = 2, 3
+
+    url = make_url(database_uri)
+    options = {
+        'pool_pre_ping': env_bool('DB_POOL_PRE_PING', True),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '300')),
+    }
+
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # SQLite em memória usa um pool próprio, sem os parâmetros de fila
+        return options
+
+    options.update({
+        'poolclass': TimedQueuePool,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', default_pool_size)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', default_max_overflow)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+    })
+
+    if url.get_backend_name() == 'postgresql':
+        connect_args = {}
+        statement_timeout = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', '30000'))
+        if statement_timeout:
+            connect_args['options'] = f'-c statement_timeout={statement_timeout}'
+
+        prepare_threshold = os.environ.get('DB_PREPARE_THRESHOLD')
+        if prepare_threshold is not None and url.get_driver_name() == 'psycopg':
+            connect_args['prepare_threshold'] = None if prepare_threshold == 'off' else int(prepare_threshold)
+
+        if connect_args:
+            options['connect_args'] = connect_args
+
+    return options
+
+def init_engine(app, db):
+    """Instrumenta o pool e descarta conexões herdadas após o fork"""
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        pool_stats.record_invalidated()
+
+    def after_fork():
+        # Com preload_app o processo mestre pode ter aberto conexões (create_all);
+        # o filho não pode reutilizá-las, então o pool é recriado sem fechá-las
+        engine.dispose(close=False)
+        pool_stats.reset()
+
+    os.register_at_fork(after_in_child=after_fork)
+
+def pool_metrics(engine):
+    """Estado atual do pool e contadores acumulados deste worker"""
+    pool = engine.pool
+    metrics = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        metrics.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+        })
+    metrics.update({
+        'checkouts': pool_stats.checkouts,
+        'timeouts': pool_stats.timeouts,
+        'invalidated': pool_stats.invalidated,
+        'wait_avg_ms': round(pool_stats.wait_total / pool_stats.checkouts * 1000, 3) if pool_stats.checkouts else 0.0,
+        'wait_max_ms': round(pool_stats.wait_max * 1000, 3),
+    })
+    return metrics
@@ -0,0 +1,187 @@
+"""
+Notificações de mudança de pedidos para o stream SSE (/api/events).
+
+As rotas chamam emit_order_event() antes do commit; os eventos ficam
+pendentes na sessão e só são publicados se a transação for confirmada.
+
+Backends (EVENTS_BACKEND):
+- memory: fan-out dentro do processo, para um único worker
+- postgres: LISTEN/NOTIFY, para vários workers/instâncias. O NOTIFY é emitido
+  dentro da transação, então o PostgreSQL só entrega após o commit.
+
+Ambos usam apenas primitivas de threading/select, que funcionam tanto com
+workers sync quanto com gevent (monkey patching).
+
+Se a conexão do LISTEN cair, a thread reconecta e publica um evento RESYNC:
+os eventos do intervalo se perderam e quem mantém estado derivado deles
+(fila da cozinha, clientes SSE) deve recarregar do banco.
+"""
+
+import json
+import logging
+import select
+import threading
+import time
+from collections import deque
+from sqlalchemy import event, text
+
+PG_CHANNEL = 'order_events'
+
+# Evento local (sem pedido) publicado quando eventos podem ter sido perdidos
+RESYNC = 'resync'
+
+# Espera máxima (segundos) entre tentativas de reconectar o LISTEN
+LISTEN_MAX_RETRY = 30
+
+logger = logging.getLogger(__name__)
+
+# Campos do pedido enviados em cada delta (o payload do NOTIFY é limitado a 8000 bytes)
+DELTA_FIELDS = [
+    'id', 'user_id', 'order_type', 'status', 'payment_status', 'total_amount',
+    'is_comanda', 'mesa', 'status_comanda'
+]
+
+class InMemoryBroker:
+    """Fan-out em memória com histórico curto para reconexão via Last-Event-ID"""
+
+    def __init__(self, history=1000):
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=history)
+        self._last_id = 0
+        self._subscribers = []
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def subscribe(self, callback):
+        """Registra callback(payload), chamado a cada evento publicado neste processo"""
+        self._subscribers.append(callback)
+
+    def publish(self, payload):
+        with self._cond:
+            self._last_id += 1
+            self._events.append((self._last_id, payload))
+            self._cond.notify_all()
+        for callback in self._subscribers:
+            callback(payload)
+
+    def publish_pending(self, session, payloads):
+        """Chamado após o commit com os eventos da transação"""
+        for payload in payloads:
+            self.publish(payload)
+
+    def wait(self, after_id, timeout):
+        """Retorna os eventos com id > after_id, aguardando até timeout segundos"""
+        with self._cond:
+            if self._last_id <= after_id:
+                self._cond.wait(timeout)
+            return [(event_id, payload) for event_id, payload in self._events if event_id > after_id]
+
+    def start(self, engine):
+        pass
+
+class PostgresBroker(InMemoryBroker):
+    """Fan-out entre workers via LISTEN/NOTIFY, repassado ao broker local de cada processo"""
+
+    def __init__(self, history=1000):
+        super().__init__(history)
+        self._listener = None
+        self._start_lock = threading.Lock()
+
+    def notify_pending(self, session, payloads):
+        """Chamado antes do commit: o NOTIFY faz parte da transação"""
+        for payload in payloads:
+            session.execute(text('SELECT pg_notify(:channel, :payload)'),
+                            {'channel': PG_CHANNEL, 'payload': json.dumps(payload)})
+
+    def publish_pending(self, session, payloads):
+        # Os eventos voltam pelo LISTEN, inclusive para este processo
+        pass
+
+    def start(self, engine):
+        """Inicia a thread de LISTEN deste processo (após o fork do gunicorn)"""
+        with self._start_lock:
+            if self._listener and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen, args=(engine,), daemon=True)
+            self._listener.start()
+
+    def _listen(self, engine):
+        """Mantém o LISTEN, reconectando com backoff quando a conexão cai"""
+        retry, connected_before = 1, False
+        while True:
+            conn = None
+            try:
+                raw = engine.raw_connection()
+                raw.detach()  # conexão dedicada, fora do pool
+                conn = raw.driver_connection
+                conn.autocommit = True
+                conn.cursor().execute(f'LISTEN {PG_CHANNEL}')
+                if connected_before:
+                    logger.info('LISTEN %s reconectado', PG_CHANNEL)
+                    self.publish({'type': RESYNC, 'order': None})
+                retry, connected_before = 1, True
+                self._receive(conn)
+            except Exception:
+                logger.exception('Conexão do LISTEN %s caiu; nova tentativa em %ss', PG_CHANNEL, retry)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            time.sleep(retry)
+            retry = min(retry * 2, LISTEN_MAX_RETRY)
+
+    def _receive(self, conn):
+        while True:
+            if select.select([conn], [], [], 60) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                notification = conn.notifies.pop(0)
+                self.publish(json.loads(notification.payload))
+
+_broker = None
+
+def get_broker(app):
+    global _broker
+    if _broker is None:
+        if app.config['EVENTS_BACKEND'] == 'postgres':
+            _broker = PostgresBroker()
+        else:
+            _broker = InMemoryBroker()
+    return _broker
+
+def order_delta(kind, order):
+    payload = {field: getattr(order, field) for field in DELTA_FIELDS}
+    payload['updated_at'] = order.updated_at.isoformat() if order.updated_at else None
+    return {'type': kind, 'order': payload}
+
+def emit_order_event(session, kind, order):
+    """Registra um evento do pedido para publicação após o commit.
+
+    Chamar depois do flush (o pedido precisa ter id) e antes do commit.
+    """
+    session.info.setdefault('order_events', []).append(order_delta(kind, order))
+
+def init_events(app, db):
+    """Liga a publicação de eventos ao ciclo de commit da sessão"""
+    broker = get_broker(app)
+
+    @event.listens_for(db.session, 'before_commit')
+    def before_commit(session):
+        payloads = session.info.get('order_events')
+        if payloads and isinstance(broker, PostgresBroker):
+            broker.notify_pending(session, payloads)
+
+    @event.listens_for(db.session, 'after_commit')
+    def after_commit(session):
+        payloads = session.info.pop('order_events', None)
+        if payloads:
+            broker.publish_pending(session, payloads)
+
+    @event.listens_for(db.session, 'after_rollback')
+    def after_rollback(session):
+        session.info.pop('order_events', None)
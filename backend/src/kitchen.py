@@ -0,0 +1,159 @@
+"""
+Fila da cozinha (GET /api/kitchen/queue), mantida em memória por processo.
+
+A fila guarda só os pedidos em andamento (pendente, preparando, pronto), já
+ordenados por prioridade do tipo de pedido e idade, com o que a cozinha usa:
+nome e quantidade dos itens, observações e mesa. É carregada do banco uma vez
+e depois atualizada pelos eventos de pedido (src/events.py) publicados após
+o commit em create_order, update_order_status e no encerramento de comandas.
+
+Eventos só marcam pedidos como alterados; os dados são lidos do banco na
+próxima consulta à fila, em lote, fora do lock (os eventos continuam sendo
+aplicados durante a leitura). Com EVENTS_BACKEND=postgres todos os workers
+recebem os eventos via LISTEN/NOTIFY; com 'memory' cada worker só vê os
+próprios, então a fila também é recarregada por inteiro a cada
+KITCHEN_RESYNC_INTERVAL segundos (padrão curto nesse caso, ver main.py).
+"""
+
+import bisect
+import threading
+import time
+from src.models.user import db
+from src.models.order import Order, OrderItem
+from src.models.menu import MenuItem
+from src.events import RESYNC
+
+KITCHEN_STATUSES = ['pendente', 'preparando', 'pronto']
+
+# Menor valor sai primeiro; dentro do mesmo tipo, o pedido mais antigo
+TYPE_PRIORITY = {'delivery': 0, 'local': 1, 'comanda': 1}
+
+# Eventos que mudam itens, observações ou cliente do pedido: o pedido é
+# relido do banco. Os demais (status, pagamento) só mudam o status
+RELOAD_EVENTS = ('order.created', 'order.items_added', 'order.updated')
+
+def sort_key(entry):
+    return (TYPE_PRIORITY.get(entry['order_type'], len(TYPE_PRIORITY)), entry['created_at'], entry['id'])
+
+def load_entries(order_ids=None):
+    """Pedidos da cozinha (todos, ou só order_ids) com itens: duas consultas"""
+    query = db.session.query(
+        Order.id, Order.status, Order.order_type, Order.mesa, Order.customer_name,
+        Order.notes, Order.created_at
+    ).filter(Order.status.in_(KITCHEN_STATUSES))
+    if order_ids is not None:
+        query = query.filter(Order.id.in_(order_ids))
+
+    entries = {
+        row.id: {
+            'id': row.id,
+            'status': row.status,
+            'order_type': row.order_type,
+            'mesa': row.mesa,
+            'customer_name': row.customer_name,
+            'notes': row.notes,
+            'created_at': row.created_at.isoformat() if row.created_at else '',
+            'items': []
+        }
+        for row in query
+    }
+    if entries:
+        items = db.session.query(
+            OrderItem.order_id, MenuItem.name, OrderItem.quantity, OrderItem.notes
+        ).join(MenuItem, MenuItem.id == OrderItem.menu_item_id).filter(
+            OrderItem.order_id.in_(list(entries))
+        ).order_by(OrderItem.id)
+        for item in items:
+            entries[item.order_id]['items'].append(
+                {'name': item.name, 'quantity': item.quantity, 'notes': item.notes or None}
+            )
+    return entries
+
+class KitchenQueue:
+    """Pedidos em andamento ordenados por sort_key, com atualização incremental"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._keys = []  # sort_key de cada pedido, em ordem
+        self._dirty = set()
+        self._loaded_at = None
+        # Um set por leitura do banco em andamento: ids alterados durante ela
+        self._reads = []
+        self._resyncs = 0
+
+    def _remove(self, order_id):
+        entry = self._entries.pop(order_id, None)
+        if entry:
+            key = sort_key(entry)
+            del self._keys[bisect.bisect_left(self._keys, key)]
+
+    def _put(self, entry):
+        self._remove(entry['id'])
+        self._entries[entry['id']] = entry
+        bisect.insort(self._keys, sort_key(entry))
+
+    def apply(self, payload):
+        """Aplica um evento de pedido (callback do broker; sem acesso ao banco)"""
+        order = payload['order']
+        with self._lock:
+            if payload['type'] == RESYNC:
+                self._loaded_at = None
+                self._resyncs += 1
+                return
+            for changed in self._reads:
+                changed.add(order['id'])
+            if order['status'] not in KITCHEN_STATUSES:
+                self._remove(order['id'])
+                self._dirty.discard(order['id'])
+            elif order['id'] in self._entries and payload['type'] not in RELOAD_EVENTS:
+                self._entries[order['id']]['status'] = order['status']
+            else:
+                self._dirty.add(order['id'])
+
+    def snapshot(self, resync_interval):
+        """Fila atual em ordem, recarregando do banco o que for preciso.
+
+        A leitura do banco é feita fora do lock e o resultado trocado depois;
+        pedidos alterados durante a leitura voltam a ficar marcados e são
+        relidos na próxima consulta.
+        """
+        with self._lock:
+            full = self._loaded_at is None or time.monotonic() - self._loaded_at > resync_interval
+            dirty, self._dirty = (set() if full else self._dirty), set()
+            if not full and not dirty:
+                return [self._entries[key[-1]] for key in self._keys]
+            changed, resyncs = set(), self._resyncs
+            self._reads.append(changed)
+
+        started = time.monotonic()
+        try:
+            loaded = load_entries(None if full else dirty)
+        except Exception:
+            with self._lock:
+                self._reads.remove(changed)
+                self._dirty |= dirty
+            raise
+
+        with self._lock:
+            self._reads.remove(changed)
+            if full:
+                self._entries, self._keys = {}, []
+                for entry in loaded.values():
+                    self._put(entry)
+                # Um RESYNC durante a leitura pede outra recarga completa
+                self._loaded_at = started if resyncs == self._resyncs else None
+            else:
+                for order_id in dirty - changed:
+                    if order_id in loaded:
+                        self._put(loaded[order_id])
+                    else:
+                        self._remove(order_id)
+            self._dirty |= changed
+            return [self._entries[key[-1]] for key in self._keys]
+
+kitchen_queue = KitchenQueue()
+
+def init_kitchen(broker):
+    """Liga a fila aos eventos de pedido deste processo"""
+    broker.subscribe(kitchen_queue.apply)
@@ -9,6 +9,15 @@ from src.models.user import db
 from src.routes.user import user_bp
 from src.routes.menu import menu_bp
 from src.routes.order import order_bp
+from src.routes.events import events_bp
+from src.routes.report import report_bp
+from src.routes.export import export_bp
+from src.routes.kitchen import kitchen_bp
+from src.events import get_broker, init_events
+from src.kitchen import init_kitchen
+from src.database import engine_options_from_env, init_engine, pool_metrics
+from src.metrics import init_metrics
+from src.profiling import init_profiling, profiling_bp
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
@@ -29,6 +38,11 @@ CORS(app, origins=[
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(menu_bp, url_prefix='/api')
 app.register_blueprint(order_bp, url_prefix='/api')
+app.register_blueprint(events_bp, url_prefix='/api')
+app.register_blueprint(report_bp, url_prefix='/api')
+app.register_blueprint(export_bp, url_prefix='/api')
+app.register_blueprint(kitchen_bp, url_prefix='/api')
+app.register_blueprint(profiling_bp, url_prefix='/api')
 
 # Configuração do banco de dados
 if os.environ.get('DATABASE_URL'):
@@ -37,11 +51,69 @@ else:
     app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Pool de conexões, pre-ping, recycle e timeouts (ver src/database.py)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_from_env(app.config['SQLALCHEMY_DATABASE_URI'])
+
+# Tempo (segundos) que cada worker mantém em cache as estatísticas do painel
+app.config['STATS_CACHE_TTL'] = float(os.environ.get('STATS_CACHE_TTL', '5'))
+
+# Validade (segundos) das chaves Idempotency-Key de POST /api/orders (padrão 24h)
+app.config['IDEMPOTENCY_KEY_TTL'] = float(os.environ.get('IDEMPOTENCY_KEY_TTL', '86400'))
+
+# Intervalo (segundos) para cada worker conferir no banco a versão do cardápio
+app.config['MENU_CACHE_CHECK_INTERVAL'] = float(os.environ.get('MENU_CACHE_CHECK_INTERVAL', '2'))
+
+# Atraso (segundos) do watermark de /api/orders/changes em relação ao relógio:
+# maior que a duração das transações de escrita de pedidos
+app.config['ORDER_CHANGES_LAG'] = float(os.environ.get('ORDER_CHANGES_LAG', '5'))
+
+# Stream de eventos de pedidos (/api/events): 'memory' (um processo) ou 'postgres' (LISTEN/NOTIFY)
+app.config['EVENTS_BACKEND'] = os.environ.get('EVENTS_BACKEND', 'memory')
+# SSE ligado: 'auto' só com workers gevent ou EVENTS_BACKEND=postgres (com workers
+# sync cada stream ocupa um worker; com 'memory' cada worker só vê os próprios
+# eventos). Desligado, os painéis consultam /api/orders/changes a cada
+# EVENTS_POLL_INTERVAL segundos
+app.config['EVENTS_SSE'] = os.environ.get('EVENTS_SSE', 'auto').lower()
+app.config['EVENTS_SSE_ENABLED'] = (
+    app.config['EVENTS_SSE'] in ['true', '1', 'yes'] or
+    (app.config['EVENTS_SSE'] == 'auto' and (
+        os.environ.get('GUNICORN_WORKER_CLASS') == 'gevent' or app.config['EVENTS_BACKEND'] == 'postgres'
+    ))
+)
+app.config['EVENTS_POLL_INTERVAL'] = float(os.environ.get('EVENTS_POLL_INTERVAL', '5'))
+app.config['EVENTS_KEEPALIVE'] = float(os.environ.get('EVENTS_KEEPALIVE', '15'))
+# Duração máxima de cada conexão SSE; manter abaixo do timeout do gunicorn em workers sync
+app.config['EVENTS_STREAM_TIMEOUT'] = float(os.environ.get('EVENTS_STREAM_TIMEOUT', '25'))
+
+# Fila da cozinha (ver src/kitchen.py): recarga completa do banco a cada N segundos.
+# Com o broker em memória cada worker não vê os eventos dos outros, então a
+# fila só vale por poucos segundos
+app.config['KITCHEN_RESYNC_INTERVAL'] = float(os.environ.get(
+    'KITCHEN_RESYNC_INTERVAL', '60' if app.config['EVENTS_BACKEND'] == 'postgres' else '3'
+))
+
+# Profiling sob demanda (ver src/profiling.py); ajustável em PUT /api/admin/profiling
+app.config['PROFILING_ENABLED'] = os.environ.get('PROFILING_ENABLED', 'false').lower() in ['true', '1', 'yes']
+app.config['PROFILING_CONFIG_FILE'] = os.environ.get('PROFILING_CONFIG_FILE', '/tmp/restaurante-profiling.json')
+# Diretório das pilhas amostradas; fixo, não pode ser alterado pela API
+app.config['PROFILING_OUTPUT_DIR'] = os.environ.get('PROFILING_OUTPUT_DIR', '/tmp/profiles')
+# Token das rotas /api/admin/* (header Authorization: Bearer <token>); vazio bloqueia as rotas
+app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN', '')
 db.init_app(app)
+init_engine(app, db)
+init_events(app, db)
+init_kitchen(get_broker(app))
+init_metrics(app, db)
+init_profiling(app)
 
 # Importar todos os modelos para que sejam criados no banco
 from src.models.menu import MenuItem
 from src.models.order import Order, OrderItem
+from src.models.cache import CacheVersion
+from src.models.report import DailySales, DailyOrders
+from src.models.migration import MigrationCheckpoint
+from src.models.idempotency import IdempotencyKey
 
 with app.app_context():
     db.create_all()
@@ -150,6 +222,10 @@ def serve_restaurant(path='index.html'):
 def health_check():
     return {'status': 'healthy', 'message': 'API is running'}
 
+@app.route('/health/pool')
+def pool_health():
+    return {'status': 'healthy', 'pool': pool_metrics(db.engine)}
+
 # Rota para servir arquivos estáticos (deve vir depois das rotas da API)
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
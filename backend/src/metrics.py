@@ -0,0 +1,173 @@
+"""
+Métricas no formato Prometheus (GET /metrics).
+
+Por requisição: latência e contagem por blueprint/rota/status, número e tempo
+das consultas SQL, tempo de serialização JSON e bytes de resposta.
+
+Com vários workers do gunicorn, defina PROMETHEUS_MULTIPROC_DIR (o
+gunicorn.conf.py já define um padrão): cada worker grava suas métricas em
+arquivos nesse diretório e /metrics agrega todos, independente de qual
+worker atendeu a coleta.
+
+Sem o pacote prometheus_client as métricas viram no-ops e /metrics responde
+503; a contagem de consultas por requisição (usada pelo profiling) continua.
+"""
+
+import os
+import time
+from flask import Response, g, has_app_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+class NullMetric:
+    """Métrica sem efeito, usada quando prometheus_client não está instalado"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+if prometheus_client is not None:
+    from prometheus_client import Counter, Gauge, Histogram
+else:
+    Counter = Gauge = Histogram = NullMetric
+
+LABELS = ['blueprint', 'endpoint', 'method']
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Latência das requisições HTTP', LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUEST_COUNT = Counter('http_requests_total', 'Requisições HTTP por status', LABELS + ['status'])
+RESPONSE_BYTES = Histogram(
+    'http_response_bytes', 'Tamanho das respostas HTTP', LABELS,
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+)
+DB_QUERIES = Histogram(
+    'db_queries_per_request', 'Consultas SQL por requisição', LABELS,
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+)
+DB_QUERY_TIME = Histogram(
+    'db_query_duration_seconds_per_request', 'Tempo total em SQL por requisição', LABELS,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+DB_QUERIES_TOTAL = Counter('db_queries_total', 'Consultas SQL executadas', LABELS)
+SERIALIZATION_TIME = Histogram(
+    'json_serialization_seconds', 'Tempo de serialização JSON por requisição', LABELS,
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+)
+POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out', 'Conexões do pool em uso', multiprocess_mode='livesum'
+)
+
+def record_serialization(seconds):
+    """Acumula tempo de serialização na requisição atual"""
+    if has_app_context() and 'metrics_start' in g:
+        g.serialization_time += seconds
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Provider JSON do Flask que mede o tempo gasto em jsonify"""
+
+    def dumps(self, obj, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            record_serialization(time.perf_counter() - start)
+
+def request_labels():
+    return {
+        'blueprint': request.blueprint or '',
+        'endpoint': request.endpoint or 'none',
+        'method': request.method
+    }
+
+def metrics_registry():
+    """Registro a expor: agregado entre workers em modo multiprocesso"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+def init_metrics(app, db):
+    """Registra os hooks de requisição e de SQL e a rota /metrics"""
+    app.json = TimedJSONProvider(app)
+    if prometheus_client is None:
+        app.logger.warning('prometheus_client não instalado: /metrics desativado')
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+        if context is not None:
+            context.query_started = True
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        if context is not None:
+            context.query_started = False
+        if has_app_context() and 'metrics_start' in g:
+            g.query_count += 1
+            g.query_time += elapsed
+            for listener in g.query_listeners:
+                listener(statement, elapsed, cursor.rowcount)
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(context):
+        # Statement que falhou não chega ao after_cursor_execute: descarta o início dele
+        if getattr(context.execution_context, 'query_started', False):
+            context.connection.info['query_start'].pop()
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        g.query_count = 0
+        g.query_time = 0.0
+        g.serialization_time = 0.0
+        # Outros módulos (ex.: profiling) podem observar cada consulta da requisição
+        g.query_listeners = []
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_start' not in g or request.endpoint == 'metrics':
+            return response
+
+        labels = request_labels()
+        REQUEST_LATENCY.labels(**labels).observe(time.perf_counter() - g.metrics_start)
+        REQUEST_COUNT.labels(status=str(response.status_code), **labels).inc()
+        DB_QUERIES.labels(**labels).observe(g.query_count)
+        DB_QUERY_TIME.labels(**labels).observe(g.query_time)
+        DB_QUERIES_TOTAL.labels(**labels).inc(g.query_count)
+        SERIALIZATION_TIME.labels(**labels).observe(g.serialization_time)
+        if not response.is_streamed:
+            RESPONSE_BYTES.labels(**labels).observe(response.calculate_content_length() or 0)
+        POOL_CHECKED_OUT.set(engine.pool.checkedout() if hasattr(engine.pool, 'checkedout') else 0)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        if prometheus_client is None:
+            return Response('prometheus_client não instalado\n', status=503, mimetype='text/plain')
+        return Response(
+            prometheus_client.generate_latest(metrics_registry()), mimetype=prometheus_client.CONTENT_TYPE_LATEST
+        )
@@ -0,0 +1,27 @@
+from src.models.user import db
+from src.utils.query import insert_on_conflict
+
+class CacheVersion(db.Model):
+    """Contador de versão compartilhado entre workers para invalidar caches locais"""
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CacheVersion {self.name}={self.version}>'
+
+    @classmethod
+    def get(cls, name):
+        """Retorna a versão atual (0 se ainda não existir)"""
+        return db.session.query(cls.version).filter_by(name=name).scalar() or 0
+
+    @classmethod
+    def bump(cls, name):
+        """Incrementa a versão na transação atual.
+
+        INSERT ... ON CONFLICT DO UPDATE: o primeiro bump de dois workers ao
+        mesmo tempo não falha na chave primária.
+        """
+        stmt = insert_on_conflict(cls).values(name=name, version=1)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['name'], set_={'version': cls.__table__.c.version + 1}
+        ))
@@ -0,0 +1,67 @@
+import time
+from datetime import datetime, timedelta
+from src.models.user import db
+from src.utils.query import insert_on_conflict
+
+# Intervalo mínimo (segundos) entre duas limpezas de chaves vencidas por processo
+PURGE_INTERVAL = 300
+
+_last_purge = 0.0
+
+class IdempotencyKey(db.Model):
+    """Resposta de um POST enviado com o cabeçalho Idempotency-Key.
+
+    A chave é reservada no início da requisição e a resposta é gravada na
+    mesma transação do pedido: um reenvio da mesma chave recebe a resposta
+    guardada sem criar outro pedido. Se a requisição falha, o rollback libera
+    a chave. Chaves valem por IDEMPOTENCY_KEY_TTL segundos.
+    """
+    __tablename__ = 'idempotency_key'
+
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)  # sha256 do corpo da requisição
+    status_code = db.Column(db.Integer)
+    response = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key} {self.status_code}>'
+
+    @classmethod
+    def claim(cls, key, request_hash):
+        """Reserva a chave com INSERT ... ON CONFLICT DO NOTHING.
+
+        Retorna None se a chave foi reservada por esta transação, ou a linha
+        já gravada. No PostgreSQL uma requisição simultânea com a mesma chave
+        espera o commit (ou rollback) da primeira antes de decidir.
+        """
+        claimed = db.session.execute(
+            insert_on_conflict(cls).values(
+                key=key, request_hash=request_hash, created_at=datetime.utcnow()
+            ).on_conflict_do_nothing().returning(cls.key)
+        ).scalar()
+        if claimed is not None:
+            return None
+        return db.session.get(cls, key, populate_existing=True)
+
+    @classmethod
+    def save_response(cls, key, status_code, response):
+        """Grava a resposta da chave reservada (antes do commit da requisição)"""
+        db.session.execute(
+            db.update(cls).where(cls.key == key).values(status_code=status_code, response=response)
+        )
+
+    @classmethod
+    def purge_expired(cls, ttl):
+        """Remove as chaves vencidas, no máximo a cada PURGE_INTERVAL segundos por processo.
+
+        Roda em uma transação própria, independente do resultado da requisição.
+        """
+        global _last_purge
+        if time.monotonic() - _last_purge < PURGE_INTERVAL:
+            return 0
+        _last_purge = time.monotonic()
+        with db.engine.begin() as connection:
+            return connection.execute(
+                db.delete(cls).where(cls.created_at < datetime.utcnow() - timedelta(seconds=ttl))
+            ).rowcount
@@ -0,0 +1,14 @@
+from src.models.user import db
+from datetime import datetime
+
+class MigrationCheckpoint(db.Model):
+    """Último id processado por etapa de migração em lotes (para retomar)"""
+    __tablename__ = 'migration_checkpoint'
+
+    name = db.Column(db.String(100), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    rows = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<MigrationCheckpoint {self.name}={self.last_id}>'
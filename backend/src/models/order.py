@@ -1,5 +1,33 @@
 from src.models.user import db
 from datetime import datetime
+from sqlalchemy.orm import selectinload
+from src.utils.query import insert_on_conflict
+
+ORDER_TYPES = ['delivery', 'local', 'comanda']
+ORDER_STATUSES = ['pendente', 'preparando', 'pronto', 'entregue', 'cancelado']
+COMANDA_STATUSES = ['aberta', 'encerrada']
+PAYMENT_STATUSES = ['pago', 'nao_pago']
+# Status de um pedido em andamento (o "pedido atual" do cliente)
+ACTIVE_STATUSES = ['pendente', 'preparando']
+
+# Máquina de estados do pedido: para cada status, os status seguintes válidos.
+# A cozinha pode pular etapas (ex.: pendente direto para pronto), mas não
+# voltar; entregue é final e um cancelado só pode ser reaberto como pendente
+ORDER_TRANSITIONS = {
+    'pendente': {'preparando', 'pronto', 'entregue', 'cancelado'},
+    'preparando': {'pronto', 'entregue', 'cancelado'},
+    'pronto': {'entregue', 'cancelado'},
+    'entregue': set(),
+    'cancelado': {'pendente'},
+}
+COMANDA_TRANSITIONS = {
+    'aberta': {'encerrada'},
+    'encerrada': set(),
+}
+
+def can_transition(current, new, transitions=ORDER_TRANSITIONS):
+    """Se a máquina de estados permite ir de `current` para `new`"""
+    return new in transitions.get(current, ())
 
 class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -24,9 +52,74 @@ class Order(db.Model):
     # Relacionamento com itens do pedido
     items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
 
+    # Índices dos caminhos quentes (listagem, filtros do painel, histórico do
+    # cliente e comandas abertas). Em bancos existentes, criar com
+    # migrate_order_indexes.py, já que create_all não altera tabelas existentes.
+    __table_args__ = (
+        db.Index('ix_order_created_at_id', 'created_at', 'id'),
+        db.Index('ix_order_status_created_at', 'status', 'created_at'),
+        db.Index('ix_order_order_type_created_at', 'order_type', 'created_at'),
+        db.Index('ix_order_payment_status_created_at', 'payment_status', 'created_at'),
+        db.Index('ix_order_user_id_created_at', 'user_id', 'created_at'),
+        # Feed de mudanças (/api/orders/changes)
+        db.Index('ix_order_updated_at', 'updated_at'),
+        # Pedidos ativos por cliente (pedido atual no login por telefone)
+        db.Index(
+            'ix_order_user_ativos', 'user_id', 'created_at',
+            postgresql_where=status.in_(ACTIVE_STATUSES),
+            sqlite_where=status.in_(ACTIVE_STATUSES)
+        ),
+        # No máximo uma comanda aberta por mesa: garante que pedidos simultâneos
+        # na mesma mesa caiam na mesma comanda (ver create_order). Em bancos
+        # existentes, criar com migrate_comanda_unique.py
+        db.Index(
+            'ix_order_comanda_aberta', 'mesa', unique=True,
+            postgresql_where=(is_comanda == True) & (status_comanda == 'aberta'),
+            sqlite_where=(is_comanda == True) & (status_comanda == 'aberta')
+        ),
+    )
+
     def __repr__(self):
         return f'<Order {self.id} - {self.customer_name}>'
 
+    @staticmethod
+    def with_items():
+        """Opção de carregamento em lote de itens e itens do cardápio.
+
+        Usar em toda consulta cujo resultado será serializado com to_dict():
+        carrega pedidos, itens e itens do cardápio em 3 queries, independente
+        da quantidade de pedidos (em vez de 1 + N + N*M com lazy loading).
+        """
+        return selectinload(Order.items).selectinload(OrderItem.menu_item)
+
+    @classmethod
+    def add_to_open_comanda(cls, mesa, amount):
+        """Soma `amount` ao total da comanda aberta da mesa com UPDATE atômico.
+
+        Retorna o id da comanda, ou None se a mesa não tem comanda aberta. No
+        PostgreSQL o UPDATE trava a linha até o commit, então lançamentos
+        simultâneos na mesma mesa são aplicados um depois do outro.
+        """
+        return db.session.execute(
+            db.update(cls).where(
+                cls.mesa == mesa, cls.is_comanda == True, cls.status_comanda == 'aberta'
+            ).values(total_amount=cls.total_amount + amount)
+            .returning(cls.id)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+
+    @classmethod
+    def open_comanda(cls, values):
+        """Cria a comanda com INSERT ... ON CONFLICT DO NOTHING.
+
+        Retorna o id da nova comanda, ou None se outra requisição abriu uma
+        comanda para a mesma mesa ao mesmo tempo (índice único
+        ix_order_comanda_aberta).
+        """
+        return db.session.execute(
+            insert_on_conflict(cls).values(**values).on_conflict_do_nothing().returning(cls.id)
+        ).scalar()
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -48,10 +141,62 @@ class Order(db.Model):
             'items': [item.to_dict() for item in self.items]
         }
 
+class OrderStatusEvent(db.Model):
+    """Histórico append-only das transições de status (pedido e comanda).
+
+    Cada linha é a entrada do pedido em um estado, com o horário. O estado é
+    gravado como código inteiro pequeno (posição em STATES + 1) e não há chave
+    estrangeira, para a linha ficar enxuta e o INSERT barato nos caminhos de
+    criação e mudança de status. O estado anterior é o da linha anterior do
+    mesmo pedido.
+    """
+    __tablename__ = 'order_status_event'
+
+    # Códigos persistidos: só acrescentar estados no fim
+    STATES = ORDER_STATUSES + COMANDA_STATUSES
+    CODES = {state: code for code, state in enumerate(STATES, start=1)}
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    order_id = db.Column(db.Integer, nullable=False)
+    state = db.Column(db.SmallInteger, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Cobre o histórico de um pedido e o relatório de latência (primeira
+    # entrada em cada estado por pedido) só com o índice
+    __table_args__ = (
+        db.Index('ix_order_status_event_order_state', 'order_id', 'state', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<OrderStatusEvent {self.order_id} {self.state_name}>'
+
+    @property
+    def state_name(self):
+        return self.STATES[self.state - 1]
+
+    @classmethod
+    def record(cls, transitions):
+        """Acrescenta as transições [(order_id, estado), ...] com um único INSERT em lote"""
+        if not transitions:
+            return
+        now = datetime.utcnow()
+        db.session.execute(db.insert(cls), [
+            {'order_id': order_id, 'state': cls.CODES[state], 'created_at': now}
+            for order_id, state in transitions
+        ])
+
+    def to_dict(self):
+        state = self.state_name
+        return {
+            'field': 'status_comanda' if state in COMANDA_STATUSES else 'status',
+            'status': state,
+            'created_at': self.created_at.isoformat()
+        }
+
 class OrderItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
-    menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_item.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, index=True)
+    menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_item.id'), nullable=False, index=True)
     quantity = db.Column(db.Integer, nullable=False)
     unit_price = db.Column(db.Float, nullable=False)
     subtotal = db.Column(db.Float, nullable=False)
@@ -0,0 +1,104 @@
+from src.models.user import db
+from src.models.order import OrderItem
+from src.utils.query import insert_on_conflict
+
+class DailySales(db.Model):
+    """Vendas agregadas por dia × item do cardápio × tipo de pedido.
+
+    O dia é a data (UTC) de criação do pedido, inclusive para itens
+    adicionados depois a uma comanda. Pedidos cancelados não entram.
+    order_count é o número de pedidos que contêm o item.
+    """
+    __tablename__ = 'daily_sales'
+
+    day = db.Column(db.Date, primary_key=True)
+    menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_item.id'), primary_key=True)
+    order_type = db.Column(db.String(20), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    paid_revenue = db.Column(db.Float, nullable=False, default=0)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DailySales {self.day} item={self.menu_item_id} {self.order_type}>'
+
+class DailyOrders(db.Model):
+    """Totais de pedidos por dia × tipo de pedido (pedidos não somam por item)"""
+    __tablename__ = 'daily_orders'
+
+    day = db.Column(db.Date, primary_key=True)
+    order_type = db.Column(db.String(20), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    paid_revenue = db.Column(db.Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DailyOrders {self.day} {self.order_type}>'
+
+def _increment(model, rows):
+    """Soma os valores de cada linha ao agregado (INSERT ... ON CONFLICT DO UPDATE)"""
+    if not rows:
+        return
+    table = model.__table__
+    keys = [column.name for column in table.primary_key.columns]
+    stmt = insert_on_conflict(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={
+            name: table.c[name] + stmt.excluded[name]
+            for name in rows[0] if name not in keys
+        }
+    )
+    db.session.execute(stmt, rows)
+
+def order_lines(order_id):
+    """Quantidade e valor por item do cardápio de um pedido"""
+    return db.session.query(
+        OrderItem.menu_item_id,
+        db.func.sum(OrderItem.quantity).label('quantity'),
+        db.func.sum(OrderItem.subtotal).label('revenue')
+    ).filter(OrderItem.order_id == order_id).group_by(OrderItem.menu_item_id).all()
+
+def record_sales(order, lines, sign=1, new_order=True, existing_item_ids=()):
+    """Aplica os itens `lines` de `order` aos agregados, na transação atual.
+
+    lines: (menu_item_id, quantity, revenue). sign=-1 desfaz (cancelamento).
+    Com new_order=False (itens adicionados a uma comanda) o pedido não é
+    contado de novo, nem os itens que ele já tinha (existing_item_ids).
+    """
+    day = order.created_at.date()
+    paid = order.payment_status == 'pago'
+
+    sales = {}
+    for menu_item_id, quantity, revenue in lines:
+        row = sales.setdefault(menu_item_id, {
+            'day': day, 'menu_item_id': menu_item_id, 'order_type': order.order_type,
+            'quantity': 0, 'revenue': 0.0, 'paid_revenue': 0.0,
+            'order_count': 0 if menu_item_id in existing_item_ids else sign
+        })
+        row['quantity'] += sign * quantity
+        row['revenue'] += sign * revenue
+        row['paid_revenue'] += (sign * revenue) if paid else 0.0
+
+    total = sum(row['revenue'] for row in sales.values())
+    _increment(DailySales, list(sales.values()))
+    _increment(DailyOrders, [{
+        'day': day, 'order_type': order.order_type,
+        'order_count': sign if new_order else 0,
+        'revenue': total,
+        'paid_revenue': total if paid else 0.0
+    }])
+
+def record_payment(order, sign):
+    """Move o valor do pedido para (sign=1) ou de (sign=-1) paid_revenue"""
+    day = order.created_at.date()
+    lines = order_lines(order.id)
+    _increment(DailySales, [
+        {'day': day, 'menu_item_id': line.menu_item_id, 'order_type': order.order_type,
+         'paid_revenue': sign * line.revenue}
+        for line in lines
+    ])
+    _increment(DailyOrders, [{
+        'day': day, 'order_type': order.order_type,
+        'paid_revenue': sign * sum(line.revenue for line in lines)
+    }])
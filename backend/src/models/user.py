@@ -1,8 +1,27 @@
+import re
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy.orm import validates
 
 db = SQLAlchemy()
 
+def normalize_phone(phone):
+    """Chave de busca do telefone: só dígitos, sem zeros e DDI 55 iniciais.
+
+    "(11) 99999-0000", "11999990000" e "+55 11 99999-0000" viram
+    "11999990000". Identificadores que não são telefone (ex.: "mesa 5",
+    usado nas comandas) são mantidos, só em minúsculas e sem espaços extras.
+    """
+    if phone is None:
+        return None
+    phone = str(phone).strip()
+    if re.search(r'[^\d\s()+\-.]', phone):
+        return ' '.join(phone.lower().split()) or None
+    digits = re.sub(r'\D', '', phone).lstrip('0')
+    if digits.startswith('55') and len(digits) in (12, 13):
+        digits = digits[2:]
+    return digits or None
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=True)  # Tornando opcional para clientes
@@ -11,6 +30,7 @@ class User(db.Model):
     # Campos de cliente
     customer_name = db.Column(db.String(100), nullable=True)  # Nome não é obrigatório
     customer_phone = db.Column(db.String(20), nullable=False, unique=True)  # Apenas telefone é único e obrigatório
+    phone_normalized = db.Column(db.String(20), nullable=True)  # normalize_phone(customer_phone), preenchido automaticamente
     customer_email = db.Column(db.String(120), nullable=True)
     delivery_address = db.Column(db.Text, nullable=True)
 
@@ -25,9 +45,26 @@ class User(db.Model):
     # Relacionamento com pedidos
     orders = db.relationship('Order', backref='user', lazy=True, foreign_keys='Order.user_id')
 
+    # Ordenações da listagem de clientes e ranking de maiores compradores
+    __table_args__ = (
+        # Login e busca por telefone (find_by_phone): um acesso ao índice
+        db.Index('ix_user_phone_normalized', 'phone_normalized', unique=True),
+        db.Index('ix_user_created_at', 'created_at'),
+        db.Index(
+            'ix_user_total_spent', 'total_spent',
+            postgresql_where=total_spent > 0,
+            sqlite_where=total_spent > 0
+        ),
+    )
+
     def __repr__(self):
         return f'<User {self.customer_phone}>'
 
+    @validates('customer_phone')
+    def validate_customer_phone(self, key, phone):
+        self.phone_normalized = normalize_phone(phone)
+        return phone
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -44,17 +81,77 @@ class User(db.Model):
         }
 
     def update_stats(self):
-        """Atualiza as estatísticas do cliente baseado nos pedidos"""
+        """Recalcula as estatísticas do cliente com uma consulta agregada (pedidos não cancelados)"""
         from src.models.order import Order
-        orders = Order.query.filter_by(user_id=self.id).all()
-        self.total_orders = len(orders)
-        self.total_spent = sum(order.total_amount for order in orders)
+        row = db.session.query(
+            db.func.count(Order.id),
+            db.func.coalesce(db.func.sum(Order.total_amount), 0)
+        ).filter(Order.user_id == self.id, Order.status != 'cancelado').one()
+        self.total_orders, self.total_spent = row
         return self
 
+    @classmethod
+    def adjust_stats(cls, user_id, orders=0, spent=0.0):
+        """Aplica um delta às estatísticas com UPDATE atômico (sem ler-modificar-gravar).
+
+        Chamado a cada transição que muda o valor de um cliente: pedido criado
+        (+1, +total), itens adicionados à comanda (0, +valor), pedido cancelado
+        (-1, -total) ou reaberto (+1, +total).
+        """
+        if user_id is None or (not orders and not spent):
+            return
+        db.session.execute(
+            db.update(cls).where(cls.id == user_id).values(
+                total_orders=db.func.coalesce(cls.total_orders, 0) + orders,
+                total_spent=db.func.coalesce(cls.total_spent, 0) + spent
+            ).execution_options(synchronize_session=False)
+        )
+
+    @classmethod
+    def reconcile_stats(cls, connection=None):
+        """Recalcula as estatísticas de todos os clientes de uma vez (set-based).
+
+        Uma consulta agrupada por user_id alimenta um UPDATE ... FROM; clientes
+        sem pedidos válidos são zerados. Só linhas divergentes são gravadas.
+        Executa na sessão ou em `connection`, se informada (scripts de
+        migração). Retorna o número de clientes corrigidos.
+        """
+        from src.models.order import Order
+        totals = db.select(
+            Order.user_id,
+            db.func.count(Order.id).label('orders'),
+            db.func.sum(Order.total_amount).label('spent')
+        ).where(Order.user_id.isnot(None), Order.status != 'cancelado').group_by(Order.user_id).subquery()
+
+        total_orders = db.func.coalesce(cls.total_orders, 0)
+        total_spent = db.func.coalesce(cls.total_spent, 0)
+        execute = connection.execute if connection is not None else db.session.execute
+
+        updated = execute(
+            db.update(cls).where(
+                cls.id == totals.c.user_id,
+                (total_orders != totals.c.orders) | (db.func.abs(total_spent - totals.c.spent) > 0.005)
+            ).values(total_orders=totals.c.orders, total_spent=totals.c.spent)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        has_orders = db.select(Order.id).where(Order.user_id == cls.id, Order.status != 'cancelado').exists()
+        reset = execute(
+            db.update(cls).where(
+                ~has_orders, (total_orders != 0) | (total_spent != 0)
+            ).values(total_orders=0, total_spent=0.0)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        return updated + reset
+
     @classmethod
     def find_by_phone(cls, phone):
-        """Busca um usuário pelo telefone"""
-        return cls.query.filter_by(customer_phone=phone).first()
+        """Busca um usuário pelo telefone, em qualquer formato"""
+        phone_normalized = normalize_phone(phone)
+        if not phone_normalized:
+            return None
+        return cls.query.filter_by(phone_normalized=phone_normalized).first()
 
     @classmethod
     def find_or_create_by_phone(cls, phone, name=None, email=None, address=None):
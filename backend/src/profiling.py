@@ -0,0 +1,225 @@
+"""
+Profiling sob demanda: log de requisições lentas e amostragem estatística.
+
+Desligado por padrão. Quando ligado, para as rotas selecionadas:
+- requisições acima de slow_ms são logadas com cada SQL executado, seu tempo
+  e número de linhas
+- uma fração sample_rate das requisições é amostrada por um profiler
+  estatístico (pilha da thread da requisição a cada interval_ms), gravando
+  pilhas colapsadas em PROFILING_OUTPUT_DIR; gerar o flamegraph offline com
+  `flamegraph.pl arquivo.folded > arquivo.svg` (ou speedscope)
+
+A configuração fica num arquivo JSON (PROFILING_CONFIG_FILE) relido quando
+muda, então PUT /api/admin/profiling vale para todos os workers da máquina.
+As rotas de administração exigem o token ADMIN_TOKEN (header
+Authorization: Bearer <token>); sem ADMIN_TOKEN definido ficam bloqueadas.
+Desligado, o custo por requisição é uma comparação (e um stat por segundo).
+
+A amostragem usa sys._current_frames() e portanto exige workers sync; com
+gevent todas as requisições do worker compartilham a mesma thread.
+"""
+
+import hmac
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from flask import Blueprint, current_app, g, jsonify, request
+from src.routes.menu import str_to_bool
+
+profiling_bp = Blueprint('profiling', __name__)
+
+DEFAULT_CONFIG = {
+    'enabled': False,
+    'routes': [],          # prefixos de caminho, ex.: ["/api/orders"]; vazio = todas
+    'slow_ms': 500,
+    'sample_rate': 0.0,
+    'interval_ms': 5
+}
+
+MAX_LOGGED_STATEMENTS = 200
+
+class ProfilingConfig:
+    """Configuração compartilhada via arquivo, relida no máximo uma vez por segundo"""
+
+    def __init__(self, path, initial):
+        self.path = path
+        self.values = dict(DEFAULT_CONFIG, **initial)
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < 1:
+            return self.values
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return self.values
+        if mtime != self._mtime:
+            with self._lock:
+                try:
+                    with open(self.path) as f:
+                        values = json.load(f)
+                    self.values = dict(DEFAULT_CONFIG, **{key: values[key] for key in DEFAULT_CONFIG if key in values})
+                    self._mtime = mtime
+                except (OSError, ValueError):
+                    pass
+        return self.values
+
+    def update(self, changes):
+        with self._lock:
+            values = dict(self.values, **changes)
+            tmp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(values, f)
+            os.replace(tmp_path, self.path)
+            self.values = values
+            self._checked_at = 0.0
+        return values
+
+    def matches(self, path):
+        routes = self.values['routes']
+        return not routes or any(path.startswith(prefix) for prefix in routes)
+
+class StackSampler(threading.Thread):
+    """Amostra periodicamente a pilha de uma thread e conta pilhas colapsadas"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write(self, output_dir, name):
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{name}.folded')
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.items():
+                f.write(f'{stack} {count}\n')
+        return path
+
+def init_profiling(app):
+    """Registra o middleware de profiling e as rotas de administração"""
+    config = ProfilingConfig(
+        app.config['PROFILING_CONFIG_FILE'],
+        {'enabled': app.config['PROFILING_ENABLED']}
+    )
+    app.extensions['profiling'] = config
+
+    @app.before_request
+    def start_profiling():
+        if not config.refresh()['enabled'] or not config.matches(request.path):
+            return
+
+        settings = config.values
+        g.profile_start = time.perf_counter()
+        g.profile_statements = []
+        g.query_listeners.append(
+            lambda statement, elapsed, rowcount: g.profile_statements.append((statement, elapsed, rowcount))
+        )
+        if settings['sample_rate'] and random.random() < settings['sample_rate']:
+            g.profile_sampler = StackSampler(threading.get_ident(), settings['interval_ms'] / 1000)
+            g.profile_sampler.start()
+
+    @app.after_request
+    def finish_profiling(response):
+        profile_start = g.pop('profile_start', None)
+        if profile_start is None:
+            return response
+
+        settings = config.values
+        elapsed_ms = (time.perf_counter() - profile_start) * 1000
+        statements = g.pop('profile_statements')
+
+        if elapsed_ms >= settings['slow_ms']:
+            lines = [
+                f'  {elapsed * 1000:8.1f} ms  {rowcount:>6} linhas  {" ".join(statement.split())}'
+                for statement, elapsed, rowcount in statements[:MAX_LOGGED_STATEMENTS]
+            ]
+            app.logger.warning(
+                'Requisição lenta %s %s -> %s: %.1f ms, %d consultas SQL (%.1f ms)\n%s',
+                request.method, request.full_path.rstrip('?'), response.status_code, elapsed_ms,
+                len(statements), sum(s[1] for s in statements) * 1000, '\n'.join(lines)
+            )
+        return response
+
+    @app.teardown_request
+    def stop_sampler(exc):
+        # Em teardown_request para parar a thread também quando a view levanta exceção
+        sampler = g.pop('profile_sampler', None)
+        if sampler:
+            sampler.stop()
+            name = (request.endpoint or 'none').replace('.', '_')
+            path = sampler.write(app.config['PROFILING_OUTPUT_DIR'], name)
+            app.logger.info('Perfil amostrado de %s %s gravado em %s', request.method, request.path, path)
+
+@profiling_bp.before_request
+def require_admin_token():
+    """Rotas de administração exigem o token ADMIN_TOKEN"""
+    token = current_app.config.get('ADMIN_TOKEN')
+    if not token:
+        return jsonify({'success': False, 'message': 'Administração desativada: defina ADMIN_TOKEN'}), 403
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        return jsonify({'success': False, 'message': 'Token de administração inválido'}), 401
+
+@profiling_bp.route('/admin/profiling', methods=['GET'])
+def get_profiling():
+    """Configuração atual do profiling"""
+    return jsonify({'success': True, 'profiling': current_app.extensions['profiling'].refresh()})
+
+@profiling_bp.route('/admin/profiling', methods=['PUT'])
+def update_profiling():
+    """Liga/desliga o profiling e ajusta rotas, limiar e taxa de amostragem.
+
+    interval_ms é limitado a no mínimo 1 e sample_rate a [0, 1].
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({'success': False, 'message': 'Dados não fornecidos'}), 400
+
+    changes = {key: data[key] for key in DEFAULT_CONFIG if key in data}
+    try:
+        if 'enabled' in changes:
+            changes['enabled'] = str_to_bool(changes['enabled'])
+        if 'routes' in changes:
+            routes = changes['routes']
+            if not isinstance(routes, list) or not all(isinstance(route, str) for route in routes):
+                return jsonify({'success': False, 'message': 'routes deve ser uma lista de prefixos (strings)'}), 400
+        for key in ('slow_ms', 'sample_rate', 'interval_ms'):
+            if key in changes and not math.isfinite(float(changes[key])):
+                raise ValueError(key)
+        if 'slow_ms' in changes:
+            changes['slow_ms'] = max(0.0, float(changes['slow_ms']))
+        if 'sample_rate' in changes:
+            changes['sample_rate'] = min(max(float(changes['sample_rate']), 0.0), 1.0)
+        if 'interval_ms' in changes:
+            changes['interval_ms'] = max(1.0, float(changes['interval_ms']))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Valores de configuração inválidos'}), 400
+
+    return jsonify({'success': True, 'profiling': current_app.extensions['profiling'].update(changes)})
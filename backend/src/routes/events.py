@@ -0,0 +1,124 @@
+import json
+import time
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, current_app, jsonify, request
+from src.events import RESYNC, get_broker, order_delta
+from src.models.user import db
+from src.models.order import Order
+from src.routes.order import order_changes
+from src.utils.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+
+events_bp = Blueprint('events', __name__)
+
+def matches(payload, mesa, user_id, statuses):
+    order = payload['order']
+    if order is None:
+        return True
+    if mesa is not None and order['mesa'] != mesa:
+        return False
+    if user_id is not None and order['user_id'] != user_id:
+        return False
+    if statuses and order['status'] not in statuses:
+        return False
+    return True
+
+def event_id(order):
+    """Id SSE do delta: cursor (updated_at, id) do pedido, válido em qualquer worker.
+
+    Um RESYNC leva o instante atual, para a próxima reconexão não repetir a
+    recarga.
+    """
+    if order is None:
+        return encode_cursor(datetime.utcnow(), 0)
+    if not order['updated_at']:
+        return None
+    return encode_cursor(datetime.fromisoformat(order['updated_at']), order['id'])
+
+def format_event(payload):
+    lines = []
+    current_id = event_id(payload['order'])
+    if current_id:
+        lines.append(f'id: {current_id}')
+    lines.append(f"event: {payload['type']}")
+    lines.append(f"data: {json.dumps(payload['order'])}")
+    return '\n'.join(lines) + '\n\n'
+
+def replay(last_event_id, mesa, user_id, statuses):
+    """Deltas gravados no banco depois de Last-Event-ID (recuado ORDER_CHANGES_LAG
+    segundos, podendo repetir pedidos). Com mais de MAX_PAGE_SIZE pedidos
+    devolve um único RESYNC: o cliente recarrega a lista"""
+    updated_at, _ = decode_cursor(last_event_id)
+    since = (updated_at - timedelta(seconds=current_app.config['ORDER_CHANGES_LAG']), 0)
+    rows, has_more, _ = order_changes(since, MAX_PAGE_SIZE, mesa, user_id, statuses)
+    if has_more:
+        return [{'type': RESYNC, 'order': None}]
+    orders = Order.query.filter(Order.id.in_([row.id for row in rows])).all() if rows else []
+    orders.sort(key=lambda order: (order.updated_at, order.id))
+    return [order_delta('order.updated', order) for order in orders]
+
+@events_bp.route('/events/config', methods=['GET'])
+def events_config():
+    """Diz aos painéis se usam o SSE ou consultam /api/orders/changes, e o watermark inicial"""
+    start = datetime.utcnow() - timedelta(seconds=current_app.config['ORDER_CHANGES_LAG'])
+    return jsonify({
+        'success': True,
+        'sse': current_app.config['EVENTS_SSE_ENABLED'],
+        'poll_interval': current_app.config['EVENTS_POLL_INTERVAL'],
+        'watermark': encode_cursor(start, 0)
+    })
+
+@events_bp.route('/events', methods=['GET'])
+def stream_events():
+    """Stream SSE com deltas de pedidos, filtrável por mesa, user_id e status.
+
+    Os ids dos eventos são cursores (updated_at, id): ao reconectar com
+    Last-Event-ID, em qualquer worker, as mudanças do intervalo são lidas do
+    banco antes de seguir com os eventos ao vivo.
+    """
+    if not current_app.config['EVENTS_SSE_ENABLED']:
+        return jsonify({
+            'success': False,
+            'message': 'SSE desativado; use /api/orders/changes (ver /api/events/config)'
+        }), 503
+
+    mesa = request.args.get('mesa', type=int)
+    user_id = request.args.get('user_id', type=int)
+    statuses = set(filter(None, request.args.get('status', '').split(',')))
+
+    app = current_app._get_current_object()
+    broker = get_broker(app)
+    broker.start(db.engine)
+
+    # Posição no broker antes de ler o banco: um evento publicado entre as duas
+    # leituras pode sair duas vezes, mas nenhum se perde
+    position = broker.last_id
+    backlog = []
+    last_event_id = request.headers.get('Last-Event-ID')
+    if last_event_id:
+        try:
+            backlog = replay(last_event_id, mesa, user_id, sorted(statuses))
+        except ValueError:
+            backlog = [{'type': RESYNC, 'order': None}]
+
+    keepalive = app.config['EVENTS_KEEPALIVE']
+    # Em workers sync a conexão precisa terminar antes do timeout do gunicorn;
+    # o EventSource reconecta sozinho enviando o Last-Event-ID
+    deadline = time.monotonic() + app.config['EVENTS_STREAM_TIMEOUT']
+
+    def generate(position):
+        yield 'retry: 2000\n\n'
+        for payload in backlog:
+            yield format_event(payload)
+        while time.monotonic() < deadline:
+            events = broker.wait(position, min(keepalive, max(deadline - time.monotonic(), 0)))
+            if not events:
+                yield ': keepalive\n\n'
+                continue
+            for position, payload in events:
+                if matches(payload, mesa, user_id, statuses):
+                    yield format_event(payload)
+
+    return Response(generate(position), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
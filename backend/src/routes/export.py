@@ -0,0 +1,163 @@
+"""
+Exportação de pedidos e clientes em CSV ou NDJSON, em streaming.
+
+As linhas são lidas com cursor no servidor (yield_per) e escritas em blocos
+de EXPORT_BATCH_SIZE, então a memória usada não depende do tamanho da
+exportação. Com gzip=true o arquivo é comprimido durante o envio.
+"""
+
+import csv
+import io
+import zlib
+from datetime import datetime
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from src.models.user import db, User
+from src.models.order import Order, OrderItem
+from src.models.menu import MenuItem
+from src.routes.menu import str_to_bool
+from src.utils.pagination import parse_datetime
+from src.utils.serialization import dumps
+
+export_bp = Blueprint('export', __name__)
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+ORDER_COLUMNS = [
+    Order.id, Order.created_at, Order.updated_at, Order.user_id, Order.customer_name,
+    Order.customer_phone, Order.customer_email, Order.order_type, Order.status,
+    Order.payment_status, Order.total_amount, Order.delivery_address, Order.notes,
+    Order.is_comanda, Order.mesa, Order.status_comanda
+]
+USER_COLUMNS = [
+    User.id, User.created_at, User.customer_name, User.customer_phone, User.customer_email,
+    User.delivery_address, User.total_orders, User.total_spent
+]
+
+def iter_batches(stmt):
+    """Percorre um SELECT em blocos, com cursor no servidor quando o driver suporta"""
+    result = db.session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for partition in result.mappings().partitions():
+        yield [dict(row) for row in partition]
+
+def order_batches(stmt):
+    """Blocos de pedidos com seus itens (uma consulta de itens por bloco)"""
+    for orders in iter_batches(stmt):
+        items = {order['id']: [] for order in orders}
+        rows = db.session.execute(
+            db.select(
+                OrderItem.order_id, OrderItem.menu_item_id, MenuItem.name,
+                OrderItem.quantity, OrderItem.unit_price, OrderItem.subtotal, OrderItem.notes
+            ).join(MenuItem, MenuItem.id == OrderItem.menu_item_id)
+            .where(OrderItem.order_id.in_(list(items)))
+            .order_by(OrderItem.id)
+        ).mappings()
+        for row in rows:
+            item = dict(row)
+            items[item.pop('order_id')].append(item)
+        for order in orders:
+            order['items'] = items[order['id']]
+        yield orders
+
+def csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        # Itens do pedido numa única coluna: "2x X-Burger; 1x Batata Frita"
+        return '; '.join(f"{item['quantity']}x {item['name']}" for item in value)
+    return value
+
+def encode_batches(batches, fmt, columns):
+    """Converte blocos de linhas (dicts) em blocos de bytes CSV ou NDJSON"""
+    if fmt == 'ndjson':
+        for rows in batches:
+            yield b''.join(dumps(row) + b'\n' for row in rows)
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows([csv_value(row[column]) for column in columns] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)  # formato gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_response(name, batches, fmt, columns, compress):
+    chunks = encode_batches(batches, fmt, columns)
+    filename = f'{name}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}'
+    mimetype = EXPORT_FORMATS[fmt]
+    if compress:
+        chunks = gzip_chunks(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+
+    # stream_with_context mantém a sessão do banco aberta durante o envio
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'X-Accel-Buffering': 'no'
+    })
+
+def parse_export_args():
+    """Formato, compressão e período (date_from/date_to em created_at)"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'Formato inválido. Valores válidos: {", ".join(EXPORT_FORMATS)}')
+    try:
+        date_from = request.args.get('date_from')
+        date_to = request.args.get('date_to')
+        date_from = parse_datetime(date_from) if date_from else None
+        date_to = parse_datetime(date_to, end_of_day=True) if date_to else None
+    except ValueError:
+        raise ValueError('Datas devem estar no formato YYYY-MM-DD')
+    return fmt, str_to_bool(request.args.get('gzip', False)), date_from, date_to
+
+@export_bp.route('/export/orders', methods=['GET'])
+def export_orders():
+    """Exportar pedidos (filtros date_from, date_to, payment_status, type)"""
+    try:
+        fmt, compress, date_from, date_to = parse_export_args()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    stmt = db.select(*ORDER_COLUMNS)
+    if date_from:
+        stmt = stmt.where(Order.created_at >= date_from)
+    if date_to:
+        stmt = stmt.where(Order.created_at < date_to)
+    if request.args.get('payment_status'):
+        stmt = stmt.where(Order.payment_status == request.args['payment_status'])
+    if request.args.get('type'):
+        stmt = stmt.where(Order.order_type == request.args['type'])
+    stmt = stmt.order_by(Order.created_at, Order.id)
+
+    columns = [column.key for column in ORDER_COLUMNS] + ['items']
+    return export_response('pedidos', order_batches(stmt), fmt, columns, compress)
+
+@export_bp.route('/export/users', methods=['GET'])
+def export_users():
+    """Exportar clientes (filtros date_from, date_to no cadastro)"""
+    try:
+        fmt, compress, date_from, date_to = parse_export_args()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    stmt = db.select(*USER_COLUMNS)
+    if date_from:
+        stmt = stmt.where(User.created_at >= date_from)
+    if date_to:
+        stmt = stmt.where(User.created_at < date_to)
+    stmt = stmt.order_by(User.created_at, User.id)
+
+    columns = [column.key for column in USER_COLUMNS]
+    return export_response('clientes', iter_batches(stmt), fmt, columns, compress)
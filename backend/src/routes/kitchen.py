@@ -0,0 +1,30 @@
+from flask import Blueprint, current_app, request
+from src.events import get_broker
+from src.kitchen import KITCHEN_STATUSES, kitchen_queue
+from src.models.user import db
+from src.utils.serialization import json_response
+
+kitchen_bp = Blueprint('kitchen', __name__)
+
+@kitchen_bp.route('/kitchen/queue', methods=['GET'])
+def get_kitchen_queue():
+    """Fila da cozinha: pedidos pendentes, em preparo e prontos, por prioridade e idade.
+
+    Filtros opcionais: status (lista separada por vírgula) e mesa.
+    """
+    statuses = set(filter(None, request.args.get('status', '').split(','))) or set(KITCHEN_STATUSES)
+    mesa = request.args.get('mesa', type=int)
+
+    # Com EVENTS_BACKEND=postgres a fila depende do LISTEN deste processo
+    get_broker(current_app).start(db.engine)
+
+    queue = kitchen_queue.snapshot(current_app.config['KITCHEN_RESYNC_INTERVAL'])
+
+    return json_response({
+        'success': True,
+        'orders': [
+            order for order in queue
+            if order['status'] in statuses and (mesa is None or order['mesa'] == mesa)
+        ],
+        'counts': {status: sum(1 for order in queue if order['status'] == status) for status in KITCHEN_STATUSES}
+    })
@@ -1,9 +1,13 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from src.models.user import db
 from src.models.menu import MenuItem
+from src.models.order import ORDER_TYPES
+from src.utils.versioned_cache import VersionedCache
 
 menu_bp = Blueprint('menu', __name__)
 
+menu_cache = VersionedCache('menu')
+
 def str_to_bool(val):
     if isinstance(val, bool):
         return val
@@ -11,12 +15,29 @@ def str_to_bool(val):
         return val.lower() in ['true', '1', 'yes']
     return bool(val)
 
+def cached_response(key, build_payload):
+    """Resposta JSON servida do cache do cardápio, com ETag e suporte a 304"""
+    body, etag = menu_cache.get(
+        key,
+        current_app.config['MENU_CACHE_CHECK_INTERVAL'],
+        lambda: current_app.json.dumps(build_payload()).encode()
+    )
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @menu_bp.route('/menu', methods=['GET'])
 def get_menu():
     """Obter cardápio filtrado por tipo (delivery/local/comanda) e categoria"""
     order_type = request.args.get('type', 'local')  # 'delivery', 'local' ou 'comanda'
-    category = request.args.get('category')
+    if order_type not in ORDER_TYPES:
+        order_type = 'local'  # tipo desconhecido: cardápio local, com uma única entrada no cache
+    category = request.args.get('category') or None
 
+    return cached_response(('menu', order_type, category), lambda: build_menu(order_type, category))
+
+def build_menu(order_type, category):
     query = MenuItem.query.filter(MenuItem.is_active == True)
 
     # Filtrar por tipo de pedido
@@ -33,19 +54,24 @@ def get_menu():
 
     items = query.order_by(MenuItem.category, MenuItem.name).all()
 
-    return jsonify({
+    return {
         'success': True,
         'items': [item.to_dict() for item in items]
-    })
+    }
 
 @menu_bp.route('/menu/categories', methods=['GET'])
 def get_categories():
     """Obter todas as categorias disponíveis"""
-    categories = db.session.query(MenuItem.category).filter(MenuItem.is_active == True).distinct().all()
-    return jsonify({
+    return cached_response(('categories',), build_categories)
+
+def build_categories():
+    categories = db.session.query(MenuItem.category).filter(
+        MenuItem.is_active == True
+    ).distinct().order_by(MenuItem.category).all()
+    return {
         'success': True,
         'categories': [cat[0] for cat in categories]
-    })
+    }
 
 @menu_bp.route('/menu', methods=['POST'])
 def create_menu_item():
@@ -68,7 +94,9 @@ def create_menu_item():
         )
 
         db.session.add(item)
+        menu_cache.bump()
         db.session.commit()
+        menu_cache.invalidate()
 
         return jsonify({
             'success': True,
@@ -109,7 +137,9 @@ def update_menu_item(item_id):
         if 'image_url' in data:
             item.image_url = data['image_url']
 
+        menu_cache.bump()
         db.session.commit()
+        menu_cache.invalidate()
 
         return jsonify({
             'success': True,
@@ -128,7 +158,9 @@ def delete_menu_item(item_id):
 
     try:
         item.is_active = False
+        menu_cache.bump()
         db.session.commit()
+        menu_cache.invalidate()
 
         return jsonify({
             'success': True,
@@ -1,18 +1,55 @@
-from flask import Blueprint, request, jsonify
-from src.models.user import db, User
-from src.models.order import Order, OrderItem
+import hashlib
+from datetime import datetime, timedelta
+from flask import Blueprint, abort, current_app, request, jsonify
+from src.models.user import db, User, normalize_phone
+from src.models.order import (
+    Order, OrderItem, OrderStatusEvent, COMANDA_STATUSES, COMANDA_TRANSITIONS, ORDER_STATUSES, ORDER_TRANSITIONS,
+    ORDER_TYPES, PAYMENT_STATUSES, can_transition
+)
 from src.models.menu import MenuItem
+from src.models.idempotency import IdempotencyKey
+from src.models.report import order_lines, record_payment, record_sales
+from src.events import emit_order_event
+from src.routes.menu import str_to_bool
+from src.utils.cache import TTLCache
+from src.utils.pagination import encode_cursor, keyset_page, parse_datetime, parse_limit, parse_watermark
+from src.utils.query import count_if, insert_on_conflict, sum_if
+from src.utils.serialization import dumps, json_response, serialize_orders
 
 order_bp = Blueprint('order', __name__)
 
+stats_cache = TTLCache()
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
 @order_bp.route('/orders', methods=['GET'])
 def get_orders():
-    """Obter todos os pedidos com filtros opcionais"""
+    """Obter pedidos com filtros opcionais, paginados por cursor (created_at, id)"""
     status = request.args.get('status')
     order_type = request.args.get('type')
     payment_status = request.args.get('payment_status')
+    is_comanda = request.args.get('is_comanda')
+    status_comanda = request.args.get('status_comanda')
+    mesa = request.args.get('mesa', type=int)
+    customer = request.args.get('customer')
+    address = request.args.get('address')
+
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        date_from = request.args.get('date_from')
+        date_to = request.args.get('date_to')
+        date_from = parse_datetime(date_from) if date_from else None
+        date_to = parse_datetime(date_to, end_of_day=True) if date_to else None
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'Parâmetros inválidos: limit deve ser inteiro e datas no formato YYYY-MM-DD'
+        }), 400
+
+    compact = str_to_bool(request.args.get('compact', False))
 
-    query = Order.query
+    # Pagina só as chaves; a serialização lê as colunas em lote
+    query = db.session.query(Order.id, Order.created_at)
 
     if status:
         query = query.filter(Order.status == status)
@@ -20,27 +57,259 @@ def get_orders():
         query = query.filter(Order.order_type == order_type)
     if payment_status:
         query = query.filter(Order.payment_status == payment_status)
+    if is_comanda is not None:
+        query = query.filter(Order.is_comanda == str_to_bool(is_comanda))
+    if status_comanda:
+        query = query.filter(Order.status_comanda == status_comanda)
+    if mesa is not None:
+        query = query.filter(Order.mesa == mesa)
+    if customer:
+        query = query.filter(Order.customer_name.ilike(f'%{customer}%'))
+    if address:
+        query = query.filter(Order.delivery_address.ilike(f'%{address}%'))
+    if date_from:
+        query = query.filter(Order.created_at >= date_from)
+    if date_to:
+        query = query.filter(Order.created_at < date_to)
 
-    orders = query.order_by(Order.created_at.desc()).all()
+    try:
+        keys, next_cursor = keyset_page(query, Order, request.args.get('cursor'), limit)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
 
-    return jsonify({
+    orders, menu_items = serialize_orders([key.id for key in keys], compact=compact)
+
+    payload = {
         'success': True,
-        'orders': [order.to_dict() for order in orders]
+        'orders': orders,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    }
+    if compact:
+        payload['menu_items'] = menu_items
+    return json_response(payload)
+
+def order_changes(since, limit, mesa=None, user_id=None, statuses=None):
+    """Pedidos alterados depois do watermark `since` ((updated_at, id) ou None), em ordem.
+
+    Retorna (linhas, has_more, watermark). Enquanto há mais páginas o
+    watermark é a chave exata da última linha. Na última página ele fica
+    ORDER_CHANGES_LAG segundos atrás do relógio: uma transação que
+    grava updated_at antes e faz commit depois da consulta ainda é entregue
+    na próxima chamada (que pode repetir pedidos já entregues).
+    """
+    query = db.session.query(Order.id, Order.updated_at, Order.status).filter(Order.updated_at.isnot(None))
+    if since:
+        updated_at, order_id = since
+        query = query.filter(
+            (Order.updated_at > updated_at) | ((Order.updated_at == updated_at) & (Order.id > order_id))
+        )
+    if mesa is not None:
+        query = query.filter(Order.mesa == mesa)
+    if user_id is not None:
+        query = query.filter(Order.user_id == user_id)
+    if statuses:
+        query = query.filter(Order.status.in_(statuses))
+    rows = query.order_by(Order.updated_at, Order.id).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    last = (rows[-1].updated_at, rows[-1].id) if rows else since
+    if has_more:
+        return rows, True, last
+    floor = (datetime.utcnow() - timedelta(seconds=current_app.config['ORDER_CHANGES_LAG']), 0)
+    return rows, False, min(last, floor) if last else floor
+
+@order_bp.route('/orders/changes', methods=['GET'])
+def get_order_changes():
+    """Pedidos criados ou alterados depois de `since`, para sincronização incremental.
+
+    Pedidos cancelados vêm apenas como ids em `cancelled`. O cliente deve
+    guardar o `watermark` retornado e enviá-lo como `since` na próxima chamada;
+    enquanto `has_more` for true, há mais mudanças a buscar imediatamente. Um
+    pedido pode vir de novo em chamadas seguintes (ver order_changes): o
+    cliente substitui pelo id. Filtros opcionais: mesa, user_id, status.
+    """
+    try:
+        since = request.args.get('since')
+        since = parse_watermark(since) if since else None
+        limit = parse_limit(request.args.get('limit'))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'Parâmetros inválidos: since deve ser um watermark e limit um inteiro'
+        }), 400
+
+    statuses = list(filter(None, request.args.get('status', '').split(',')))
+    orders, has_more, watermark = order_changes(
+        since, limit, request.args.get('mesa', type=int), request.args.get('user_id', type=int), statuses
+    )
+
+    changed, _ = serialize_orders([order.id for order in orders if order.status != 'cancelado'])
+
+    return json_response({
+        'success': True,
+        'orders': changed,
+        'cancelled': [order.id for order in orders if order.status == 'cancelado'],
+        'watermark': encode_cursor(*watermark),
+        'has_more': has_more
     })
 
 @order_bp.route('/orders/<int:order_id>', methods=['GET'])
 def get_order(order_id):
     """Obter detalhes de um pedido específico"""
-    order = Order.query.get_or_404(order_id)
+    order = Order.query.options(Order.with_items()).get_or_404(order_id)
 
     return jsonify({
         'success': True,
         'order': order.to_dict()
     })
 
+@order_bp.route('/orders/<int:order_id>/history', methods=['GET'])
+def get_order_history(order_id):
+    """Transições de status do pedido (e da comanda), em ordem"""
+    Order.query.get_or_404(order_id)
+    events = OrderStatusEvent.query.filter_by(order_id=order_id).order_by(
+        OrderStatusEvent.created_at, OrderStatusEvent.id
+    ).all()
+    return jsonify({
+        'success': True,
+        'history': [event.to_dict() for event in events]
+    })
+
+def strict_int(value):
+    """int(value) sem aceitar booleanos nem números fracionários (2.5 não vira 2)"""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(value)
+    return int(value)
+
+def parse_cart(items):
+    """Valida os itens do corpo de create_order antes de qualquer consulta.
+
+    Retorna [(menu_item_id, quantidade, observações)]. Levanta ValueError com
+    a mensagem para o cliente se algum item não tiver menu_item_id inteiro ou
+    quantidade inteira maior que zero.
+    """
+    if not isinstance(items, list):
+        raise ValueError('items deve ser uma lista')
+    cart = []
+    for position, item_data in enumerate(items, start=1):
+        if not isinstance(item_data, dict):
+            raise ValueError(f'Item {position} inválido')
+        try:
+            menu_item_id = strict_int(item_data['menu_item_id'])
+            quantity = strict_int(item_data['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'Item {position}: menu_item_id e quantity devem ser inteiros')
+        if quantity <= 0:
+            raise ValueError(f'Item {position}: quantity deve ser maior que zero')
+        cart.append((menu_item_id, quantity, item_data.get('notes', '')))
+    return cart
+
+def insert_order_items(order_id, order_items_data):
+    """Insere todas as linhas do pedido com um único INSERT em lote"""
+    db.session.execute(
+        db.insert(OrderItem),
+        [dict(item_data, order_id=order_id) for item_data in order_items_data]
+    )
+
+def sales_lines(order_items_data):
+    """Linhas (menu_item_id, quantidade, valor) para os agregados de vendas"""
+    return [(item['menu_item_id'], item['quantity'], item['subtotal']) for item in order_items_data]
+
+def load_order(order_id):
+    """Recarrega um pedido com itens e itens do cardápio em número fixo de consultas"""
+    return Order.query.options(Order.with_items()).filter_by(id=order_id).one()
+
+def find_or_add_customer(phone, name, email, address):
+    """Cliente pelo telefone; se não existe, cadastra com INSERT ... ON CONFLICT DO NOTHING.
+
+    Duas requisições simultâneas com o mesmo telefone novo (ex.: o primeiro
+    pedido de uma mesa) ficam com o mesmo cadastro em vez de uma delas falhar
+    no índice único.
+    """
+    user = User.find_by_phone(phone)
+    if user:
+        return user
+    db.session.execute(
+        insert_on_conflict(User).values(
+            customer_phone=phone,
+            phone_normalized=normalize_phone(phone),
+            customer_name=name,
+            customer_email=email,
+            delivery_address=address
+        ).on_conflict_do_nothing()
+    )
+    return User.find_by_phone(phone)
+
+def add_comanda_items(order_id, order_items_data, total_amount, idempotency_key=None):
+    """Lança os itens na comanda aberta (o total já foi somado por Order.add_to_open_comanda)"""
+    order = db.session.get(Order, order_id, populate_existing=True)
+    existing_item_ids = {
+        row.menu_item_id
+        for row in db.session.query(OrderItem.menu_item_id).filter_by(order_id=order_id).distinct()
+    }
+    insert_order_items(order_id, order_items_data)
+    if order.status != 'cancelado':
+        record_sales(order, sales_lines(order_items_data), new_order=False,
+                     existing_item_ids=existing_item_ids)
+        User.adjust_stats(order.user_id, spent=total_amount)
+    emit_order_event(db.session, 'order.items_added', order)
+    return commit_response({
+        'success': True,
+        'message': 'Itens adicionados à comanda existente',
+        'order': load_order(order_id).to_dict()
+    }, 200, idempotency_key)
+
+def commit_response(payload, status, idempotency_key=None):
+    """Faz o commit da requisição; com Idempotency-Key, guarda a resposta na mesma transação"""
+    body = dumps(payload)
+    if idempotency_key:
+        IdempotencyKey.save_response(idempotency_key, status, body.decode())
+    db.session.commit()
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+def reject_order(message):
+    """Erro 400 de create_order: desfaz a transação, liberando a Idempotency-Key reservada"""
+    db.session.rollback()
+    return jsonify({'success': False, 'message': message}), 400
+
+def claim_idempotency_key(key):
+    """Reserva a chave do POST /orders.
+
+    Retorna None se a requisição deve ser processada, ou a resposta a
+    devolver: a guardada (reenvio) ou um erro se a chave já foi usada com
+    outro corpo.
+    """
+    if len(key) > 255:
+        return jsonify({'success': False, 'message': f'{IDEMPOTENCY_HEADER} deve ter no máximo 255 caracteres'}), 400
+
+    IdempotencyKey.purge_expired(current_app.config['IDEMPOTENCY_KEY_TTL'])
+    request_hash = hashlib.sha256(request.get_data()).hexdigest()
+    stored = IdempotencyKey.claim(key, request_hash)
+    if stored is None:
+        return None
+    if stored.request_hash != request_hash:
+        return jsonify({
+            'success': False,
+            'message': f'{IDEMPOTENCY_HEADER} já usada com outro pedido'
+        }), 422
+    if stored.status_code is None:
+        return jsonify({
+            'success': False,
+            'message': f'Pedido com esta {IDEMPOTENCY_HEADER} ainda em processamento'
+        }), 409
+    response = current_app.response_class(stored.response, status=stored.status_code, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
 @order_bp.route('/orders', methods=['POST'])
 def create_order():
-    """Criar novo pedido"""
+    """Criar novo pedido.
+
+    Com o cabeçalho Idempotency-Key, reenvios da mesma chave (ex.: retry após
+    timeout no celular) devolvem a resposta original sem criar outro pedido.
+    """
     data = request.get_json()
 
     if not data or not data.get('order_type') or not data.get('items'):
@@ -49,7 +318,15 @@ def create_order():
             'message': 'Tipo de pedido e itens são obrigatórios'
         }), 400
 
+    idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+
     try:
+        if idempotency_key:
+            replay = claim_idempotency_key(idempotency_key)
+            if replay is not None:
+                db.session.rollback()
+                return replay
+
         is_comanda = data.get('is_comanda', False)
         mesa = data.get('mesa')
         # Forçar tipos corretos
@@ -59,7 +336,11 @@ def create_order():
                 mesa = int(mesa)
             except (TypeError, ValueError):
                 mesa = None
-        print('DEBUG NOVO PEDIDO:', data, 'is_comanda:', is_comanda, 'mesa:', mesa)
+        current_app.logger.debug('Novo pedido: %s is_comanda=%s mesa=%s', data, is_comanda, mesa)
+        # Comanda nasce aberta; encerrar só por /comanda/<mesa>/close ou PUT .../status
+        if is_comanda and data.get('status_comanda', 'aberta') != 'aberta':
+            return reject_order('Comanda nova deve ter status_comanda "aberta"')
+        status_comanda = 'aberta' if is_comanda else None
 
         if is_comanda and mesa:
             customer_name = str(mesa)
@@ -68,36 +349,35 @@ def create_order():
             customer_name = data.get('customer_name')
             customer_phone = data.get('customer_phone')
 
+        try:
+            cart = parse_cart(data['items'])
+        except ValueError as e:
+            return reject_order(str(e))
+
+        # Buscar todos os itens do cardápio do carrinho em uma única consulta
+        menu_item_ids = {menu_item_id for menu_item_id, _, _ in cart}
+        menu_items = {
+            item.id: item
+            for item in MenuItem.query.filter(MenuItem.id.in_(menu_item_ids)).all()
+        }
+
         # Calcular total dos novos itens
         total_amount = 0
         order_items_data = []
 
-        for item_data in data['items']:
-            menu_item = MenuItem.query.get(item_data['menu_item_id'])
+        for menu_item_id, quantity, notes in cart:
+            menu_item = menu_items.get(menu_item_id)
             if not menu_item or not menu_item.is_active:
-                return jsonify({
-                    'success': False,
-                    'message': f'Item do cardápio {item_data["menu_item_id"]} não encontrado ou inativo'
-                }), 400
+                return reject_order(f'Item do cardápio {menu_item_id} não encontrado ou inativo')
 
             # Verificar disponibilidade para o tipo de pedido
             if data['order_type'] == 'delivery' and not menu_item.available_for_delivery:
-                return jsonify({
-                    'success': False,
-                    'message': f'Item "{menu_item.name}" não disponível para delivery'
-                }), 400
+                return reject_order(f'Item "{menu_item.name}" não disponível para delivery')
             elif data['order_type'] == 'local' and not menu_item.available_for_local:
-                return jsonify({
-                    'success': False,
-                    'message': f'Item "{menu_item.name}" não disponível para consumo local'
-                }), 400
+                return reject_order(f'Item "{menu_item.name}" não disponível para consumo local')
             elif data['order_type'] == 'comanda' and not menu_item.available_for_comanda:
-                return jsonify({
-                    'success': False,
-                    'message': f'Item "{menu_item.name}" não disponível para comanda'
-                }), 400
+                return reject_order(f'Item "{menu_item.name}" não disponível para comanda')
 
-            quantity = int(item_data['quantity'])
             unit_price = menu_item.price
             subtotal = quantity * unit_price
             total_amount += subtotal
@@ -107,55 +387,23 @@ def create_order():
                 'quantity': quantity,
                 'unit_price': unit_price,
                 'subtotal': subtotal,
-                'notes': item_data.get('notes', '')
+                'notes': notes
             })
 
-        # Buscar ou criar usuário
-        user = None
-        if customer_phone:
-            user = User.find_by_phone(customer_phone)
-            if not user:
-                user = User(
-                    customer_phone=customer_phone,
-                    customer_name=customer_name,
-                    customer_email=data.get('customer_email'),
-                    delivery_address=data.get('delivery_address')
-                )
-                db.session.add(user)
-                db.session.flush()  # Para obter o ID do usuário
-
-        # --- NOVA LÓGICA PARA COMANDA ---
+        # Comanda: no máximo uma aberta por mesa (índice único). O valor é
+        # somado à comanda existente com UPDATE atômico; se não houver, abre
+        # uma nova com INSERT ... ON CONFLICT DO NOTHING
         if is_comanda and mesa:
-            # Buscar comanda aberta existente
-            order = Order.query.filter_by(mesa=mesa, is_comanda=True, status_comanda='aberta').first()
-            if order:
-                # Adicionar itens à comanda existente
-                for item_data in order_items_data:
-                    order_item = OrderItem(
-                        order_id=order.id,
-                        **item_data
-                    )
-                    db.session.add(order_item)
-                    order.total_amount += item_data['subtotal']
-                order.status_comanda = 'aberta'  # Garante que a comanda fique aberta
-                order.is_comanda = True
-                order.mesa = mesa
-                db.session.commit()
-                return jsonify({
-                    'success': True,
-                    'message': 'Itens adicionados à comanda existente',
-                    'order': order.to_dict()
-                }), 200
-        # --- FIM DA NOVA LÓGICA ---
-
-        # Criar pedido (caso não exista comanda aberta)
-        if is_comanda and mesa:
-            is_comanda = True
-            try:
-                mesa = int(mesa)
-            except (TypeError, ValueError):
-                mesa = None
-        order = Order(
+            order_id = Order.add_to_open_comanda(mesa, total_amount)
+            if order_id:
+                return add_comanda_items(order_id, order_items_data, total_amount, idempotency_key)
+
+        # Buscar ou criar usuário
+        user = find_or_add_customer(
+            customer_phone, customer_name, data.get('customer_email'), data.get('delivery_address')
+        ) if customer_phone else None
+
+        order_values = dict(
             user_id=user.id if user else None,
             customer_name=customer_name,
             customer_phone=customer_phone,
@@ -163,36 +411,45 @@ def create_order():
             order_type=data['order_type'],
             is_comanda=is_comanda,
             mesa=mesa,
-            status_comanda=data.get('status_comanda', 'aberta') if is_comanda else None,
+            status_comanda=status_comanda,
             payment_status=data.get('payment_status', 'nao_pago'),
             total_amount=total_amount,
             delivery_address=data.get('delivery_address'),
             notes=data.get('notes')
         )
 
-        db.session.add(order)
-        db.session.flush()  # Para obter o ID do pedido
+        if is_comanda and mesa:
+            order_id = Order.open_comanda(order_values)
+            if order_id is None:
+                # Outra requisição abriu a comanda desta mesa ao mesmo tempo
+                order_id = Order.add_to_open_comanda(mesa, total_amount)
+                if order_id is None:
+                    raise RuntimeError(f'comanda da mesa {mesa} encerrada durante o lançamento, tente novamente')
+                return add_comanda_items(order_id, order_items_data, total_amount, idempotency_key)
+            order = db.session.get(Order, order_id)
+        else:
+            order = Order(**order_values)
+            db.session.add(order)
+            db.session.flush()  # Para obter o ID do pedido
+            order_id = order.id
 
         # Criar itens do pedido
-        for item_data in order_items_data:
-            order_item = OrderItem(
-                order_id=order.id,
-                **item_data
-            )
-            db.session.add(order_item)
+        insert_order_items(order_id, order_items_data)
+        record_sales(order, sales_lines(order_items_data))
+        OrderStatusEvent.record(
+            [(order_id, order.status)] + ([(order_id, order.status_comanda)] if order.is_comanda else [])
+        )
 
         # Atualizar estatísticas do usuário
         if user:
-            user.total_orders += 1
-            user.total_spent += total_amount
+            User.adjust_stats(user.id, orders=1, spent=total_amount)
 
-        db.session.commit()
-
-        return jsonify({
+        emit_order_event(db.session, 'order.created', order)
+        return commit_response({
             'success': True,
             'message': 'Pedido criado com sucesso',
-            'order': order.to_dict()
-        }), 201
+            'order': load_order(order_id).to_dict()
+        }, 201, idempotency_key)
 
     except Exception as e:
         db.session.rollback()
@@ -201,24 +458,96 @@ def create_order():
             'message': f'Erro ao criar pedido: {str(e)}'
         }), 500
 
+# Campos de status com máquina de estados: (valores válidos, transições)
+STATUS_FIELDS = {
+    'status': (ORDER_STATUSES, ORDER_TRANSITIONS),
+    'status_comanda': (COMANDA_STATUSES, COMANDA_TRANSITIONS),
+}
+
+def invalid_transition(field, current, new):
+    """Resposta 409 se `field` não pode ir de `current` para `new`; None se pode"""
+    statuses, transitions = STATUS_FIELDS[field]
+    if can_transition(current, new, transitions):
+        return None
+    allowed = [s for s in statuses if s in transitions.get(current, ())]
+    return jsonify({
+        'success': False,
+        'message': f'Transição inválida: {current} → {new}. '
+                   f'Próximos status válidos: {", ".join(allowed) or "nenhum"}'
+    }), 409
+
+def locked_order(order_id):
+    """Pedido relido do banco com a linha travada (SELECT ... FOR UPDATE) até o commit.
+
+    Estornos e reversões dos agregados usam total e itens lidos sob o lock: um
+    lançamento simultâneo na comanda (UPDATE atômico em add_to_open_comanda)
+    espera o commit, e um que já tenha terminado aparece na releitura. 404 se
+    o pedido não existir.
+    """
+    order = db.session.get(Order, order_id, with_for_update=True, populate_existing=True)
+    if order is None:
+        abort(404)
+    return order
+
 @order_bp.route('/orders/<int:order_id>/status', methods=['PUT'])
 def update_order_status(order_id):
-    """Atualizar status do pedido"""
-    order = Order.query.get_or_404(order_id)
+    """Atualizar status do pedido e/ou status da comanda (`status`, `status_comanda`).
+
+    As duas mudanças passam pela máquina de estados (409 se inválida) e
+    ficam no histórico. Cancelar uma comanda aberta também a encerra: a mesa
+    fica livre para uma comanda nova e os lançamentos seguintes não caem no
+    pedido cancelado. Reabrir o pedido não reabre a comanda. A decisão usa a
+    linha travada por locked_order(): um lançamento simultâneo espera o
+    commit e, vendo a comanda encerrada, abre uma nova.
+    """
+    order = locked_order(order_id)
     data = request.get_json()
 
-    if not data or 'status' not in data:
+    if not data or not any(field in data for field in STATUS_FIELDS):
         return jsonify({'success': False, 'message': 'Status é obrigatório'}), 400
 
-    valid_statuses = ['pendente', 'preparando', 'pronto', 'entregue', 'cancelado']
-    if data['status'] not in valid_statuses:
-        return jsonify({
-            'success': False,
-            'message': f'Status inválido. Valores válidos: {", ".join(valid_statuses)}'
-        }), 400
+    changes = {}
+    for field, (statuses, _) in STATUS_FIELDS.items():
+        if field not in data:
+            continue
+        if data[field] not in statuses:
+            return jsonify({
+                'success': False,
+                'message': f'Status inválido. Valores válidos: {", ".join(statuses)}'
+            }), 400
+        if field == 'status_comanda' and not order.is_comanda:
+            return jsonify({'success': False, 'message': 'Pedido não é uma comanda'}), 400
+        if data[field] != getattr(order, field):
+            conflict = invalid_transition(field, getattr(order, field), data[field])
+            if conflict:
+                return conflict
+            changes[field] = data[field]
+
+    if not changes:
+        return jsonify({'success': True, 'message': 'Status inalterado', 'order': order.to_dict()})
+
+    if (changes.get('status') == 'cancelado' and order.is_comanda and
+            changes.get('status_comanda', order.status_comanda) == 'aberta'):
+        conflict = invalid_transition('status_comanda', order.status_comanda, 'encerrada')
+        if conflict:
+            return conflict
+        changes['status_comanda'] = 'encerrada'
 
     try:
-        order.status = data['status']
+        previous_status = order.status
+        for field, value in changes.items():
+            setattr(order, field, value)
+        db.session.flush()
+        OrderStatusEvent.record([(order.id, value) for value in changes.values()])
+        # Cancelar (ou reabrir um cancelado) retira (ou devolve) o pedido dos agregados.
+        # O valor sai dos itens lidos depois do flush, não de order.total_amount:
+        # o SQLite ignora o FOR UPDATE e o total carregado antes pode estar velho
+        if (previous_status == 'cancelado') != (order.status == 'cancelado'):
+            sign = -1 if order.status == 'cancelado' else 1
+            lines = order_lines(order.id)
+            record_sales(order, lines, sign=sign)
+            User.adjust_stats(order.user_id, orders=sign, spent=sign * sum(line.revenue for line in lines))
+        emit_order_event(db.session, 'order.status', order)
         db.session.commit()
 
         return jsonify({
@@ -234,21 +563,25 @@ def update_order_status(order_id):
 @order_bp.route('/orders/<int:order_id>/payment', methods=['PUT'])
 def update_payment_status(order_id):
     """Atualizar status de pagamento do pedido"""
-    order = Order.query.get_or_404(order_id)
+    order = locked_order(order_id)
     data = request.get_json()
 
     if not data or 'payment_status' not in data:
         return jsonify({'success': False, 'message': 'Status de pagamento é obrigatório'}), 400
 
-    valid_payment_statuses = ['pago', 'nao_pago']
-    if data['payment_status'] not in valid_payment_statuses:
+    if data['payment_status'] not in PAYMENT_STATUSES:
         return jsonify({
             'success': False,
-            'message': f'Status de pagamento inválido. Valores válidos: {", ".join(valid_payment_statuses)}'
+            'message': f'Status de pagamento inválido. Valores válidos: {", ".join(PAYMENT_STATUSES)}'
         }), 400
 
     try:
+        previous_payment_status = order.payment_status
         order.payment_status = data['payment_status']
+        db.session.flush()
+        if order.status != 'cancelado' and previous_payment_status != order.payment_status:
+            record_payment(order, 1 if order.payment_status == 'pago' else -1)
+        emit_order_event(db.session, 'order.payment', order)
         db.session.commit()
 
         return jsonify({
@@ -282,6 +615,8 @@ def update_order(order_id):
         if 'notes' in data:
             order.notes = data['notes']
 
+        db.session.flush()
+        emit_order_event(db.session, 'order.updated', order)
         db.session.commit()
 
         return jsonify({
@@ -294,23 +629,53 @@ def update_order(order_id):
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Erro ao atualizar pedido: {str(e)}'}), 500
 
+def compute_order_stats():
+    """Calcula todas as estatísticas de pedidos em uma única consulta agregada"""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    is_today = Order.created_at >= today
+    not_cancelled = Order.status != 'cancelado'
+
+    columns = [
+        db.func.count(Order.id).label('total_orders'),
+        sum_if(not_cancelled, Order.total_amount).label('total_revenue'),
+        count_if(is_today).label('today_orders'),
+        sum_if(is_today & not_cancelled, Order.total_amount).label('today_revenue'),
+        sum_if(is_today & (Order.payment_status == 'pago'), Order.total_amount).label('today_paid_revenue'),
+    ]
+    columns += [count_if(Order.status == s).label(f'status_{s}') for s in ORDER_STATUSES]
+    columns += [count_if(Order.order_type == t).label(f'type_{t}') for t in ORDER_TYPES]
+    columns += [count_if(is_today & (Order.order_type == t)).label(f'today_type_{t}') for t in ORDER_TYPES]
+    columns += [count_if(Order.payment_status == p).label(f'payment_{p}') for p in PAYMENT_STATUSES]
+
+    row = db.session.query(*columns).one()._mapping
+
+    return {
+        'total_orders': row['total_orders'],
+        'pending_orders': row['status_pendente'],
+        'preparing_orders': row['status_preparando'],
+        'ready_orders': row['status_pronto'],
+        'delivered_orders': row['status_entregue'],
+        'cancelled_orders': row['status_cancelado'],
+        'total_revenue': row['total_revenue'],
+        'by_order_type': {t: row[f'type_{t}'] for t in ORDER_TYPES},
+        'by_payment_status': {p: row[f'payment_{p}'] for p in PAYMENT_STATUSES},
+        'today': {
+            'orders': row['today_orders'],
+            'revenue': row['today_revenue'],
+            'paid_revenue': row['today_paid_revenue'],
+            'by_order_type': {t: row[f'today_type_{t}'] for t in ORDER_TYPES}
+        }
+    }
+
 @order_bp.route('/orders/stats', methods=['GET'])
 def get_order_stats():
-    """Obter estatísticas dos pedidos"""
+    """Obter estatísticas dos pedidos (em cache por STATS_CACHE_TTL segundos)"""
     try:
-        total_orders = Order.query.count()
-        pending_orders = Order.query.filter(Order.status == 'pendente').count()
-        preparing_orders = Order.query.filter(Order.status == 'preparando').count()
-        ready_orders = Order.query.filter(Order.status == 'pronto').count()
+        stats = stats_cache.get_or_set('orders', current_app.config['STATS_CACHE_TTL'], compute_order_stats)
 
         return jsonify({
             'success': True,
-            'stats': {
-                'total_orders': total_orders,
-                'pending_orders': pending_orders,
-                'preparing_orders': preparing_orders,
-                'ready_orders': ready_orders
-            }
+            'stats': stats
         })
 
     except Exception as e:
@@ -319,9 +684,103 @@ def get_order_stats():
 @order_bp.route('/comanda/<int:mesa>', methods=['GET'])
 def get_comanda_by_mesa(mesa):
     """Buscar todos os pedidos de uma comanda/mesa específica que estejam abertos"""
-    orders = Order.query.filter_by(mesa=mesa, is_comanda=True, status_comanda='aberta').all()
+    orders = Order.query.options(Order.with_items()).filter_by(
+        mesa=mesa, is_comanda=True, status_comanda='aberta'
+    ).all()
     return jsonify({
         'success': True,
         'orders': [order.to_dict() for order in orders]
     })
 
+
+def comanda_bill(order_ids):
+    """Conta da comanda: itens agrupados por item do cardápio (pedidos cancelados não entram)"""
+    lines = db.session.query(
+        OrderItem.menu_item_id,
+        MenuItem.name,
+        db.func.sum(OrderItem.quantity).label('quantity'),
+        db.func.sum(OrderItem.subtotal).label('total')
+    ).join(Order, Order.id == OrderItem.order_id).join(MenuItem, MenuItem.id == OrderItem.menu_item_id).filter(
+        OrderItem.order_id.in_(order_ids), Order.status != 'cancelado'
+    ).group_by(OrderItem.menu_item_id, MenuItem.name).order_by(MenuItem.name).all()
+
+    items = [
+        {'menu_item_id': line.menu_item_id, 'name': line.name, 'quantity': line.quantity, 'total': round(line.total, 2)}
+        for line in lines
+    ]
+    return items, round(sum(line.total for line in lines), 2)
+
+@order_bp.route('/comanda/<int:mesa>/close', methods=['POST'])
+def close_comanda(mesa):
+    """Encerrar a comanda da mesa em uma transação: marca entregue e pago com um
+    único UPDATE e devolve a conta resumida (itens agrupados por item do cardápio).
+
+    Corpo opcional: {"payment_status": "pago" | "nao_pago"} (padrão "pago").
+    """
+    data = request.get_json(silent=True) or {}
+    payment_status = data.get('payment_status', 'pago')
+    if payment_status not in PAYMENT_STATUSES:
+        return jsonify({
+            'success': False,
+            'message': f'Status de pagamento inválido. Valores válidos: {", ".join(PAYMENT_STATUSES)}'
+        }), 400
+
+    try:
+        # Trava as linhas da comanda: lançamentos simultâneos esperam o
+        # encerramento e depois abrem uma comanda nova
+        orders = Order.query.filter_by(
+            mesa=mesa, is_comanda=True, status_comanda='aberta'
+        ).with_for_update().all()
+        if not orders:
+            return jsonify({'success': False, 'message': f'Mesa {mesa} não tem comanda aberta'}), 404
+
+        order_ids = [order.id for order in orders]
+        newly_paid = [
+            order for order in orders
+            if order.status != 'cancelado' and order.payment_status != 'pago' and payment_status == 'pago'
+        ]
+        newly_unpaid = [
+            order for order in orders
+            if order.status != 'cancelado' and order.payment_status == 'pago' and payment_status != 'pago'
+        ]
+
+        # Pedidos em andamento passam a entregue; cancelados continuam cancelados
+        transitions = [(order.id, 'entregue') for order in orders if order.status not in ('entregue', 'cancelado')]
+        transitions += [(order_id, 'encerrada') for order_id in order_ids]
+
+        db.session.execute(
+            db.update(Order).where(Order.id.in_(order_ids)).values(
+                status_comanda='encerrada',
+                status=db.case((Order.status == 'cancelado', Order.status), else_='entregue'),
+                payment_status=payment_status
+            ).execution_options(synchronize_session=False)
+        )
+        orders = Order.query.populate_existing().filter(Order.id.in_(order_ids)).all()
+
+        OrderStatusEvent.record(transitions)
+        for order in newly_paid:
+            record_payment(order, 1)
+        for order in newly_unpaid:
+            record_payment(order, -1)
+        for order in orders:
+            emit_order_event(db.session, 'order.status', order)
+
+        items, total = comanda_bill(order_ids)
+        db.session.commit()
+
+        return json_response({
+            'success': True,
+            'message': f'Comanda da mesa {mesa} encerrada',
+            'bill': {
+                'mesa': mesa,
+                'order_ids': order_ids,
+                'items': items,
+                'total': total,
+                'payment_status': payment_status,
+                'closed_at': datetime.utcnow().isoformat()
+            }
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Erro ao encerrar comanda: {str(e)}'}), 500
@@ -0,0 +1,178 @@
+from datetime import date, datetime, timedelta
+from flask import Blueprint, jsonify, request
+from src.models.user import db
+from src.models.menu import MenuItem
+from src.models.order import Order, OrderStatusEvent
+from src.models.report import DailyOrders, DailySales
+from src.utils.pagination import parse_limit
+
+report_bp = Blueprint('report', __name__)
+
+DEFAULT_REPORT_DAYS = 30
+
+# Etapas do relatório de latência: (de, para), a última é o tempo total
+LATENCY_STAGES = [
+    ('pendente', 'preparando'),
+    ('preparando', 'pronto'),
+    ('pronto', 'entregue'),
+    ('pendente', 'entregue'),
+]
+LATENCY_PERCENTILES = [50, 90, 95, 99]
+
+def parse_period():
+    """Lê date_from/date_to (YYYY-MM-DD, inclusivos); padrão: últimos 30 dias"""
+    date_to = request.args.get('date_to')
+    date_to = date.fromisoformat(date_to) if date_to else datetime.utcnow().date()
+    date_from = request.args.get('date_from')
+    date_from = date.fromisoformat(date_from) if date_from else date_to - timedelta(days=DEFAULT_REPORT_DAYS - 1)
+    return date_from, date_to
+
+def invalid_period():
+    return jsonify({
+        'success': False,
+        'message': 'Parâmetros inválidos: datas no formato YYYY-MM-DD e limit inteiro'
+    }), 400
+
+@report_bp.route('/reports/daily', methods=['GET'])
+def get_daily_report():
+    """Pedidos, faturamento e valor pago por dia (filtro opcional `type`)"""
+    try:
+        date_from, date_to = parse_period()
+    except ValueError:
+        return invalid_period()
+
+    order_type = request.args.get('type')
+
+    query = db.session.query(
+        DailyOrders.day,
+        db.func.sum(DailyOrders.order_count).label('orders'),
+        db.func.sum(DailyOrders.revenue).label('revenue'),
+        db.func.sum(DailyOrders.paid_revenue).label('paid_revenue')
+    ).filter(DailyOrders.day >= date_from, DailyOrders.day <= date_to)
+    if order_type:
+        query = query.filter(DailyOrders.order_type == order_type)
+    rows = query.group_by(DailyOrders.day).order_by(DailyOrders.day).all()
+
+    days = [{
+        'day': row.day.isoformat(),
+        'orders': row.orders,
+        'revenue': round(row.revenue, 2),
+        'paid_revenue': round(row.paid_revenue, 2)
+    } for row in rows]
+
+    return jsonify({
+        'success': True,
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'days': days,
+        'totals': {
+            'orders': sum(day['orders'] for day in days),
+            'revenue': round(sum(day['revenue'] for day in days), 2),
+            'paid_revenue': round(sum(day['paid_revenue'] for day in days), 2)
+        }
+    })
+
+@report_bp.route('/reports/items', methods=['GET'])
+def get_items_report():
+    """Itens mais vendidos no período (sort=quantity|revenue, filtro opcional `type`)"""
+    try:
+        date_from, date_to = parse_period()
+        limit = parse_limit(request.args.get('limit'), default=10)
+    except ValueError:
+        return invalid_period()
+
+    order_type = request.args.get('type')
+    sort = request.args.get('sort', 'quantity')
+
+    quantity = db.func.sum(DailySales.quantity).label('quantity')
+    revenue = db.func.sum(DailySales.revenue).label('revenue')
+    query = db.session.query(
+        DailySales.menu_item_id,
+        quantity,
+        revenue,
+        db.func.sum(DailySales.order_count).label('orders')
+    ).filter(DailySales.day >= date_from, DailySales.day <= date_to)
+    if order_type:
+        query = query.filter(DailySales.order_type == order_type)
+    totals = query.group_by(DailySales.menu_item_id).subquery()
+
+    rows = db.session.query(totals, MenuItem.name, MenuItem.category).join(
+        MenuItem, MenuItem.id == totals.c.menu_item_id
+    ).filter(totals.c.quantity > 0).order_by(
+        (totals.c.revenue if sort == 'revenue' else totals.c.quantity).desc()
+    ).limit(limit).all()
+
+    return jsonify({
+        'success': True,
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'items': [{
+            'menu_item_id': row.menu_item_id,
+            'name': row.name,
+            'category': row.category,
+            'quantity': row.quantity,
+            'revenue': round(row.revenue, 2),
+            'orders': row.orders
+        } for row in rows]
+    })
+
+def percentile(values, p):
+    """Percentil `p` (0-100) de uma lista ordenada, com interpolação linear"""
+    position = (len(values) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+@report_bp.route('/reports/latency', methods=['GET'])
+def get_latency_report():
+    """Percentis do tempo (segundos) em cada etapa da cozinha, para pedidos
+    criados no período (filtro opcional `type`).
+
+    Usa a primeira entrada de cada pedido em cada estado (order_status_event);
+    pedidos que pularam uma etapa não entram nela, só no tempo total.
+    """
+    try:
+        date_from, date_to = parse_period()
+    except ValueError:
+        return invalid_period()
+
+    order_type = request.args.get('type')
+    states = {state for stage in LATENCY_STAGES for state in stage}
+    codes = [OrderStatusEvent.CODES[state] for state in states]
+
+    query = db.session.query(
+        OrderStatusEvent.order_id,
+        OrderStatusEvent.state,
+        db.func.min(OrderStatusEvent.created_at).label('entered_at')
+    ).join(Order, Order.id == OrderStatusEvent.order_id).filter(
+        Order.created_at >= date_from,
+        Order.created_at < date_to + timedelta(days=1),
+        OrderStatusEvent.state.in_(codes)
+    )
+    if order_type:
+        query = query.filter(Order.order_type == order_type)
+
+    entered = {}
+    for row in query.group_by(OrderStatusEvent.order_id, OrderStatusEvent.state):
+        entered.setdefault(row.order_id, {})[OrderStatusEvent.STATES[row.state - 1]] = row.entered_at
+
+    stages = []
+    for start, end in LATENCY_STAGES:
+        durations = sorted(
+            (times[end] - times[start]).total_seconds()
+            for times in entered.values()
+            if start in times and end in times and times[end] >= times[start]
+        )
+        stage = {'from': start, 'to': end, 'count': len(durations)}
+        if durations:
+            stage['avg'] = round(sum(durations) / len(durations), 1)
+            stage.update({f'p{p}': round(percentile(durations, p), 1) for p in LATENCY_PERCENTILES})
+        stages.append(stage)
+
+    return jsonify({
+        'success': True,
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'orders': len(entered),
+        'stages': stages
+    })
@@ -1,50 +1,63 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from src.models.user import User, db
-from src.models.order import Order
+from src.models.order import Order, ACTIVE_STATUSES
+from src.routes.menu import str_to_bool
+from src.search import apply_search
+from src.utils.cache import TTLCache
+from src.utils.pagination import DEFAULT_PAGE_SIZE, keyset_page, parse_limit
+from src.utils.query import count_if
+from src.utils.serialization import json_response, serialize_orders, summarize_orders
 
 user_bp = Blueprint('user', __name__)
 
+stats_cache = TTLCache()
+
+# Pedidos resumidos no login leve
+RECENT_ORDERS = 10
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    """Obter todos os usuários/clientes com filtros opcionais"""
+    """Obter usuários/clientes com busca ranqueada e paginação (limit/offset)"""
     search = request.args.get('search', '')
-    sort_by = request.args.get('sort_by', 'created_at')
+    sort_by = request.args.get('sort_by', 'relevance')
     sort_order = request.args.get('sort_order', 'desc')
 
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Parâmetros inválidos: limit e offset devem ser inteiros'}), 400
+
     query = User.query
 
-    # Filtro de busca
+    # Busca (índice trigram/FTS quando disponível, ver src/search.py)
+    rank = None
     if search:
-        search_term = f'%{search}%'
-        query = query.filter(
-            db.or_(
-                User.customer_name.ilike(search_term),
-                User.customer_phone.ilike(search_term),
-                User.customer_email.ilike(search_term),
-                User.delivery_address.ilike(search_term)
-            )
-        )
+        query, rank = apply_search(query, search)
 
-    # Ordenação
-    if sort_by == 'name':
-        order_column = User.customer_name
-    elif sort_by == 'total_orders':
-        order_column = User.total_orders
-    elif sort_by == 'total_spent':
-        order_column = User.total_spent
+    # Ordenação: por relevância quando há busca, senão pela coluna escolhida
+    if sort_by == 'relevance' and rank is not None:
+        order_by = [rank]
     else:
-        order_column = User.created_at
-
-    if sort_order == 'asc':
-        query = query.order_by(order_column.asc())
-    else:
-        query = query.order_by(order_column.desc())
-
-    users = query.all()
+        if sort_by == 'name':
+            order_column = User.customer_name
+        elif sort_by == 'total_orders':
+            order_column = User.total_orders
+        elif sort_by == 'total_spent':
+            order_column = User.total_spent
+        else:
+            order_column = User.created_at
+        order_by = [order_column.asc() if sort_order == 'asc' else order_column.desc()]
+
+    users = query.order_by(*order_by, User.id.desc()).offset(offset).limit(limit + 1).all()
+    has_more = len(users) > limit
+    users = users[:limit]
 
     return jsonify({
         'success': True,
-        'users': [user.to_dict() for user in users]
+        'users': [user.to_dict() for user in users],
+        'has_more': has_more,
+        'next_offset': offset + limit if has_more else None
     })
 
 @user_bp.route('/users', methods=['POST'])
@@ -66,39 +79,112 @@ def get_user(user_id):
         'user': user.to_dict()
     })
 
+def user_orders_page(user_id, cursor=None, limit=DEFAULT_PAGE_SIZE, summary=False, compact=False):
+    """Página do histórico de pedidos do cliente, por cursor (created_at, id).
+
+    Retorna (orders, menu_items, next_cursor); com summary=True os pedidos vêm
+    resumidos, sem itens.
+    """
+    query = db.session.query(Order.id, Order.created_at).filter(Order.user_id == user_id)
+    keys, next_cursor = keyset_page(query, Order, cursor, limit)
+    order_ids = [key.id for key in keys]
+
+    if summary:
+        return summarize_orders(order_ids), None, next_cursor
+    orders, menu_items = serialize_orders(order_ids, compact=compact)
+    return orders, menu_items, next_cursor
+
 @user_bp.route('/users/<int:user_id>/orders', methods=['GET'])
 def get_user_orders(user_id):
-    """Obter histórico de pedidos de um usuário"""
+    """Obter histórico de pedidos de um usuário, paginado por cursor"""
     user = User.query.get_or_404(user_id)
 
-    # Buscar pedidos do usuário
-    orders = Order.query.filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
+    try:
+        limit = parse_limit(request.args.get('limit'))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Parâmetros inválidos: limit deve ser inteiro'}), 400
 
-    return jsonify({
+    compact = str_to_bool(request.args.get('compact', False))
+    summary = str_to_bool(request.args.get('summary', False))
+
+    try:
+        orders, menu_items, next_cursor = user_orders_page(
+            user_id, request.args.get('cursor'), limit, summary=summary, compact=compact
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    payload = {
         'success': True,
         'user': user.to_dict(),
-        'orders': [order.to_dict() for order in orders]
-    })
+        'orders': orders,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    }
+    if compact and not summary:
+        payload['menu_items'] = menu_items
+    return json_response(payload)
+
+def login_payload(user, light=False, recent=RECENT_ORDERS):
+    """Pedidos devolvidos no login por telefone.
+
+    Completo: todos os pedidos com itens, e o pedido atual (mais recente
+    pendente ou preparando) tirado da mesma lista. Leve: o pedido atual com
+    itens e só os `recent` pedidos mais recentes resumidos; o restante do
+    histórico vem de /users/<id>/orders a partir de `next_cursor`.
+    """
+    if light:
+        current_id = db.session.query(Order.id).filter(
+            Order.user_id == user.id,
+            Order.status.in_(ACTIVE_STATUSES)
+        ).order_by(Order.created_at.desc()).limit(1).scalar()
+        current_order = serialize_orders([current_id])[0][0] if current_id else None
+        orders, _, next_cursor = user_orders_page(user.id, limit=recent, summary=True)
+        return {
+            'user': user.to_dict(),
+            'orders': orders,
+            'current_order': current_order,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+
+    order_ids = [row.id for row in db.session.query(Order.id).filter(Order.user_id == user.id)
+                 .order_by(Order.created_at.desc(), Order.id.desc())]
+    orders, _ = serialize_orders(order_ids)
+    current_order = next((order for order in orders if order['status'] in ACTIVE_STATUSES), None)
+    return {
+        'user': user.to_dict(),
+        'orders': orders,
+        'current_order': current_order
+    }
+
+def compute_user_stats():
+    """Calcula as estatísticas de clientes: um agregado e o top 5"""
+    row = db.session.query(
+        db.func.count(User.id).label('total_users'),
+        count_if(User.total_orders > 0).label('users_with_orders'),
+        db.func.coalesce(db.func.sum(User.total_spent), 0).label('total_revenue')
+    ).one()
+
+    # Top 5 clientes por valor gasto
+    top_spenders = User.query.filter(User.total_spent > 0).order_by(User.total_spent.desc()).limit(5).all()
+
+    return {
+        'total_users': row.total_users,
+        'users_with_orders': row.users_with_orders,
+        'total_revenue': row.total_revenue,
+        'top_spenders': [user.to_dict() for user in top_spenders]
+    }
 
 @user_bp.route('/users/stats', methods=['GET'])
 def get_user_stats():
-    """Obter estatísticas dos usuários"""
+    """Obter estatísticas dos usuários (em cache por STATS_CACHE_TTL segundos)"""
     try:
-        total_users = User.query.count()
-        users_with_orders = User.query.filter(User.total_orders > 0).count()
-        total_revenue = db.session.query(db.func.sum(User.total_spent)).scalar() or 0
-
-        # Top 5 clientes por valor gasto
-        top_spenders = User.query.filter(User.total_spent > 0).order_by(User.total_spent.desc()).limit(5).all()
+        stats = stats_cache.get_or_set('users', current_app.config['STATS_CACHE_TTL'], compute_user_stats)
 
         return jsonify({
             'success': True,
-            'stats': {
-                'total_users': total_users,
-                'users_with_orders': users_with_orders,
-                'total_revenue': total_revenue,
-                'top_spenders': [user.to_dict() for user in top_spenders]
-            }
+            'stats': stats
         })
 
     except Exception as e:
@@ -145,7 +231,7 @@ def delete_user(user_id):
 # Novas rotas para autenticação por telefone
 @user_bp.route('/auth/phone', methods=['POST'])
 def authenticate_by_phone():
-    """Autenticar usuário por telefone"""
+    """Autenticar usuário por telefone (com `light: true`, resposta leve: ver login_payload)"""
     data = request.get_json()
 
     if not data or not data.get('phone'):
@@ -154,31 +240,25 @@ def authenticate_by_phone():
             'message': 'Telefone é obrigatório'
         }), 400
 
+    try:
+        recent = parse_limit(data.get('recent'), default=RECENT_ORDERS)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Parâmetros inválidos: recent deve ser inteiro'}), 400
+
     try:
         phone = data['phone'].strip()
         name = data.get('name', '').strip() or None
         email = data.get('email', '').strip() or None
         address = data.get('address', '').strip() or None
 
+        light = str_to_bool(data.get('light', False))
+
         # Busca ou cria usuário
         user = User.find_or_create_by_phone(phone, name, email, address)
 
-        # Busca pedidos do usuário
-        orders = Order.query.filter_by(user_id=user.id).order_by(Order.created_at.desc()).all()
-
-        # Busca pedido atual (mais recente com status pendente ou preparando)
-        current_order = Order.query.filter(
-            Order.user_id == user.id,
-            Order.status.in_(['pendente', 'preparando'])
-        ).order_by(Order.created_at.desc()).first()
-
-        return jsonify({
-            'success': True,
-            'user': user.to_dict(),
-            'orders': [order.to_dict() for order in orders],
-            'current_order': current_order.to_dict() if current_order else None,
-            'message': 'Usuário autenticado com sucesso'
-        })
+        payload = login_payload(user, light, recent)
+        payload.update({'success': True, 'message': 'Usuário autenticado com sucesso'})
+        return json_response(payload)
 
     except Exception as e:
         return jsonify({
@@ -188,7 +268,12 @@ def authenticate_by_phone():
 
 @user_bp.route('/users/phone/<phone>', methods=['GET'])
 def get_user_by_phone(phone):
-    """Buscar usuário por telefone"""
+    """Buscar usuário por telefone (com ?light=true, resposta leve: ver login_payload)"""
+    try:
+        recent = parse_limit(request.args.get('recent'), default=RECENT_ORDERS)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Parâmetros inválidos: recent deve ser inteiro'}), 400
+
     try:
         user = User.find_by_phone(phone)
 
@@ -198,21 +283,11 @@ def get_user_by_phone(phone):
                 'message': 'Usuário não encontrado'
             }), 404
 
-        # Busca pedidos do usuário
-        orders = Order.query.filter_by(user_id=user.id).order_by(Order.created_at.desc()).all()
-
-        # Busca pedido atual
-        current_order = Order.query.filter(
-            Order.user_id == user.id,
-            Order.status.in_(['pendente', 'preparando'])
-        ).order_by(Order.created_at.desc()).first()
+        light = str_to_bool(request.args.get('light', False))
 
-        return jsonify({
-            'success': True,
-            'user': user.to_dict(),
-            'orders': [order.to_dict() for order in orders],
-            'current_order': current_order.to_dict() if current_order else None
-        })
+        payload = login_payload(user, light, recent)
+        payload['success'] = True
+        return json_response(payload)
 
     except Exception as e:
         return jsonify({
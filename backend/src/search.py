@@ -0,0 +1,108 @@
+"""
+Busca de clientes (GET /api/users?search=) com índice e ranking.
+
+- PostgreSQL: `ILIKE` sobre um documento único (nome, telefone, email,
+  endereço e telefone normalizado) coberto por um índice GIN pg_trgm
+  (ix_user_search_trgm), ordenado por word_similarity
+- SQLite: tabela FTS5 `user_search` com tokenizer trigram, mantida por
+  triggers, ordenada por bm25
+
+Índices e tabela são criados por migrate_search_index.py. Sem eles a busca
+continua funcionando com `LIKE` sem índice (e, no SQLite, sem ranking).
+Termos com menos de 3 caracteres não são indexáveis por trigramas e também
+caem no `LIKE`.
+"""
+
+from sqlalchemy import text
+from src.models.user import db, User, normalize_phone
+
+MIN_INDEXED_TERM = 3
+
+SEARCH_COLUMNS = [
+    User.customer_name, User.customer_phone, User.customer_email,
+    User.delivery_address, User.phone_normalized
+]
+
+def build_document(columns):
+    """Documento de busca do PostgreSQL: lower(nome || ' ' || telefone || ...).
+
+    A expressão da consulta precisa ser idêntica à do índice e IMMUTABLE (por
+    isso || com coalesce, e não concat_ws).
+    """
+    document = db.func.coalesce(columns[0], '')
+    for column in columns[1:]:
+        document = document.concat(' ').concat(db.func.coalesce(column, ''))
+    return db.func.lower(document)
+
+search_document = build_document(SEARCH_COLUMNS)
+
+TRIGRAM_INDEX = 'ix_user_search_trgm'
+
+FTS_TABLE = 'user_search'
+FTS_COLUMNS = ['customer_name', 'customer_phone', 'customer_email', 'delivery_address', 'phone_normalized']
+
+_pg_trgm_available = False
+
+def search_terms(term):
+    """O termo digitado e, se parecer telefone, também só os dígitos normalizados"""
+    terms = [term.strip().lower()]
+    phone = normalize_phone(term)
+    if phone and phone.isdigit() and phone not in terms:
+        terms.append(phone)
+    return [t for t in terms if t]
+
+def escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def has_pg_trgm():
+    global _pg_trgm_available
+    if not _pg_trgm_available:
+        _pg_trgm_available = bool(db.session.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        ).scalar())
+    return _pg_trgm_available
+
+def has_fts_table():
+    return bool(db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+    ).scalar())
+
+def like_filter(terms):
+    """Fallback sem índice: LIKE em cada coluna"""
+    return db.or_(*[
+        column.ilike(f'%{escape_like(term)}%', escape='\\')
+        for term in terms for column in SEARCH_COLUMNS
+    ])
+
+def apply_search(query, term):
+    """Filtra `query` (sobre User) pelo termo.
+
+    Retorna (query, rank): rank é uma expressão para ORDER BY (já na direção
+    certa) ou None quando não há ranking disponível.
+    """
+    terms = search_terms(term)
+    if not terms:
+        return query, None
+
+    dialect = db.session.get_bind().dialect.name
+    indexable = all(len(t) >= MIN_INDEXED_TERM for t in terms)
+
+    if dialect == 'postgresql':
+        query = query.filter(db.or_(*[
+            search_document.like(f'%{escape_like(t)}%', escape='\\') for t in terms
+        ]))
+        if not has_pg_trgm():
+            return query, None
+        rank = db.func.greatest(*[db.func.word_similarity(t, search_document) for t in terms])
+        return query, rank.desc()
+
+    if dialect == 'sqlite' and indexable and has_fts_table():
+        match = ' OR '.join('"{}"'.format(t.replace('"', '""')) for t in terms)
+        matches = db.select(
+            db.column('rowid').label('user_id'),
+            db.literal_column(f'bm25({FTS_TABLE})').label('rank')
+        ).select_from(db.table(FTS_TABLE)).where(db.literal_column(FTS_TABLE).op('MATCH')(match)).subquery()
+        query = query.join(matches, matches.c.user_id == User.id)
+        return query, matches.c.rank.asc()
+
+    return query.filter(like_filter(terms)), None
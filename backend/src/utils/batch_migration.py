@@ -0,0 +1,160 @@
+"""
+Migrações de dados em lotes, com SQL set-based.
+
+Cada etapa é um comando SQL (INSERT ... SELECT, UPDATE ... FROM, DELETE)
+aplicado a uma faixa de ids por vez. Cada lote roda na sua própria transação
+curta junto com o checkpoint (migration_checkpoint), então uma execução
+interrompida continua de onde parou. Ao terminar sem erro os checkpoints da
+migração são apagados: a próxima execução processa tudo de novo. Em modo dry-run tudo roda numa única
+transação desfeita no final: as contagens são reais, nada é gravado.
+
+Uso típico em um script:
+
+    args = migration_args('Descrição')
+    with BatchMigration('nome', args.batch_size, args.dry_run, args.restart) as migration:
+        migration.run_batched('etapa', Order.id, lambda lo, hi: migration.execute(...).rowcount)
+        migration.run('outra etapa', lambda: ...)
+"""
+
+import argparse
+import time
+from datetime import datetime
+from src.models.user import db
+from src.models.migration import MigrationCheckpoint
+
+DEFAULT_BATCH_SIZE = 5000
+
+def migration_args(description):
+    """Argumentos comuns dos scripts de migração"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--dry-run', action='store_true',
+                        help='executa tudo e desfaz no final, mostrando as contagens')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'ids por lote (padrão {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--restart', action='store_true',
+                        help='ignora os checkpoints e processa tudo de novo')
+    return parser.parse_args()
+
+class BatchMigration:
+    """Executa etapas em lotes por faixa de id, com checkpoint e relatório"""
+
+    def __init__(self, name, batch_size=DEFAULT_BATCH_SIZE, dry_run=False, restart=False):
+        self.name = name
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.restart = restart
+        self.report = []
+
+    def __enter__(self):
+        self.connection = db.engine.connect()
+        self.transaction = self.connection.begin()
+        if self.dry_run:
+            print("🧪 Dry-run: nenhuma alteração será gravada")
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            if exc_type or self.dry_run:
+                self.transaction.rollback()
+            else:
+                self.clear_checkpoints()
+                self.transaction.commit()
+        finally:
+            self.connection.close()
+        if not exc_type:
+            self.print_report()
+        return False
+
+    def execute(self, stmt, *args):
+        return self.connection.execute(stmt, *args)
+
+    def commit(self):
+        """Encerra o lote atual (no dry-run a transação segue aberta)"""
+        if self.dry_run:
+            return
+        self.transaction.commit()
+        self.transaction = self.connection.begin()
+
+    def _checkpoint_key(self, step):
+        return f'{self.name}:{step}'
+
+    def get_checkpoint(self, step):
+        if self.restart:
+            return 0
+        table = MigrationCheckpoint.__table__
+        last_id = self.execute(
+            db.select(table.c.last_id).where(table.c.name == self._checkpoint_key(step))
+        ).scalar()
+        return last_id or 0
+
+    def save_checkpoint(self, step, last_id, rows):
+        table = MigrationCheckpoint.__table__
+        key = self._checkpoint_key(step)
+        values = {'last_id': last_id, 'rows': rows, 'updated_at': datetime.utcnow()}
+        if not self.execute(table.update().where(table.c.name == key).values(**values)).rowcount:
+            self.execute(table.insert().values(name=key, **values))
+
+    def clear_checkpoints(self):
+        """Apaga os checkpoints de todas as etapas desta migração"""
+        table = MigrationCheckpoint.__table__
+        self.execute(table.delete().where(table.c.name.startswith(f'{self.name}:', autoescape=True)))
+
+    def run(self, step, apply):
+        """Executa uma etapa única (não fatiada). apply() retorna linhas afetadas"""
+        print(f"🔄 {step}...")
+        start = time.perf_counter()
+        rows = apply() or 0
+        self.commit()
+        self._record(step, rows, time.perf_counter() - start)
+        return rows
+
+    def run_batched(self, step, id_column, apply, where=()):
+        """Executa apply(lo, hi) para faixas [lo, hi) de id_column.
+
+        where restringe as linhas consideradas ao calcular as faixas (os
+        comandos de apply devem aplicar o mesmo filtro). Retorna o total de
+        linhas afetadas.
+        """
+        print(f"🔄 {step}...")
+        start = time.perf_counter()
+        last_id = self.get_checkpoint(step)
+
+        def next_id(after):
+            return self.execute(
+                db.select(db.func.min(id_column)).where(id_column > after, *where)
+            ).scalar()
+
+        lo = next_id(last_id)
+        max_id = self.execute(db.select(db.func.max(id_column)).where(*where)).scalar()
+        if lo is None:
+            print("  ✅ Nada a processar")
+            self._record(step, 0, time.perf_counter() - start)
+            return 0
+
+        first_id, total = lo, 0
+        while lo is not None and lo <= max_id:
+            hi = lo + self.batch_size
+            total += apply(lo, hi) or 0
+            # Não além de max_id: ids criados depois entram na próxima execução
+            self.save_checkpoint(step, min(hi - 1, max_id), total)
+            self.commit()
+
+            elapsed = time.perf_counter() - start
+            done = min(hi - first_id, max_id - first_id + 1) / (max_id - first_id + 1)
+            print(f"  ⏳ ids {lo}-{min(hi - 1, max_id)} · {done:.0%} · {total} linhas · "
+                  f"{total / elapsed if elapsed else 0:.0f} linhas/s")
+            lo = next_id(hi - 1)
+
+        self._record(step, total, time.perf_counter() - start)
+        return total
+
+    def _record(self, step, rows, seconds):
+        self.report.append((step, rows, seconds))
+        print(f"  ✅ {step}: {rows} linhas em {seconds:.2f}s")
+
+    def print_report(self):
+        print("\n📊 Resumo da migração" + (" (dry-run, nada gravado)" if self.dry_run else ""))
+        print("-" * 60)
+        for step, rows, seconds in self.report:
+            rate = rows / seconds if seconds else 0
+            print(f"  {step:<40} {rows:>8} linhas  {seconds:7.2f}s  {rate:8.0f}/s")
@@ -0,0 +1,48 @@
+import threading
+import time
+
+class TTLCache:
+    """Cache em memória do processo (por worker) com expiração por tempo.
+
+    Apenas uma thread recalcula um valor expirado; as demais aguardam e
+    reutilizam o resultado, então uma rajada de requisições custa uma única
+    ida ao banco.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+        self._compute_lock = threading.Lock()
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+        if entry and entry[0] > time.monotonic():
+            return True, entry[1]
+        return False, None
+
+    def get_or_set(self, key, ttl, factory):
+        """Retorna o valor em cache para key ou o calcula com factory()"""
+        if ttl <= 0:
+            return factory()
+
+        found, value = self._lookup(key)
+        if found:
+            return value
+
+        with self._compute_lock:
+            found, value = self._lookup(key)
+            if found:
+                return value
+            value = factory()
+            with self._lock:
+                self._data[key] = (time.monotonic() + ttl, value)
+            return value
+
+    def invalidate(self, key=None):
+        """Remove uma chave (ou todas) do cache"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
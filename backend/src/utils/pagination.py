@@ -0,0 +1,68 @@
+import base64
+from datetime import datetime, timedelta
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Converte o parâmetro limit da query string, limitado a [1, maximum]"""
+    if value in (None, ''):
+        return default
+    return max(1, min(int(value), maximum))
+
+def parse_datetime(value, end_of_day=False):
+    """Converte data (YYYY-MM-DD) ou data/hora ISO em datetime.
+
+    Com end_of_day=True uma data sem hora vira o início do dia seguinte,
+    para ser usada como limite exclusivo (created_at < valor).
+    """
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+def encode_cursor(created_at, row_id):
+    """Gera um cursor opaco a partir da chave (created_at, id) do último item"""
+    raw = f'{created_at.isoformat()}|{row_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decodifica um cursor gerado por encode_cursor. Levanta ValueError se inválido"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+def parse_watermark(value):
+    """Watermark do feed de mudanças como (updated_at, id).
+
+    Aceita o formato de encode_cursor ou uma data/hora ISO (id 0, formato
+    antigo). Levanta ValueError se inválido.
+    """
+    try:
+        return parse_datetime(value), 0
+    except ValueError:
+        return decode_cursor(value)
+
+def keyset_page(query, model, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Pagina uma query por (created_at, id) decrescente.
+
+    Retorna (itens, next_cursor). next_cursor é None na última página.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(
+            (model.created_at < created_at) |
+            ((model.created_at == created_at) & (model.id < row_id))
+        )
+
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return rows, next_cursor
@@ -0,0 +1,15 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models.user import db
+
+def count_if(condition):
+    """COUNT condicional portável (SQLite e PostgreSQL)"""
+    return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+
+def sum_if(condition, column):
+    """SUM condicional portável (SQLite e PostgreSQL)"""
+    return db.func.coalesce(db.func.sum(db.case((condition, column), else_=0)), 0)
+
+def insert_on_conflict(model):
+    """INSERT do dialeto da sessão, com suporte a ON CONFLICT (SQLite e PostgreSQL)"""
+    dialect = postgresql if db.session.get_bind().dialect.name == 'postgresql' else sqlite
+    return dialect.insert(model)
@@ -0,0 +1,96 @@
+"""
+Serialização rápida de pedidos a partir de tuplas de colunas.
+
+Evita instanciar objetos ORM e chamar to_dict() por linha: pedidos, itens e
+itens do cardápio são lidos com três SELECTs de colunas e codificados de uma
+vez com orjson (se instalado) ou com o json da biblioteca padrão.
+
+O formato padrão é o mesmo de Order.to_dict(). No modo compacto cada item
+traz apenas menu_item_id, e os itens do cardápio vêm uma única vez no mapa
+`menu_items` da resposta. Resumos (summarize_orders) não trazem itens, só a
+quantidade deles em `item_count`.
+"""
+
+import json
+import time
+from datetime import date, datetime
+from flask import current_app
+from src.metrics import record_serialization
+from src.models.user import db
+from src.models.order import Order, OrderItem
+from src.models.menu import MenuItem
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Tipo não serializável: {type(value).__name__}')
+
+def dumps(payload):
+    """Codifica payload em bytes JSON usando o backend mais rápido disponível"""
+    start = time.perf_counter()
+    try:
+        if orjson is not None:
+            return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(payload, default=_default, ensure_ascii=False, separators=(',', ':')).encode()
+    finally:
+        record_serialization(time.perf_counter() - start)
+
+def json_response(payload, status=200):
+    """Resposta JSON pré-codificada (substitui jsonify nos caminhos quentes)"""
+    return current_app.response_class(dumps(payload), status=status, mimetype='application/json')
+
+def _rows(table, column, ids):
+    if not ids:
+        return []
+    return db.session.execute(db.select(table).where(column.in_(ids))).mappings().all()
+
+def serialize_orders(order_ids, compact=False):
+    """Serializa os pedidos (na ordem de order_ids) com seus itens.
+
+    Retorna (orders, menu_items). menu_items é um dict id -> item do cardápio
+    no modo compacto e None no modo completo.
+    """
+    orders = {row['id']: dict(row) for row in _rows(Order.__table__, Order.__table__.c.id, order_ids)}
+    items = _rows(OrderItem.__table__, OrderItem.__table__.c.order_id, list(orders))
+
+    menu_item_ids = {row['menu_item_id'] for row in items}
+    menu_items = {
+        row['id']: dict(row)
+        for row in _rows(MenuItem.__table__, MenuItem.__table__.c.id, list(menu_item_ids))
+    }
+
+    for order in orders.values():
+        order['items'] = []
+    for row in sorted(items, key=lambda row: row['id']):
+        item = dict(row)
+        if not compact:
+            item['menu_item'] = menu_items.get(row['menu_item_id'])
+        orders[row['order_id']]['items'].append(item)
+
+    result = [orders[order_id] for order_id in order_ids if order_id in orders]
+    return result, (menu_items if compact else None)
+
+SUMMARY_COLUMNS = [
+    'id', 'order_type', 'status', 'payment_status', 'total_amount', 'customer_name',
+    'created_at', 'updated_at', 'is_comanda', 'mesa', 'status_comanda'
+]
+
+def summarize_orders(order_ids):
+    """Resumos dos pedidos (na ordem de order_ids), sem itens: um único SELECT"""
+    if not order_ids:
+        return []
+    table = Order.__table__
+    item_count = db.select(db.func.count(OrderItem.__table__.c.id)).where(
+        OrderItem.__table__.c.order_id == table.c.id
+    ).scalar_subquery()
+    rows = db.session.execute(
+        db.select(*[table.c[name] for name in SUMMARY_COLUMNS], item_count.label('item_count'))
+        .where(table.c.id.in_(order_ids))
+    ).mappings().all()
+    summaries = {row['id']: dict(row) for row in rows}
+    return [summaries[order_id] for order_id in order_ids if order_id in summaries]
@@ -0,0 +1,60 @@
+import hashlib
+import threading
+import time
+from src.models.cache import CacheVersion
+
+class VersionedCache:
+    """Cache de respostas por worker invalidado por um contador de versão no banco.
+
+    A versão é relida do banco no máximo a cada check_interval segundos, então
+    uma alteração feita em outro worker aparece depois desse intervalo; no
+    próprio worker, invalidate() força a releitura na próxima requisição.
+    Cada entrada guarda o corpo já serializado e seu ETag forte. O número de
+    entradas é limitado a max_entries (as mais antigas saem primeiro), para
+    que parâmetros arbitrários na URL não façam o cache crescer sem limite.
+    """
+
+    def __init__(self, name, max_entries=64):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current_version(self, check_interval):
+        now = time.monotonic()
+        if self._version is None or now - self._checked_at >= check_interval:
+            version = CacheVersion.get(self.name)
+            with self._lock:
+                if version != self._version:
+                    self._entries.clear()
+                self._version = version
+                self._checked_at = now
+        return self._version
+
+    def get(self, key, check_interval, build):
+        """Retorna (corpo, etag) para key, gerando o corpo com build() se necessário"""
+        version = self.current_version(check_interval)
+        entry = self._entries.get(key)
+        if entry and entry[0] == version:
+            return entry[1], entry[2]
+
+        body = build()
+        etag = f'{self.name}-{version}-{hashlib.sha1(body).hexdigest()[:16]}'
+        with self._lock:
+            if self._version == version:
+                if key not in self._entries and len(self._entries) >= self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+                self._entries[key] = (version, body, etag)
+        return body, etag
+
+    def bump(self):
+        """Marca o conteúdo como alterado (chamar antes do commit da alteração)"""
+        CacheVersion.bump(self.name)
+
+    def invalidate(self):
+        """Força a releitura da versão na próxima requisição deste worker"""
+        with self._lock:
+            self._version = None
+            self._entries.clear()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Teste de estresse da comanda: vários garçons (threads) lançando itens na mesma
+mesa ao mesmo tempo via POST /api/orders.
+
+Ao final confere que existe exatamente uma comanda aberta para a mesa, que o
+total dela é a soma de todos os lançamentos e que as estatísticas do cliente
+da mesa e os agregados do dia batem. Com --cancel, a comanda é cancelada no
+meio dos lançamentos: os seguintes têm de cair em uma comanda nova, e o
+cancelamento tem de retirar dos agregados exatamente o que estava na comanda
+cancelada. Sai com código 1 se algo divergir.
+
+Roda em um SQLite temporário, ignorando o DATABASE_URL do ambiente. Para
+testar em outro banco de teste, passe --database-url (nunca o de produção):
+
+    python stress_comanda.py --threads 8 --requests 25
+    python stress_comanda.py --cancel
+    python stress_comanda.py --database-url postgresql://localhost/stress
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Só usa outro banco com --database-url explícito: o DATABASE_URL do ambiente
+# (no Railway, o de produção) é ignorado
+pre_parser = argparse.ArgumentParser(add_help=False)
+pre_parser.add_argument('--database-url')
+os.environ['DATABASE_URL'] = (pre_parser.parse_known_args()[0].database_url or
+                              f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'stress.db')}")
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.models.user import db, User
+from src.models.order import Order, OrderItem
+from src.models.menu import MenuItem
+from src.models.report import DailyOrders
+
+def hammer(mesa, menu_item_id, requests, barrier, errors, progress):
+    """Um garçom: `requests` lançamentos de 1 unidade na mesa"""
+    client = app.test_client()
+    barrier.wait()
+    for _ in range(requests):
+        response = client.post('/api/orders', json={
+            'order_type': 'comanda',
+            'mesa': mesa,
+            'items': [{'menu_item_id': menu_item_id, 'quantity': 1}]
+        })
+        if response.status_code not in (200, 201):
+            errors.append(response.get_json().get('message'))
+        progress.tick()
+
+class Progress:
+    """Conta os lançamentos feitos e avisa quando chega à metade"""
+
+    def __init__(self, total):
+        self.half = total // 2
+        self.done = 0
+        self.lock = threading.Lock()
+        self.reached = threading.Event()
+
+    def tick(self):
+        with self.lock:
+            self.done += 1
+            if self.done >= self.half:
+                self.reached.set()
+
+def cancel_midway(mesa, barrier, progress, errors):
+    """Cancela a comanda aberta da mesa com metade dos lançamentos feitos"""
+    client = app.test_client()
+    barrier.wait()
+    progress.reached.wait()
+    with app.app_context():
+        comanda = Order.query.filter_by(mesa=mesa, is_comanda=True, status_comanda='aberta').first()
+        comanda_id = comanda.id if comanda else None
+    if comanda_id is None:
+        errors.append('nenhuma comanda aberta para cancelar')
+        return
+    response = client.put(f'/api/orders/{comanda_id}/status', json={'status': 'cancelado'})
+    if response.status_code != 200:
+        errors.append(response.get_json().get('message'))
+
+def check(label, ok, detail):
+    print(f"  {'✅' if ok else '❌'} {label}: {detail}")
+    return ok
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=25, help='lançamentos por thread')
+    parser.add_argument('--mesa', type=int, default=int(time.time()) % 100000 + 1000,
+                        help='mesa usada no teste (padrão: uma mesa nova a cada execução)')
+    parser.add_argument('--cancel', action='store_true',
+                        help='cancela a comanda no meio dos lançamentos')
+    parser.add_argument('--database-url', help='banco de teste no lugar do SQLite temporário')
+    args = parser.parse_args()
+
+    with app.app_context():
+        print(f"🗄️  Banco: {db.engine.url.render_as_string(hide_password=True)}")
+        menu_item = MenuItem.query.filter_by(is_active=True, available_for_comanda=True).first()
+        if not menu_item:
+            print("❌ Nenhum item do cardápio disponível para comanda")
+            sys.exit(1)
+        daily = db.session.get(DailyOrders, (datetime.utcnow().date(), 'comanda'))
+        revenue_before = daily.revenue if daily else 0
+        menu_item_id, price = menu_item.id, menu_item.price
+
+    total_requests = args.threads * args.requests
+    print(f"🔨 {args.threads} threads × {args.requests} lançamentos na mesa {args.mesa} "
+          f"({menu_item.name}, R$ {price:.2f})")
+
+    barrier = threading.Barrier(args.threads + (1 if args.cancel else 0))
+    errors = []
+    progress = Progress(total_requests)
+    threads = [
+        threading.Thread(target=hammer, args=(args.mesa, menu_item_id, args.requests, barrier, errors, progress))
+        for _ in range(args.threads)
+    ]
+    if args.cancel:
+        threads.append(threading.Thread(target=cancel_midway, args=(args.mesa, barrier, progress, errors)))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  {total_requests} requisições em {elapsed:.2f}s ({total_requests / elapsed:.0f}/s)")
+
+    with app.app_context():
+        comandas = Order.query.filter_by(mesa=args.mesa, is_comanda=True).order_by(Order.id).all()
+        cancelled = [c for c in comandas if c.status == 'cancelado']
+        active = [c for c in comandas if c.status != 'cancelado']
+        open_comandas = [c for c in comandas if c.status_comanda == 'aberta']
+        results = [check('Requisições sem erro', not errors, f'{len(errors)} erros' + (f' (ex.: {errors[0]})' if errors else ''))]
+        if args.cancel:
+            results.append(check('Comanda cancelada e encerrada',
+                                 len(cancelled) == 1 and cancelled[0].status_comanda == 'encerrada',
+                                 ', '.join(f'#{c.id} {c.status}/{c.status_comanda}' for c in comandas)))
+            results.append(check('Comandas abertas na mesa', len(open_comandas) <= 1, len(open_comandas)))
+        else:
+            results.append(check('Comandas abertas na mesa', len(open_comandas) == 1, len(open_comandas)))
+        if comandas:
+            items = dict(db.session.query(
+                OrderItem.order_id, db.func.coalesce(db.func.sum(OrderItem.subtotal), 0)
+            ).filter(OrderItem.order_id.in_([c.id for c in comandas])).group_by(OrderItem.order_id).all())
+            launched = OrderItem.query.filter(OrderItem.order_id.in_([c.id for c in comandas])).count()
+            results.append(check('Itens lançados', launched == total_requests, f'{launched} de {total_requests}'))
+            drift = [c for c in comandas if abs(c.total_amount - items.get(c.id, 0)) >= 0.005]
+            results.append(check('Total de cada comanda = soma dos itens', not drift,
+                                 ', '.join(f'#{c.id} R$ {c.total_amount:.2f}' for c in comandas)))
+            expected = round(sum(items.get(c.id, 0) for c in active), 2)
+            if not args.cancel:
+                results.append(check('Total da comanda', abs(expected - total_requests * price) < 0.005,
+                                     f'R$ {expected:.2f} (esperado R$ {total_requests * price:.2f})'))
+            user = db.session.get(User, comandas[0].user_id)
+            results.append(check('Estatísticas do cliente da mesa',
+                                 user.total_orders == len(active) and abs(user.total_spent - expected) < 0.005,
+                                 f'{user.total_orders} pedido(s), R$ {user.total_spent:.2f} '
+                                 f'(esperado {len(active)}, R$ {expected:.2f})'))
+            daily = db.session.get(DailyOrders, (datetime.utcnow().date(), 'comanda'))
+            revenue = (daily.revenue if daily else 0) - revenue_before
+            results.append(check('Agregado do dia (daily_orders)', abs(revenue - expected) < 0.005,
+                                 f'+R$ {revenue:.2f} (esperado R$ {expected:.2f})'))
+
+    print("\n✅ Comanda consistente" if all(results) else "\n❌ Inconsistências encontradas")
+    sys.exit(0 if all(results) else 1)
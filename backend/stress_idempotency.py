@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Teste de concorrência do Idempotency-Key: vários retries (threads) do mesmo
+pedido, com a mesma chave, enviados ao mesmo tempo via POST /api/orders.
+
+Ao final confere que só um pedido foi criado, que todas as respostas de
+sucesso trazem o mesmo pedido, que as estatísticas do cliente e os agregados
+do dia contaram o pedido uma vez e que a mesma chave com outro corpo é
+recusada. Sai com código 1 se algo divergir.
+
+Roda em um SQLite temporário, ignorando o DATABASE_URL do ambiente. Para
+testar em outro banco de teste, passe --database-url (nunca o de produção):
+
+    python stress_idempotency.py --threads 16
+    python stress_idempotency.py --database-url postgresql://localhost/stress
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+# Só usa outro banco com --database-url explícito: o DATABASE_URL do ambiente
+# (no Railway, o de produção) é ignorado
+pre_parser = argparse.ArgumentParser(add_help=False)
+pre_parser.add_argument('--database-url')
+os.environ['DATABASE_URL'] = (pre_parser.parse_known_args()[0].database_url or
+                              f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'stress.db')}")
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.models.user import db, User
+from src.models.order import Order
+from src.models.menu import MenuItem
+from src.models.report import DailyOrders
+
+def retry(order, key, barrier, responses):
+    """Um reenvio do pedido com a chave compartilhada"""
+    client = app.test_client()
+    barrier.wait()
+    response = client.post('/api/orders', json=order, headers={'Idempotency-Key': key})
+    responses.append((response.status_code, response.get_json(), response.headers.get('Idempotent-Replayed')))
+
+def check(label, ok, detail):
+    print(f"  {'✅' if ok else '❌'} {label}: {detail}")
+    return ok
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16, help='envios simultâneos da mesma chave')
+    parser.add_argument('--database-url', help='banco de teste no lugar do SQLite temporário')
+    args = parser.parse_args()
+
+    key = str(uuid.uuid4())
+    phone = f'(11) 9{int(time.time() * 1000) % 10 ** 8:08d}'
+
+    with app.app_context():
+        print(f"🗄️  Banco: {db.engine.url.render_as_string(hide_password=True)}")
+        menu_item = MenuItem.query.filter_by(is_active=True, available_for_delivery=True).first()
+        if not menu_item:
+            print("❌ Nenhum item do cardápio disponível para delivery")
+            sys.exit(1)
+        daily = db.session.get(DailyOrders, (datetime.utcnow().date(), 'delivery'))
+        orders_before = daily.order_count if daily else 0
+        order = {
+            'order_type': 'delivery',
+            'customer_name': 'Teste Idempotência',
+            'customer_phone': phone,
+            'delivery_address': 'Rua do Teste, 1',
+            'items': [{'menu_item_id': menu_item.id, 'quantity': 2}]
+        }
+
+    print(f"🔁 {args.threads} envios simultâneos com Idempotency-Key {key}")
+    barrier = threading.Barrier(args.threads)
+    responses = []
+    threads = [threading.Thread(target=retry, args=(order, key, barrier, responses)) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"⏱️  {args.threads} requisições em {time.perf_counter() - start:.2f}s")
+
+    with app.app_context():
+        ok = [body for status, body, _ in responses if status == 201]
+        replayed = sum(1 for _, _, header in responses if header == 'true')
+        order_ids = {body['order']['id'] for body in ok}
+        user = User.find_by_phone(phone)
+        created = Order.query.filter_by(user_id=user.id).count() if user else 0
+
+        results = [check('Respostas 201', len(ok) == args.threads,
+                         f'{len(ok)} de {args.threads} ({replayed} repetidas da primeira)')]
+        results.append(check('Mesmo pedido em todas as respostas', len(order_ids) == 1, sorted(order_ids)))
+        results.append(check('Pedidos criados', created == 1, created))
+        results.append(check('Estatísticas do cliente', user is not None and user.total_orders == 1,
+                             f'{user.total_orders if user else 0} pedido(s)'))
+        daily = db.session.get(DailyOrders, (datetime.utcnow().date(), 'delivery'))
+        counted = (daily.order_count if daily else 0) - orders_before
+        results.append(check('Agregado do dia (daily_orders)', counted == 1, f'+{counted} pedido(s)'))
+
+        other = dict(order, items=[{'menu_item_id': menu_item.id, 'quantity': 3}])
+        response = app.test_client().post('/api/orders', json=other, headers={'Idempotency-Key': key})
+        results.append(check('Mesma chave com outro corpo', response.status_code == 422, response.status_code))
+
+    print("\n✅ Sem pedidos duplicados" if all(results) else "\n❌ Inconsistências encontradas")
+    sys.exit(0 if all(results) else 1)
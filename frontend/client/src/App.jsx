@@ -6,7 +6,7 @@ import { Label } from '@/components/ui/label';
 import { Toaster } from '@/components/ui/sonner';
 import { Textarea } from '@/components/ui/textarea';
 import { ArrowLeft, Check, History, LogOut, Minus, Phone, Plus, ShoppingCart, Store, Truck, User } from 'lucide-react';
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { BrowserRouter as Router } from 'react-router-dom';
 import { toast } from 'sonner';
 import nordestinoLogo from './assets/nordestino.png';
@@ -14,6 +14,31 @@ import nordestinoLogo from './assets/nordestino.png';
 // Configuração da API - URL de produção
 const API_BASE_URL = 'https://restaurante-production-1f07.up.railway.app/api';
 
+// Envia o pedido com Idempotency-Key e repete em falhas de rede (conexão móvel
+// instável): reenvios da mesma chave não criam pedido duplicado no backend.
+// keyRef guarda a chave do último corpo enviado; um corpo diferente ganha chave nova
+async function postOrder(orderData, keyRef, retries = 2) {
+  const body = JSON.stringify(orderData);
+  if (keyRef.current?.body !== body) {
+    keyRef.current = { body, key: crypto.randomUUID() };
+  }
+  for (let attempt = 0; ; attempt++) {
+    try {
+      return await fetch(`${API_BASE_URL}/orders`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Idempotency-Key': keyRef.current.key,
+        },
+        body,
+      });
+    } catch (error) {
+      if (attempt >= retries) throw error;
+      await new Promise((resolve) => setTimeout(resolve, 1000 * (attempt + 1)));
+    }
+  }
+}
+
 // Componente para seleção do tipo de pedido
 function OrderTypeSelection({ onSelectType }) {
   return (
@@ -75,6 +100,7 @@ function OrderTypeSelection({ onSelectType }) {
 
 // Componente do formulário de checkout
 function CheckoutForm({ cart, orderType, onBack, onSubmit }) {
+  const orderKeyRef = useRef(null);
   const [formData, setFormData] = useState({
     customer_name: '',
     customer_phone: '',
@@ -123,17 +149,12 @@ function CheckoutForm({ cart, orderType, onBack, onSubmit }) {
         })),
       };
 
-      const response = await fetch(`${API_BASE_URL}/orders`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(orderData),
-      });
+      const response = await postOrder(orderData, orderKeyRef);
 
       const data = await response.json();
 
       if (data.success) {
+        orderKeyRef.current = null;
         onSubmit(data.order);
       } else {
         toast.error('Erro ao criar pedido: ' + data.message);
@@ -642,6 +663,7 @@ function PhoneAuth({ onAuthenticated, onBack }) {
         body: JSON.stringify({
           phone: removePhoneMask(phone), // Remove máscara antes de enviar
           name: name.trim() || undefined, // Envia apenas se não estiver vazio
+          light: true, // Só os pedidos recentes, resumidos; o resto é carregado sob demanda
         }),
       });
 
@@ -652,7 +674,8 @@ function PhoneAuth({ onAuthenticated, onBack }) {
         localStorage.setItem('user', JSON.stringify(data.user));
         localStorage.setItem('orders', JSON.stringify(data.orders));
         localStorage.setItem('currentOrder', JSON.stringify(data.current_order));
-        onAuthenticated(data.user, data.orders, data.current_order);
+        localStorage.setItem('ordersCursor', JSON.stringify(data.next_cursor));
+        onAuthenticated(data.user, data.orders, data.current_order, data.next_cursor);
       } else {
         setError(data.message);
       }
@@ -709,7 +732,34 @@ function PhoneAuth({ onAuthenticated, onBack }) {
 }
 
 // Componente de histórico de pedidos
-function OrderHistory({ user, orders, currentOrder, onLogout, onNewOrder, onBack }) {
+function OrderHistory({ user, orders, currentOrder, nextCursor, onLoadMore, onLogout, onNewOrder, onBack }) {
+  const [orderItems, setOrderItems] = useState({});
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  // Pedidos do histórico vêm resumidos; os itens são buscados ao abrir o pedido
+  const fetchOrderItems = async (orderId) => {
+    try {
+      const response = await fetch(`${API_BASE_URL}/orders/${orderId}`);
+      const data = await response.json();
+      if (data.success) {
+        setOrderItems((prev) => ({ ...prev, [orderId]: data.order.items }));
+      }
+    } catch {
+      toast.error('Erro ao carregar itens do pedido');
+    }
+  };
+
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    try {
+      await onLoadMore();
+    } catch {
+      toast.error('Erro ao carregar pedidos');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getStatusBadgeVariant = (status) => {
     switch (status) {
       case 'pendente':
@@ -748,6 +798,7 @@ function OrderHistory({ user, orders, currentOrder, onLogout, onNewOrder, onBack
     localStorage.removeItem('user');
     localStorage.removeItem('orders');
     localStorage.removeItem('currentOrder');
+    localStorage.removeItem('ordersCursor');
     onLogout();
   };
 
@@ -887,20 +938,33 @@ function OrderHistory({ user, orders, currentOrder, onLogout, onNewOrder, onBack
                           </div>
                         )}
                       </div>
-                      {order.items && order.items.length > 0 && (
+                      {(order.items || orderItems[order.id]) ? (
                         <div className='mt-3'>
                           <Label className='text-sm font-medium'>Itens:</Label>
                           <ul className='mt-1 space-y-1'>
-                            {order.items.map((item) => (
+                            {(order.items || orderItems[order.id]).map((item) => (
                               <li key={item.id} className='text-sm text-gray-600'>
                                 {item.quantity}x {item.menu_item?.name} - R$ {item.subtotal.toFixed(2)}
                               </li>
                             ))}
                           </ul>
                         </div>
+                      ) : (
+                        order.item_count > 0 && (
+                          <Button variant='link' size='sm' className='mt-2 px-0' onClick={() => fetchOrderItems(order.id)}>
+                            Ver itens ({order.item_count})
+                          </Button>
+                        )
                       )}
                     </div>
                   ))}
+                  {nextCursor && (
+                    <div className='flex justify-center'>
+                      <Button variant='outline' onClick={handleLoadMore} disabled={loadingMore}>
+                        {loadingMore ? 'Carregando...' : 'Carregar mais'}
+                      </Button>
+                    </div>
+                  )}
                 </div>
               )}
             </CardContent>
@@ -913,6 +977,7 @@ function OrderHistory({ user, orders, currentOrder, onLogout, onNewOrder, onBack
 
 // Componente específico para comandas
 function ComandaPage({ mesa, onBack }) {
+  const orderKeyRef = useRef(null);
   const [menu, setMenu] = useState([]);
   const [categories, setCategories] = useState([]);
   const [selectedCategory, setSelectedCategory] = useState('');
@@ -1062,17 +1127,12 @@ function ComandaPage({ mesa, onBack }) {
         })),
       };
 
-      const response = await fetch(`${API_BASE_URL}/orders`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(orderData),
-      });
+      const response = await postOrder(orderData, orderKeyRef);
 
       const data = await response.json();
 
       if (data.success) {
+        orderKeyRef.current = null;
         toast.success('Pedido adicionado à comanda com sucesso!');
         setCart([]);
         buscarComandaMesa(); // Recarregar comanda
@@ -1265,6 +1325,7 @@ function App() {
   const [user, setUser] = useState(null);
   const [orders, setOrders] = useState([]);
   const [currentOrder, setCurrentOrder] = useState(null);
+  const [ordersCursor, setOrdersCursor] = useState(null);
 
   // Detectar se é uma comanda baseado na URL
   useEffect(() => {
@@ -1291,10 +1352,73 @@ function App() {
       setUser(JSON.parse(savedUser));
       setOrders(JSON.parse(savedOrders || '[]'));
       setCurrentOrder(JSON.parse(savedCurrentOrder || 'null'));
+      setOrdersCursor(JSON.parse(localStorage.getItem('ordersCursor') || 'null'));
       setCurrentView('history');
     }
   }, []);
 
+  // Acompanhar os pedidos do cliente logado: SSE quando o backend o habilita
+  // (/events/config), senão consulta /orders/changes a cada poll_interval
+  useEffect(() => {
+    if (!user) return;
+
+    let source = null;
+    let timer = null;
+    let closed = false;
+
+    const applyDelta = (delta) => {
+      setOrders((prev) => prev.map((o) => (o.id === delta.id ? { ...o, ...delta } : o)));
+      setCurrentOrder((prev) => {
+        if (!prev || prev.id !== delta.id) return prev;
+        // Pedido atual é o mais recente pendente ou em preparo
+        return ['pendente', 'preparando'].includes(delta.status) ? { ...prev, ...delta } : null;
+      });
+    };
+
+    const poll = async (since, interval) => {
+      try {
+        let data;
+        do {
+          const response = await fetch(`${API_BASE_URL}/orders/changes?user_id=${user.id}&since=${since}`);
+          data = await response.json();
+          if (closed || !data.success) break;
+          data.orders.forEach(applyDelta);
+          data.cancelled.forEach((id) => applyDelta({ id, status: 'cancelado' }));
+          since = data.watermark;
+        } while (data.has_more);
+      } catch (error) {
+        console.error('Erro ao buscar mudanças dos pedidos:', error);
+      }
+      if (!closed) timer = setTimeout(() => poll(since, interval), interval);
+    };
+
+    const start = async () => {
+      try {
+        const response = await fetch(`${API_BASE_URL}/events/config`);
+        const config = await response.json();
+        if (closed) return;
+        if (config.sse) {
+          source = new EventSource(`${API_BASE_URL}/events?user_id=${user.id}`);
+          const listener = (event) => applyDelta(JSON.parse(event.data));
+          ['order.status', 'order.payment', 'order.updated'].forEach((type) => source.addEventListener(type, listener));
+        } else {
+          const interval = config.poll_interval * 1000;
+          timer = setTimeout(() => poll(config.watermark, interval), interval);
+        }
+      } catch (error) {
+        console.error('Erro ao carregar configuração de eventos:', error);
+        if (!closed) timer = setTimeout(start, 5000);
+      }
+    };
+
+    start();
+    return () => {
+      closed = true;
+      clearTimeout(timer);
+      source?.close();
+    };
+  }, [user]);
+
   const handleCheckout = (cartItems) => {
     setCart(cartItems);
     setCurrentView('checkout');
@@ -1326,17 +1450,30 @@ function App() {
   };
 
   // Handlers para autenticação
-  const handleAuthenticated = (userData, userOrders, userCurrentOrder) => {
+  const handleAuthenticated = (userData, userOrders, userCurrentOrder, userOrdersCursor) => {
     setUser(userData);
     setOrders(userOrders);
     setCurrentOrder(userCurrentOrder);
+    setOrdersCursor(userOrdersCursor);
     setCurrentView('history');
   };
 
+  // Próxima página do histórico (resumida), a partir do cursor
+  const handleLoadMoreOrders = async () => {
+    const params = new URLSearchParams({ summary: true, limit: 10, cursor: ordersCursor });
+    const response = await fetch(`${API_BASE_URL}/users/${user.id}/orders?${params}`);
+    const data = await response.json();
+    if (data.success) {
+      setOrders((prev) => [...prev, ...data.orders]);
+      setOrdersCursor(data.next_cursor);
+    }
+  };
+
   const handleLogout = () => {
     setUser(null);
     setOrders([]);
     setCurrentOrder(null);
+    setOrdersCursor(null);
     setCurrentView('order-type');
   };
 
@@ -1357,6 +1494,8 @@ function App() {
         user={user}
         orders={orders}
         currentOrder={currentOrder}
+        nextCursor={ordersCursor}
+        onLoadMore={handleLoadMoreOrders}
         onLogout={handleLogout}
         onNewOrder={handleNewOrder}
         onBack={handleBackToMenu}
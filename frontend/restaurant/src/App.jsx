@@ -11,6 +11,7 @@ import { Textarea } from '@/components/ui/textarea';
 import {
   ArrowLeft,
   BarChart3,
+  ChefHat,
   CheckCircle,
   Clock,
   Edit,
@@ -25,7 +26,7 @@ import {
   X,
   XCircle,
 } from 'lucide-react';
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { Link, Route, BrowserRouter as Router, Routes, useLocation } from 'react-router-dom';
 import { toast } from 'sonner';
 import './App.css';
@@ -34,6 +35,115 @@ import { useIsMobile } from './hooks/use-mobile';
 // Configuração da API - URL de produção
 const API_BASE_URL = 'https://restaurante-production-1f07.up.railway.app/api';
 
+const ORDER_EVENT_TYPES = ['order.created', 'order.items_added', 'order.status', 'order.payment', 'order.updated', 'resync'];
+
+// Espelho de ORDER_TRANSITIONS (backend/src/models/order.py): próximos status válidos
+const ORDER_TRANSITIONS = {
+  pendente: ['preparando', 'pronto', 'entregue', 'cancelado'],
+  preparando: ['pronto', 'entregue', 'cancelado'],
+  pronto: ['entregue', 'cancelado'],
+  entregue: [],
+  cancelado: ['pendente'],
+};
+
+// Configuração do acompanhamento de pedidos (/events/config), lida uma vez
+let eventsConfigPromise = null;
+
+function fetchEventsConfig() {
+  if (!eventsConfigPromise) {
+    eventsConfigPromise = fetch(`${API_BASE_URL}/events/config`)
+      .then((response) => response.json())
+      .catch((error) => {
+        eventsConfigPromise = null;
+        throw error;
+      });
+  }
+  return eventsConfigPromise;
+}
+
+// Acompanha as mudanças de pedidos em vez de recarregar a lista inteira: pelo
+// stream SSE quando o backend o habilita, senão consultando /orders/changes a
+// cada poll_interval segundos. onEvent(tipo, delta) recebe também 'resync'
+// (eventos perdidos: recarregar a lista) com delta vazio
+function useOrderEvents(onEvent, params = '') {
+  const handlerRef = useRef(onEvent);
+  handlerRef.current = onEvent;
+
+  useEffect(() => {
+    let source = null;
+    let timer = null;
+    let closed = false;
+
+    const poll = async (since, interval) => {
+      try {
+        let data;
+        do {
+          const query = new URLSearchParams(params);
+          query.set('since', since);
+          const response = await fetch(`${API_BASE_URL}/orders/changes?${query}`);
+          data = await response.json();
+          if (closed || !data.success) break;
+          data.orders.forEach((order) => handlerRef.current('order.updated', order));
+          data.cancelled.forEach((id) => handlerRef.current('order.status', { id, status: 'cancelado' }));
+          since = data.watermark;
+        } while (data.has_more);
+      } catch (error) {
+        console.error('Erro ao buscar mudanças de pedidos:', error);
+      }
+      if (!closed) timer = setTimeout(() => poll(since, interval), interval);
+    };
+
+    const start = async () => {
+      try {
+        const config = await fetchEventsConfig();
+        if (closed) return;
+        if (config.sse) {
+          source = new EventSource(`${API_BASE_URL}/events${params ? `?${params}` : ''}`);
+          const listener = (event) => handlerRef.current(event.type, JSON.parse(event.data) || {});
+          ORDER_EVENT_TYPES.forEach((type) => source.addEventListener(type, listener));
+        } else {
+          const interval = config.poll_interval * 1000;
+          timer = setTimeout(() => poll(config.watermark, interval), interval);
+        }
+      } catch (error) {
+        console.error('Erro ao carregar configuração de eventos:', error);
+        if (!closed) timer = setTimeout(start, 5000);
+      }
+    };
+
+    start();
+    return () => {
+      closed = true;
+      clearTimeout(timer);
+      source?.close();
+    };
+  }, [params]);
+}
+
+// Busca pedidos em /orders com os filtros aplicados no servidor, seguindo
+// next_cursor até juntar `max` pedidos (Infinity: todas as páginas).
+// Retorna { orders, nextCursor } para continuar com "Carregar mais"
+async function fetchOrderPages(filters, max = Infinity, cursor = null) {
+  const orders = [];
+  do {
+    const params = new URLSearchParams(Object.entries(filters).filter(([, value]) => value !== '' && value != null));
+    params.set('limit', String(Math.min(500, max - orders.length)));
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`${API_BASE_URL}/orders?${params}`);
+    const data = await response.json();
+    if (!data.success) throw new Error(data.message);
+    orders.push(...data.orders);
+    cursor = data.next_cursor;
+  } while (cursor && orders.length < max);
+  return { orders, nextCursor: cursor };
+}
+
+// Aplica um delta de pedido a uma lista; retorna null se o pedido não estiver nela
+function mergeOrderDelta(orders, delta) {
+  if (!orders.some((order) => order.id === delta.id)) return null;
+  return orders.map((order) => (order.id === delta.id ? { ...order, ...delta } : order));
+}
+
 // Componente de navegação
 function Navigation() {
   const location = useLocation();
@@ -46,6 +156,7 @@ function Navigation() {
     { path: '/orders', label: 'Pedidos', icon: ShoppingBag },
     { path: '/history', label: 'Histórico', icon: Users },
     { path: '/comandas', label: 'Comandas', icon: Package },
+    { path: '/cozinha', label: 'Cozinha', icon: ChefHat },
   ];
 
   const handleNavClick = () => {
@@ -145,9 +256,24 @@ function Dashboard() {
 
   useEffect(() => {
     fetchStats();
-    fetchRecentOrders();
   }, []);
 
+  useEffect(() => {
+    // Filtros aplicados no servidor; espera o usuário parar de digitar
+    const timeout = setTimeout(() => fetchRecentOrders(), 250);
+    return () => clearTimeout(timeout);
+  }, [activeFilter, dateFilter, addressFilter, customerFilter, resultsPerPage]);
+
+  useOrderEvents((type, delta) => {
+    fetchStats();
+    const merged = type === 'order.created' ? null : mergeOrderDelta(allOrders, delta);
+    if (merged) {
+      setAllOrders(merged);
+    } else {
+      fetchRecentOrders();
+    }
+  });
+
   useEffect(() => {
     filterOrders();
   }, [activeFilter, allOrders, dateFilter, addressFilter, customerFilter, resultsPerPage]);
@@ -166,12 +292,17 @@ function Dashboard() {
 
   const fetchRecentOrders = async () => {
     try {
-      const response = await fetch(`${API_BASE_URL}/orders`);
-      const data = await response.json();
-      if (data.success) {
-        setAllOrders(data.orders);
-        setRecentOrders(data.orders.slice(0, 5));
-      }
+      const { orders } = await fetchOrderPages(
+        {
+          status: activeFilter === 'all' ? '' : activeFilter,
+          date_from: dateFilter,
+          date_to: dateFilter,
+          customer: customerFilter,
+          address: addressFilter,
+        },
+        resultsPerPage === 'all' ? Infinity : resultsPerPage
+      );
+      setAllOrders(orders);
     } catch (error) {
       console.error('Erro ao carregar pedidos recentes:', error);
     } finally {
@@ -179,6 +310,7 @@ function Dashboard() {
     }
   };
 
+  // Os filtros já vêm aplicados pelo servidor; repetidos aqui para os deltas de eventos
   const filterOrders = () => {
     let filtered = [...allOrders];
 
@@ -189,12 +321,8 @@ function Dashboard() {
 
     // Filtro por data
     if (dateFilter) {
-      filtered = filtered.filter((order) => {
-        // Extrai a data no formato YYYY-MM-DD do created_at
-        const orderDate = new Date(order.created_at);
-        const orderDateStr = orderDate.toISOString().slice(0, 10); // YYYY-MM-DD
-        return orderDateStr === dateFilter;
-      });
+      // created_at vem em UTC sem fuso, como o filtro date_from/date_to do servidor
+      filtered = filtered.filter((order) => order.created_at.slice(0, 10) === dateFilter);
     }
 
     // Filtro por endereço
@@ -965,27 +1093,38 @@ function MenuItemForm({ item, onSave, onCancel }) {
   );
 }
 
+const ORDERS_PAGE_SIZE = 50;
+
 // Componente de gerenciamento de pedidos
 function OrderManagement() {
   const [orders, setOrders] = useState([]);
   const [loading, setLoading] = useState(true);
   const [selectedOrder, setSelectedOrder] = useState(null);
   const [statusFilter, setStatusFilter] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
     fetchOrders();
   }, [statusFilter]);
 
-  const fetchOrders = async () => {
-    try {
-      const params = new URLSearchParams();
-      if (statusFilter && statusFilter !== 'all') params.append('status', statusFilter);
+  useOrderEvents((type, delta) => {
+    const merged = type === 'order.created' ? null : mergeOrderDelta(orders, delta);
+    if (merged && (!statusFilter || statusFilter === 'all' || delta.status === statusFilter)) {
+      setOrders(merged);
+    } else {
+      fetchOrders();
+    }
+  });
 
-      const response = await fetch(`${API_BASE_URL}/orders?${params}`);
-      const data = await response.json();
-      if (data.success) {
-        setOrders(data.orders);
-      }
+  const fetchOrders = async (cursor = null) => {
+    try {
+      const page = await fetchOrderPages(
+        { status: statusFilter && statusFilter !== 'all' ? statusFilter : '' },
+        ORDERS_PAGE_SIZE,
+        cursor
+      );
+      setOrders((current) => (cursor ? [...current, ...page.orders] : page.orders));
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Erro ao carregar pedidos:', error);
     } finally {
@@ -1289,6 +1428,13 @@ function OrderManagement() {
                   </div>
                 ))
               )}
+              {nextCursor && (
+                <div className='flex justify-center p-4'>
+                  <Button variant='outline' onClick={() => fetchOrders(nextCursor)}>
+                    Carregar mais
+                  </Button>
+                </div>
+              )}
             </div>
           </CardContent>
         </Card>
@@ -1351,7 +1497,7 @@ function OrderManagement() {
                       size='sm'
                       variant='outline'
                       onClick={() => updateOrderStatus(selectedOrder.id, 'preparando')}
-                      disabled={selectedOrder.status === 'preparando'}
+                      disabled={!ORDER_TRANSITIONS[selectedOrder.status]?.includes('preparando')}
                     >
                       Preparando
                     </Button>
@@ -1359,7 +1505,7 @@ function OrderManagement() {
                       size='sm'
                       variant='outline'
                       onClick={() => updateOrderStatus(selectedOrder.id, 'pronto')}
-                      disabled={selectedOrder.status === 'pronto'}
+                      disabled={!ORDER_TRANSITIONS[selectedOrder.status]?.includes('pronto')}
                     >
                       Pronto
                     </Button>
@@ -1367,7 +1513,7 @@ function OrderManagement() {
                       size='sm'
                       variant='outline'
                       onClick={() => updateOrderStatus(selectedOrder.id, 'entregue')}
-                      disabled={selectedOrder.status === 'entregue'}
+                      disabled={!ORDER_TRANSITIONS[selectedOrder.status]?.includes('entregue')}
                     >
                       Entregue
                     </Button>
@@ -1375,7 +1521,7 @@ function OrderManagement() {
                       size='sm'
                       variant='outline'
                       onClick={() => updateOrderStatus(selectedOrder.id, 'cancelado')}
-                      disabled={selectedOrder.status === 'cancelado'}
+                      disabled={!ORDER_TRANSITIONS[selectedOrder.status]?.includes('cancelado')}
                     >
                       Cancelar
                     </Button>
@@ -1420,29 +1566,35 @@ function OrderManagement() {
 function CustomerHistory() {
   const [users, setUsers] = useState([]);
   const [userOrders, setUserOrders] = useState([]);
+  const [userOrdersPage, setUserOrdersPage] = useState(null);
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
-  const [sortBy, setSortBy] = useState('created_at');
+  const [sortBy, setSortBy] = useState('relevance');
   const [sortOrder, setSortOrder] = useState('desc');
+  const [nextOffset, setNextOffset] = useState(null);
   const [showOrdersModal, setShowOrdersModal] = useState(false);
 
   useEffect(() => {
-    fetchUsers();
+    // Espera o usuário parar de digitar antes de buscar
+    const timeout = setTimeout(() => fetchUsers(), 250);
+    return () => clearTimeout(timeout);
   }, [searchTerm, sortBy, sortOrder]);
 
-  const fetchUsers = async () => {
+  const fetchUsers = async (offset = 0) => {
     try {
       const params = new URLSearchParams({
         search: searchTerm,
         sort_by: sortBy,
         sort_order: sortOrder,
+        offset,
       });
 
       const response = await fetch(`${API_BASE_URL}/users?${params}`);
       const data = await response.json();
 
       if (data.success) {
-        setUsers(data.users);
+        setUsers((current) => (offset ? [...current, ...data.users] : data.users));
+        setNextOffset(data.next_offset);
       }
     } catch (error) {
       console.error('Erro ao carregar usuários:', error);
@@ -1451,13 +1603,15 @@ function CustomerHistory() {
     }
   };
 
-  const fetchUserOrders = async (userId) => {
+  const fetchUserOrders = async (userId, cursor = null) => {
     try {
-      const response = await fetch(`${API_BASE_URL}/users/${userId}/orders`);
+      const params = new URLSearchParams(cursor ? { cursor } : {});
+      const response = await fetch(`${API_BASE_URL}/users/${userId}/orders?${params}`);
       const data = await response.json();
 
       if (data.success) {
-        setUserOrders(data.orders);
+        setUserOrders((current) => (cursor ? [...current, ...data.orders] : data.orders));
+        setUserOrdersPage(data.next_cursor ? { userId, cursor: data.next_cursor } : null);
         setShowOrdersModal(true);
       }
     } catch (error) {
@@ -1510,6 +1664,7 @@ function CustomerHistory() {
             <SelectValue placeholder='Ordenar por' />
           </SelectTrigger>
           <SelectContent>
+            <SelectItem value='relevance'>Relevância</SelectItem>
             <SelectItem value='created_at'>Data de cadastro</SelectItem>
             <SelectItem value='name'>Nome</SelectItem>
             <SelectItem value='total_orders'>Quantidade de pedidos</SelectItem>
@@ -1594,6 +1749,13 @@ function CustomerHistory() {
               </TableBody>
             </Table>
           </div>
+          {nextOffset !== null && (
+            <div className='flex justify-center p-4'>
+              <Button variant='outline' onClick={() => fetchUsers(nextOffset)}>
+                Carregar mais
+              </Button>
+            </div>
+          )}
         </CardContent>
       </Card>
 
@@ -1651,6 +1813,13 @@ function CustomerHistory() {
                   </CardContent>
                 </Card>
               ))}
+              {userOrdersPage && (
+                <div className='flex justify-center'>
+                  <Button variant='outline' onClick={() => fetchUserOrders(userOrdersPage.userId, userOrdersPage.cursor)}>
+                    Carregar mais
+                  </Button>
+                </div>
+              )}
             </div>
           )}
         </DialogContent>
@@ -1674,22 +1843,28 @@ function ComandaManagement() {
     fetchMenuItems();
   }, []);
 
+  useOrderEvents((type, delta) => {
+    // Cancelamentos e resync chegam sem is_comanda
+    if (delta.is_comanda === false) return;
+    fetchComandas();
+    if (selectedMesa !== null && Number(selectedMesa) === delta.mesa) {
+      fetchPedidosMesa(delta.mesa);
+    }
+  });
+
   const fetchComandas = async () => {
     setLoading(true);
     try {
-      const response = await fetch(`${API_BASE_URL}/orders?is_comanda=true&status_comanda=aberta`);
-      const data = await response.json();
-      if (data.success) {
-        // Agrupa por mesa, ignorando mesas undefined, null ou vazias
-        const mesas = {};
-        data.orders.forEach((order) => {
-          if (order.mesa !== undefined && order.mesa !== null && order.mesa !== '' && !isNaN(order.mesa)) {
-            if (!mesas[order.mesa]) mesas[order.mesa] = [];
-            mesas[order.mesa].push(order);
-          }
-        });
-        setComandas(mesas);
-      }
+      const { orders } = await fetchOrderPages({ is_comanda: 'true', status_comanda: 'aberta' });
+      // Agrupa por mesa, ignorando mesas undefined, null ou vazias
+      const mesas = {};
+      orders.forEach((order) => {
+        if (order.mesa !== undefined && order.mesa !== null && order.mesa !== '' && !isNaN(order.mesa)) {
+          if (!mesas[order.mesa]) mesas[order.mesa] = [];
+          mesas[order.mesa].push(order);
+        }
+      });
+      setComandas(mesas);
     } catch (error) {
       console.error('Erro ao carregar comandas:', error);
     } finally {
@@ -1778,26 +1953,20 @@ function ComandaManagement() {
     if (!confirm(`Tem certeza que deseja encerrar a comanda da Mesa ${mesa}?`)) return;
 
     try {
-      // Buscar todos os pedidos da mesa
-      const response = await fetch(`${API_BASE_URL}/comanda/${mesa}`);
+      // Encerra a comanda e marca como paga em uma única requisição
+      const response = await fetch(`${API_BASE_URL}/comanda/${mesa}/close`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ payment_status: 'pago' }),
+      });
       const data = await response.json();
 
       if (data.success) {
-        // Atualizar status de todos os pedidos da mesa
-        for (const order of data.orders) {
-          await fetch(`${API_BASE_URL}/orders/${order.id}`, {
-            method: 'PUT',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-              status_comanda: 'encerrada',
-              status: 'entregue', // Marca como entregue quando encerra
-            }),
-          });
-        }
-
-        toast.success('Comanda encerrada com sucesso!');
+        toast.success(`Comanda encerrada! Total: R$ ${data.bill.total.toFixed(2)}`);
         setSelectedMesa(null);
         fetchComandas();
+      } else {
+        toast.error('Erro ao encerrar comanda: ' + data.message);
       }
     } catch (error) {
       console.error('Erro ao encerrar comanda:', error);
@@ -2105,6 +2274,116 @@ function ComandaManagement() {
   );
 }
 
+// Fila da cozinha: pedidos em andamento já ordenados pelo backend (/kitchen/queue)
+const KITCHEN_COLUMNS = [
+  { status: 'pendente', label: 'Pendentes', next: 'preparando', action: 'Iniciar preparo' },
+  { status: 'preparando', label: 'Em preparo', next: 'pronto', action: 'Marcar pronto' },
+  { status: 'pronto', label: 'Prontos', next: 'entregue', action: 'Entregue' },
+];
+
+function KitchenQueue() {
+  const [orders, setOrders] = useState([]);
+  const [loading, setLoading] = useState(true);
+
+  useEffect(() => {
+    fetchQueue();
+  }, []);
+
+  useOrderEvents(() => fetchQueue());
+
+  const fetchQueue = async () => {
+    try {
+      const response = await fetch(`${API_BASE_URL}/kitchen/queue`);
+      const data = await response.json();
+      if (data.success) {
+        setOrders(data.orders);
+      }
+    } catch (error) {
+      console.error('Erro ao carregar fila da cozinha:', error);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const advanceStatus = async (orderId, status) => {
+    try {
+      const response = await fetch(`${API_BASE_URL}/orders/${orderId}/status`, {
+        method: 'PUT',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ status }),
+      });
+      const data = await response.json();
+      if (data.success) {
+        fetchQueue();
+      } else {
+        toast.error('Erro ao atualizar status: ' + data.message);
+      }
+    } catch (error) {
+      console.error('Erro ao atualizar status:', error);
+      toast.error('Erro ao atualizar status');
+    }
+  };
+
+  if (loading) {
+    return (
+      <div className='flex items-center justify-center h-64'>
+        <div className='animate-spin rounded-full h-12 w-12 border-b-2 border-blue-500'></div>
+      </div>
+    );
+  }
+
+  return (
+    <div className='space-y-6'>
+      <div>
+        <h2 className='text-2xl font-bold text-gray-900'>Cozinha</h2>
+        <p className='text-gray-600'>Pedidos em andamento, por prioridade e ordem de chegada</p>
+      </div>
+
+      <div className='grid grid-cols-1 md:grid-cols-3 gap-4'>
+        {KITCHEN_COLUMNS.map((column) => {
+          const columnOrders = orders.filter((order) => order.status === column.status);
+          return (
+            <div key={column.status} className='space-y-3'>
+              <h3 className='font-semibold text-gray-700'>
+                {column.label} ({columnOrders.length})
+              </h3>
+              {columnOrders.map((order) => (
+                <Card key={order.id}>
+                  <CardHeader className='pb-2'>
+                    <div className='flex items-center justify-between'>
+                      <CardTitle className='text-lg'>{order.mesa ? `Mesa ${order.mesa}` : `#${order.id}`}</CardTitle>
+                      <Badge variant='secondary'>{order.order_type}</Badge>
+                    </div>
+                    <CardDescription>
+                      <Clock className='inline w-3 h-3 mr-1' />
+                      {new Date(order.created_at).toLocaleTimeString('pt-BR', { hour: '2-digit', minute: '2-digit' })}
+                      {order.customer_name && !order.mesa && ` • ${order.customer_name}`}
+                    </CardDescription>
+                  </CardHeader>
+                  <CardContent className='space-y-2'>
+                    <ul className='space-y-1'>
+                      {order.items.map((item, index) => (
+                        <li key={index} className='text-sm'>
+                          <span className='font-medium'>{item.quantity}x</span> {item.name}
+                          {item.notes && <p className='text-xs text-orange-600 ml-6'>{item.notes}</p>}
+                        </li>
+                      ))}
+                    </ul>
+                    {order.notes && <p className='text-xs text-gray-600'>Obs.: {order.notes}</p>}
+                    <Button size='sm' className='w-full' onClick={() => advanceStatus(order.id, column.next)}>
+                      {column.action}
+                    </Button>
+                  </CardContent>
+                </Card>
+              ))}
+            </div>
+          );
+        })}
+      </div>
+    </div>
+  );
+}
+
 function App() {
   return (
     <Router>
@@ -2117,6 +2396,7 @@ function App() {
             <Route path='/orders' element={<OrderManagement />} />
             <Route path='/history' element={<CustomerHistory />} />
             <Route path='/comandas' element={<ComandaManagement />} />
+            <Route path='/cozinha' element={<KitchenQueue />} />
           </Routes>
         </main>
         <Toaster />